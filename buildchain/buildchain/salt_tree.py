@@ -462,6 +462,7 @@ SALT_FILES: Tuple[Union[Path, targets.AtomicTarget], ...] = (
     Path("salt/metalk8s/container-engine/containerd/files/50-metalk8s.conf.j2"),
     Path("salt/metalk8s/container-engine/containerd/init.sls"),
     Path("salt/metalk8s/container-engine/containerd/installed.sls"),
+    Path("salt/metalk8s/container-engine/containerd/prepulled.sls"),
     Path("salt/metalk8s/container-engine/containerd/running.sls"),
     Path("salt/metalk8s/container-engine/init.sls"),
     Path("salt/metalk8s/container-engine/running.sls"),
@@ -687,7 +688,9 @@ SALT_FILES: Tuple[Union[Path, targets.AtomicTarget], ...] = (
     Path("salt/_renderers/metalk8s_kubernetes.py"),
     Path("salt/_roster/kubernetes_nodes.py"),
     Path("salt/_runners/metalk8s_checks.py"),
+    Path("salt/_runners/metalk8s_drain.py"),
     Path("salt/_runners/metalk8s_saltutil.py"),
+    Path("salt/_runners/metalk8s_upgrade.py"),
     Path("salt/_states/containerd.py"),
     Path("salt/_states/kubeconfig.py"),
     Path("salt/_states/metalk8s.py"),
@@ -699,6 +702,7 @@ SALT_FILES: Tuple[Union[Path, targets.AtomicTarget], ...] = (
     Path("salt/_states/metalk8s_package_manager.py"),
     Path("salt/_states/metalk8s_sysctl.py"),
     Path("salt/_states/metalk8s_volumes.py"),
+    Path("salt/_utils/cri_client.py"),
     Path("salt/_utils/metalk8s_kubernetes.py"),
     Path("salt/_utils/metalk8s_utils.py"),
     Path("salt/_utils/pillar_utils.py"),
@@ -1,7 +1,13 @@
 """
-Various functions to interact with a CRI daemon (through :program:`crictl`).
+Various functions to interact with a CRI daemon.
+
+The CRI API is called directly, over a single gRPC channel (see the `cri`
+utils module), when possible. Otherwise, and for operations not implemented
+by this client (e.g. pulling images or running commands in containers),
+:program:`crictl` is used.
 """
 
+from concurrent.futures import ThreadPoolExecutor
 import logging
 import re
 import time
@@ -15,21 +21,64 @@ log = logging.getLogger(__name__)
 
 __virtualname__ = "cri"
 
+# Default maximum number of images pulled at the same time by `pull_images`
+PULL_CONCURRENCY = 2
+# First interval (in seconds) between two checks of `wait_pod` and
+# `wait_container`, doubled after each check up to their `sleep`/`delay`
+POLL_MIN_INTERVAL = 0.2
+
 
 def __virtual__():
     return __virtualname__
 
 
+def _poll_intervals(max_interval):
+    """Yield intervals between two checks, with an exponential backoff."""
+    interval = min(POLL_MIN_INTERVAL, max_interval)
+    while True:
+        yield interval
+        interval = min(interval * 2, max_interval)
+
+
+# Returned by `_client_call` when `crictl` should be used instead
+_NO_CLIENT = object()
+
+
+def _client_call(method, *args, **kwargs):
+    """Call a method of the in-process CRI client.
+
+    Returns `_NO_CLIENT` if this client is not available, or if the call
+    failed.
+    """
+    if "cri.get_client" not in __utils__:
+        return _NO_CLIENT
+
+    client = __utils__["cri.get_client"]()
+    if client is None:
+        return _NO_CLIENT
+
+    try:
+        return getattr(client, method)(*args, **kwargs)
+    except CommandExecutionError as exc:
+        log.debug("Falling back to crictl: %s", exc)
+        return _NO_CLIENT
+
+
 def list_images():
     """
     List the images stored in the CRI image cache.
 
     .. note::
 
-       This uses the :command:`crictl` command, which should be configured
-       correctly on the system, e.g. in :file:`/etc/crictl.yaml`.
+       This uses the CRI API directly when possible, and the :command:`crictl`
+       command otherwise, which should be configured correctly on the system,
+       e.g. in :file:`/etc/crictl.yaml`.
     """
     log.info("Listing CRI images")
+    images = _client_call("list_images")
+    if images is not _NO_CLIENT:
+        return images
+
     out = __salt__["cmd.run_all"]("crictl images -o json")
     if out["retcode"] != 0:
         log.error("Failed to list images")
@@ -38,6 +87,15 @@ def list_images():
     return salt.utils.json.loads(out["stdout"])["images"]
 
 
+def _images_index(images):
+    """Index CRI images on their tags and digests."""
+    index = {}
+    for image in images or []:
+        for ref in image.get("repoTags", []) + image.get("repoDigests", []):
+            index[ref] = image
+    return index
+
+
 def available(name):
     """
     Check if given image exists in the containerd namespace image list
@@ -45,19 +103,22 @@ def available(name):
     name
         Name of the container image
     """
-    images = list_images()
-    available = False
-    if not images:
-        return False
+    return available_many([name])[name]
 
-    for image in images:
-        if name in image.get("repoTags", []):
-            available = True
-            break
-        if name in image.get("repoDigests", []):
-            available = True
-            break
-    return available
+
+def available_many(names):
+    """
+    Check if given images exist in the containerd namespace image list
+
+    Images are only listed once, whatever the number of names to check.
+
+    names
+        List of names (tags or digests) of container images
+
+    Returns a dict mapping each name to whether or not it is available.
+    """
+    index = _images_index(list_images())
+    return {name: name in index for name in names}
 
 
 _PULL_RES = {
@@ -71,7 +132,8 @@ def pull_image(image):
 
     .. note::
 
-       This uses the :command:`crictl` command, which should be configured
+       This always uses the :command:`crictl` command (pulling images is not
+       implemented by the CRI API client), which should be configured
        correctly on the system, e.g. in :file:`/etc/crictl.yaml`.
 
     image
@@ -99,14 +161,60 @@ def pull_image(image):
     return ret
 
 
+def pull_images(images, concurrency=PULL_CONCURRENCY):
+    """
+    Pull several images into the CRI image cache, in parallel.
+
+    .. note::
+
+       Images are pulled with the :command:`crictl` command (see
+       `pull_image`), and their sizes are retrieved using the CRI API
+       directly when possible, and the :command:`crictl` command otherwise,
+       which should be configured correctly on the system, e.g. in
+       :file:`/etc/crictl.yaml`.
+
+    images
+        List of tags or digests of the images to pull
+    concurrency
+        Maximum number of images pulled at the same time
+
+    Returns a dict mapping each image to `None` if it could not be pulled,
+    or to its `digests` (see `pull_image`), the `duration` of the pull (in
+    seconds) and its `size` (in bytes, `None` if unknown).
+    """
+    images = list(images)
+    if not images:
+        return {}
+
+    def _pull(image):
+        start = time.monotonic()
+        result = pull_image(image)
+        if result is not None:
+            result["duration"] = round(time.monotonic() - start, 3)
+        return result
+
+    with ThreadPoolExecutor(max_workers=max(1, int(concurrency))) as executor:
+        ret = dict(zip(images, executor.map(_pull, images)))
+
+    if any(ret.values()):
+        index = _images_index(list_images())
+        for image, result in ret.items():
+            if result is not None:
+                size = index.get(image, {}).get("size")
+                result["size"] = int(size) if size is not None else None
+
+    return ret
+
+
 def execute(name, command, *args):
     """
     Run a command in a container.
 
     .. note::
 
-       This uses the :command:`crictl` command, which should be configured
-       correctly on the system, e.g. in :file:`/etc/crictl.yaml`.
+       This uses the CRI API directly when possible, and the :command:`crictl`
+       command otherwise, which should be configured correctly on the system,
+       e.g. in :file:`/etc/crictl.yaml`.
 
     name
         Name of the target container
@@ -116,15 +224,24 @@ def execute(name, command, *args):
         Command parameters
     """
     log.info('Retrieving ID of container "%s"', name)
-    out = __salt__["cmd.run_all"](
-        f'crictl ps -q --label io.kubernetes.container.name="{name}"'
+    containers = _client_call(
+        "list_containers",
+        labels={"io.kubernetes.container.name": name},
+        state="running",
     )
+    if containers is not _NO_CLIENT:
+        container_id = "\n".join(container["id"] for container in containers)
+    else:
+        out = __salt__["cmd.run_all"](
+            f'crictl ps -q --label io.kubernetes.container.name="{name}"'
+        )
 
-    if out["retcode"] != 0:
-        log.error('Failed to find container "%s"', name)
-        return None
+        if out["retcode"] != 0:
+            log.error('Failed to find container "%s"', name)
+            return None
+
+        container_id = out["stdout"]
 
-    container_id = out["stdout"]
     if not container_id:
         log.error('Container "%s" does not exists', name)
         return None
@@ -147,8 +264,9 @@ def wait_container(name, state, timeout=60, delay=5):
 
     .. note::
 
-       This uses the :command:`crictl` command, which should be configured
-       correctly on the system, e.g. in :file:`/etc/crictl.yaml`.
+       This uses the CRI API directly when possible, and the :command:`crictl`
+       command otherwise, which should be configured correctly on the system,
+       e.g. in :file:`/etc/crictl.yaml`.
 
     name
         Name of the target container
@@ -157,7 +275,8 @@ def wait_container(name, state, timeout=60, delay=5):
     timeout
         Maximum time in sec to wait for container to reach given state
     delay
-        Interval in sec between 2 checks
+        Maximum interval in sec between 2 checks (checks start every
+        `POLL_MIN_INTERVAL` seconds, with an exponential backoff)
     """
     log.info('Waiting for container "%s" to be in state "%s"', name, state)
 
@@ -166,17 +285,33 @@ def wait_container(name, state, timeout=60, delay=5):
         opts += f" --state {state}"
 
     last_error = None
-    for _ in range(0, timeout, delay):
-        out = __salt__["cmd.run_all"](f"crictl ps -q {opts}")
-
-        if out["retcode"] == 0:
-            if out["stdout"]:
-                return True
+    waited = 0
+    intervals = _poll_intervals(delay)
+    while True:
+        # Like `crictl ps`, only consider running containers by default
+        containers = _client_call(
+            "list_containers",
+            labels={"io.kubernetes.container.name": name},
+            state=state or "running",
+        )
+        if containers is _NO_CLIENT:
+            out = __salt__["cmd.run_all"](f"crictl ps -q {opts}")
+            if out["retcode"] == 0:
+                containers = out["stdout"].splitlines()
+            else:
+                containers = None
+                last_error = out["stderr"] or out["stdout"]
+
+        if containers:
+            return True
+        if containers is not None:
             last_error = "No container found"
-        else:
-            last_error = out["stderr"] or out["stdout"]
 
-        time.sleep(delay)
+        if waited >= timeout:
+            break
+        interval = min(next(intervals), timeout - waited)
+        time.sleep(interval)
+        waited += interval
 
     error_msg = f'Failed to find container "{name}"'
     if state is not None:
@@ -191,10 +326,15 @@ def component_is_running(name):
 
     .. note::
 
-       This uses the :command:`crictl` command, which should be configured
-       correctly on the system, e.g. in :file:`/etc/crictl.yaml`.
+       This uses the CRI API directly when possible, and the :command:`crictl`
+       command otherwise, which should be configured correctly on the system,
+       e.g. in :file:`/etc/crictl.yaml`.
     """
     log.info("Checking if compopent %s is running", name)
+    pods = _client_call("list_pod_sandboxes", labels={"component": name}, state="ready")
+    if pods is not _NO_CLIENT:
+        return len(pods) != 0
+
     out = __salt__["cmd.run_all"](
         f"crictl pods --label component={name} --state=ready -o json"
     )
@@ -209,8 +349,9 @@ def ready(timeout=10, retry=5):
 
     .. note::
 
-        This uses the :command:`crictl version` command, which should be
-        configured correctly on the system, e.g. in :file:`/etc/crictl.yaml`.
+       This uses the CRI API directly when possible, and the
+       :command:`crictl version` command otherwise, which should be
+       configured correctly on the system, e.g. in :file:`/etc/crictl.yaml`.
 
     timeout
         time, in seconds, to wait for container engine to respond
@@ -218,6 +359,9 @@ def ready(timeout=10, retry=5):
         number of retries to do
     """
     for attempts in range(1, retry + 1):
+        if _client_call("version", timeout=timeout) is not _NO_CLIENT:
+            return True
+
         cmd = f"crictl --timeout={timeout}s version"
         ret = __salt__["cmd.run_all"](cmd)
         if ret["retcode"] == 0:
@@ -243,13 +387,23 @@ def stop_pod(labels):
 
     .. note::
 
-       This uses the :command:`crictl` command, which should be configured
-       correctly on the system, e.g. in :file:`/etc/crictl.yaml`.
+       This uses the CRI API directly when possible, and the :command:`crictl`
+       command otherwise, which should be configured correctly on the system,
+       e.g. in :file:`/etc/crictl.yaml`.
     """
     pod_ids = get_pod_id(labels=labels, ignore_not_found=True, multiple=True)
     if not pod_ids:
         return "No pods to stop"
 
+    stopped = []
+    for pod_id in pod_ids:
+        if _client_call("stop_pod_sandbox", pod_id) is _NO_CLIENT:
+            break
+        # Same output as `crictl stopp`
+        stopped.append(f"Stopped sandbox {pod_id}")
+    else:
+        return "\n".join(stopped)
+
     out = __salt__["cmd.run_all"](f"crictl stopp {' '.join(pod_ids)}")
 
     if out["retcode"] != 0:
@@ -269,8 +423,9 @@ def get_pod_id(
 
     .. note::
 
-       This uses the :command:`crictl` command, which should be configured
-       correctly on the system, e.g. in :file:`/etc/crictl.yaml`.
+       This uses the CRI API directly when possible, and the :command:`crictl`
+       command otherwise, which should be configured correctly on the system,
+       e.g. in :file:`/etc/crictl.yaml`.
 
     name (str, optional)
         Name of the target pod
@@ -302,14 +457,22 @@ def get_pod_id(
         info_parts.append(f"state '{state}'")
     info = f"with {' and '.join(info_parts)}"
 
-    pod_ids_out = __salt__["cmd.run_all"](pod_ids_cmd)
-    if pod_ids_out["retcode"] != 0:
-        raise CommandExecutionError(
-            f"Unable to get pod {info}:\n"
-            f"STDERR: {pod_ids_out['stderr']}\nSTDOUT: {pod_ids_out['stdout']}"
-        )
-
-    pod_ids = pod_ids_out["stdout"].splitlines()
+    pods = _client_call("list_pod_sandboxes", labels=labels, state=state)
+    if pods is not _NO_CLIENT:
+        # Same filtering and ordering as `crictl pods`
+        if name is not None:
+            pods = [pod for pod in pods if re.search(name, pod["metadata"]["name"])]
+        pods.sort(key=lambda pod: int(pod.get("createdAt", 0)), reverse=True)
+        pod_ids = [pod["id"] for pod in pods]
+    else:
+        pod_ids_out = __salt__["cmd.run_all"](pod_ids_cmd)
+        if pod_ids_out["retcode"] != 0:
+            raise CommandExecutionError(
+                f"Unable to get pod {info}:\n"
+                f"STDERR: {pod_ids_out['stderr']}\nSTDOUT: {pod_ids_out['stdout']}"
+            )
+
+        pod_ids = pod_ids_out["stdout"].splitlines()
     if not pod_ids:
         if ignore_not_found:
             return None
@@ -331,8 +494,9 @@ def wait_pod(
 
     .. note::
 
-       This uses the :command:`crictl` command, which should be configured
-       correctly on the system, e.g. in :file:`/etc/crictl.yaml`.
+       This uses the CRI API directly when possible, and the :command:`crictl`
+       command otherwise, which should be configured correctly on the system,
+       e.g. in :file:`/etc/crictl.yaml`.
 
     name (str)
         Name of the target pod
@@ -349,14 +513,16 @@ def wait_pod(
         Number of seconds to wait before bailing out
 
     sleep (int)
-        Number of seconds to wait between two checks
+        Maximum number of seconds to wait between two checks (checks start
+        every `POLL_MIN_INTERVAL` seconds, with an exponential backoff)
 
     raise_on_timeout (bool)
         Whether to raise if the timeout period is exceeded (otherwise, return False)
     """
     start_time = time.time()
+    intervals = _poll_intervals(sleep)
 
-    while time.time() - start_time < timeout:
+    while True:
         current_ids = get_pod_id(
             name=name,
             state=state,
@@ -366,9 +532,10 @@ def wait_pod(
         if current_ids and last_id not in current_ids:
             return True
         remaining = timeout + start_time - time.time()
-        if remaining < sleep:  # Don't sleep if we know it's going to time out
+        if remaining <= 0:
             break
-        time.sleep(sleep)
+        # Do a last check when reaching the timeout
+        time.sleep(min(next(intervals), remaining))
 
     if raise_on_timeout:
         verb = "updated" if last_id else "created"
@@ -2,8 +2,11 @@
 """
 Module for handling MetalK8s specific calls.
 """
+import copy
 import functools
+import hashlib
 import itertools
+import json
 import logging
 import os.path
 import re
@@ -27,6 +30,33 @@ __virtualname__ = "metalk8s"
 
 BOOTSTRAP_CONFIG = "/etc/metalk8s/bootstrap.yaml"
 
+# Files, in the saltenv, from which `map.jinja` values are computed
+MAP_SOURCES = [
+    "metalk8s/map.jinja",
+    "metalk8s/defaults.yaml",
+    "metalk8s/versions.json",
+]
+# Grains used in `map.jinja`
+MAP_GRAINS = ["os", "os_family", "osmajorrelease"]
+# Pillar keys from which `map.jinja` values are merged, when not named after
+# the value (`defaults` being merged with the whole pillar)
+MAP_PILLAR_KEYS = {
+    "nginx_ingress": "nginx-ingress",
+    "package_exclude_list": "repo",
+}
+# Minion option enabling the disk cache of `get_from_map` values
+MAP_CACHE_OPTION = "metalk8s_map_disk_cache"
+# Disk cache of the values computed by `get_from_map`, in the Salt cachedir
+MAP_CACHE_DIR = "metalk8s/map-cache"
+# Maximum number of values in this cache
+MAP_CACHE_SIZE = 32
+# File, in the Salt cachedir, listing the pillar keys found by the last
+# successful `check_pillar_keys` (the pillar itself is not stored, as it
+# may hold private keys)
+PILLAR_KEYS_CACHE = "metalk8s/pillar-keys.json"
+# Default number of seconds a successful `check_pillar_keys` is reused
+PILLAR_KEYS_TTL = 10
+
 
 def __virtual__():
     return __virtualname__
@@ -119,6 +149,48 @@ def minions_by_role(role, nodes=None):
     ]
 
 
+def upgrade_waves(node_list=None, batch_size=1, nodes=None):
+    """Split nodes into waves of nodes that can be upgraded at the same time.
+
+    Control-plane (`master`) and `etcd` nodes are upgraded one at a time,
+    control-plane nodes first, then the other nodes are upgraded by batches
+    of `batch_size` nodes.
+
+    Arguments:
+        node_list (list(str)): Nodes to upgrade
+            Defaults to all the nodes from `nodes`.
+        batch_size (int): Maximum number of non control-plane nodes in a wave
+        nodes (dict(str, dict)): Nodes to inspect
+            Defaults to `pillar.metalk8s.nodes`.
+
+    Returns:
+        A list of waves, each of them being a list of node names
+    """
+    try:
+        batch_size = max(1, int(batch_size))
+    except (TypeError, ValueError) as exc:
+        raise CommandExecutionError(f"Invalid batch size '{batch_size}'") from exc
+
+    # NOTE: `minions_by_role` also checks the pillar for errors
+    master_nodes = set(minions_by_role("master", nodes))
+    etcd_nodes = set(minions_by_role("etcd", nodes))
+
+    if node_list is None:
+        node_list = (
+            nodes if nodes is not None else __pillar__["metalk8s"]["nodes"]
+        ).keys()
+    node_list = set(node_list)
+
+    cp_nodes = sorted(master_nodes & node_list)
+    etcd_nodes = sorted(etcd_nodes & node_list - master_nodes)
+    other_nodes = sorted(node_list - master_nodes - set(etcd_nodes))
+
+    return [[node] for node in cp_nodes + etcd_nodes] + [
+        other_nodes[index : index + batch_size]
+        for index in range(0, len(other_nodes), batch_size)
+    ]
+
+
 def _get_archive_version(info):
     """Extract archive version from info
 
@@ -304,16 +376,93 @@ def get_archives(archives=None):
     return res
 
 
-def check_pillar_keys(keys, refresh=True, pillar=None, raise_error=True):
+def _pillar_keys_cache_file():
+    cachedir = __opts__.get("cachedir")
+    if not cachedir:
+        return None
+    return os.path.join(cachedir, PILLAR_KEYS_CACHE)
+
+
+def _read_pillar_keys_cache(env, ttl):
+    cache_file = _pillar_keys_cache_file()
+    if cache_file is None:
+        return []
+
+    try:
+        with open(cache_file, "r", encoding="utf-8") as fd:
+            content = json.load(fd)
+    except (OSError, ValueError):
+        return []
+
+    if content.get("env") != env or time.time() - content["timestamp"] > ttl:
+        return []
+
+    return content["keys"]
+
+
+def _write_pillar_keys_cache(env, keys):
+    cache_file = _pillar_keys_cache_file()
+    if cache_file is None:
+        return
+
+    tmp_file = f"{cache_file}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+        with open(tmp_file, "w", encoding="utf-8") as fd:
+            json.dump({"env": env, "timestamp": time.time(), "keys": keys}, fd)
+        os.replace(tmp_file, cache_file)
+    except (OSError, TypeError, ValueError) as exc:
+        log.debug("Unable to store checked pillar keys in cache: %s", exc)
+
+
+def check_pillar_keys(
+    keys,
+    refresh=True,
+    pillar=None,
+    raise_error=True,
+    targeted=True,
+    ttl=PILLAR_KEYS_TTL,
+):
     """Check that some pillar keys are available and not empty, `None`, 0
 
+    When refreshing the pillar, if all the keys are provided by MetalK8s
+    ext_pillars, only these ext_pillars (and the ones they rely on) are
+    evaluated by the master.
+    Keys found by a refresh are remembered for `ttl` seconds, so that
+    checking them again in this period does not compile the pillar.
+
     Arguments:
         keys (list): list of keys to check
         refresh (bool): refresh pillar or not
         pillar (dict): pillar dict to check
+        targeted (bool): only evaluate the ext_pillars providing the keys
+            when refreshing the pillar
+        ttl (int): number of seconds keys found by a refresh are reused
+            (0 to always refresh)
     """
+    if not isinstance(keys, list):
+        keys = [keys]
+
+    key_lists = [
+        key_list if isinstance(key_list, list) else key_list.split(".")
+        for key_list in keys
+    ]
+    env = [__opts__.get("saltenv"), __opts__.get("pillarenv")]
+
     # Ignore `refresh` if pillar is provided
-    if not pillar and refresh:
+    refreshed = not pillar and refresh
+    if refreshed:
+        cached_keys = _read_pillar_keys_cache(env, ttl) if ttl else []
+        if all(key_list in cached_keys for key_list in key_lists):
+            log.debug("Pillar keys already checked less than %s seconds ago", ttl)
+            return True
+
+        extra_minion_data = None
+        if targeted:
+            extra_minion_data = __utils__["pillar_utils.sources_minion_data"](key_lists)
+            if extra_minion_data:
+                log.debug("Only compiling needed ext_pillars: %s", extra_minion_data)
+
         # Do not use `saltutil.refresh_pillar` as in salt 2018.3 we can not do
         # synchronous pillar refresh
         # See https://github.com/saltstack/salt/issues/20590
@@ -323,21 +472,16 @@ def check_pillar_keys(keys, refresh=True, pillar=None, raise_error=True):
             __grains__["id"],
             saltenv=__opts__.get("saltenv"),
             pillarenv=__opts__.get("pillarenv"),
+            extra_minion_data=extra_minion_data,
         ).compile_pillar()
 
     if not pillar:
         pillar = __pillar__
 
-    if not isinstance(keys, list):
-        keys = [keys]
-
     errors = []
 
-    for key_list in keys:
+    for key_list in key_lists:
         value = pillar
-        if not isinstance(key_list, list):
-            key_list = key_list.split(".")
-
         for key in key_list:
             error = value.get("_errors")
             value = value.get(key)
@@ -357,52 +501,98 @@ def check_pillar_keys(keys, refresh=True, pillar=None, raise_error=True):
             log.error("\n".join(errors))
             return False
 
-    return True
-
+    if refreshed and ttl:
+        _write_pillar_keys_cache(env, key_lists)
 
-def format_slots(data):
-    """Helper to replace slots in nested dictionnary
-
-    "__slots__:salt:module.function(arg1, arg2, kwarg1=abc, kwargs2=cde)
+    return True
 
-    Arguments:
-        data: Data structure to format
-    """
-    slots_callers = {"salt": __salt__}
 
-    if isinstance(data, list):
-        return [format_slots(elt) for elt in data]
+SLOT_PREFIX = "__slot__:"
 
-    if isinstance(data, dict):
-        return {key: format_slots(value) for key, value in data.items()}
 
-    if isinstance(data, six.string_types) and data.startswith("__slot__:"):
-        fmt = data.split(":", 2)
-        if len(fmt) != 3:
-            log.warning(
-                "Malformed slot %s: expecting "
-                "'__slot__:<caller>:<module>.<function>(...)'",
-                data,
-            )
-            return data
-        if fmt[1] not in slots_callers:
-            log.warning(
-                "Malformed slot '%s': invalid caller, must use one of '%s'",
-                data,
-                "', '".join(slots_callers.keys()),
-            )
-            return data
+def _format_slot(data, slots_callers, results):
+    fmt = data.split(":", 2)
+    if len(fmt) != 3:
+        log.warning(
+            "Malformed slot %s: expecting "
+            "'__slot__:<caller>:<module>.<function>(...)'",
+            data,
+        )
+        return data
+    if fmt[1] not in slots_callers:
+        log.warning(
+            "Malformed slot '%s': invalid caller, must use one of '%s'",
+            data,
+            "', '".join(slots_callers.keys()),
+        )
+        return data
 
+    if data not in results:
         fun, args, kwargs = salt.utils.args.parse_function(fmt[2])
 
         try:
-            return slots_callers[fmt[1]][fun](*args, **kwargs)
+            results[data] = slots_callers[fmt[1]][fun](*args, **kwargs)
         except Exception as exc:
             raise CommandExecutionError(f"Unable to compute slot '{data}'") from exc
 
+    return results[data]
+
+
+def _needs_formatting(data):
+    return isinstance(data, (dict, list)) or (
+        isinstance(data, six.string_types) and data.startswith(SLOT_PREFIX)
+    )
+
+
+def _format_slots(data, slots_callers, results):
+    if isinstance(data, dict):
+        formatted = None
+        for key, value in data.items():
+            # Only recurse on containers and slots, most values are scalars
+            if not _needs_formatting(value):
+                continue
+            new_value = _format_slots(value, slots_callers, results)
+            if new_value is not value:
+                if formatted is None:
+                    formatted = dict(data)
+                formatted[key] = new_value
+        return data if formatted is None else formatted
+
+    if isinstance(data, list):
+        formatted = None
+        for index, elt in enumerate(data):
+            if not _needs_formatting(elt):
+                continue
+            new_elt = _format_slots(elt, slots_callers, results)
+            if new_elt is not elt:
+                if formatted is None:
+                    formatted = list(data)
+                formatted[index] = new_elt
+        return data if formatted is None else formatted
+
+    if isinstance(data, six.string_types) and data.startswith(SLOT_PREFIX):
+        return _format_slot(data, slots_callers, results)
+
     return data
 
 
+def format_slots(data):
+    """Helper to replace slots in nested dictionnary
+
+    "__slots__:salt:module.function(arg1, arg2, kwarg1=abc, kwargs2=cde)
+
+    The data structure is not copied: only the dicts and lists containing
+    slots are rebuilt, everything else is returned as is (so the result must
+    be copied before being modified). Each slot is only computed once.
+
+    Arguments:
+        data: Data structure to format
+    """
+    slots_callers = {"salt": __salt__}
+
+    return _format_slots(data, slots_callers, {})
+
+
 def cmp_sorted(*args, **kwargs):
     """Helper to sort a list using a function to compare (as `cmp` in Python2)
 
@@ -627,7 +817,93 @@ def manage_static_pod_manifest(
     return ret
 
 
-def get_from_map(value, saltenv=None):
+def _map_cache_key(value, saltenv):
+    """Compute the key of a `map.jinja` value in the cache.
+
+    The key changes whenever any input of `map.jinja` changes: the files it
+    reads (through their hash in the saltenv), the grains it uses or the
+    pillar. Returns `None` if a file cannot be found.
+    """
+    sources = []
+    for source in MAP_SOURCES:
+        source_hash = __salt__["cp.hash_file"](f"salt://{source}", saltenv)
+        if not source_hash:
+            log.debug("Unable to hash %s in saltenv %s", source, saltenv)
+            return None
+        sources.append(source_hash["hsum"])
+
+    fingerprint = {
+        "value": value,
+        "saltenv": saltenv,
+        "sources": sources,
+        "grains": {grain: __grains__.get(grain) for grain in MAP_GRAINS},
+        "pillar": __pillar__,
+    }
+
+    return hashlib.sha256(
+        json.dumps(fingerprint, sort_keys=True, default=str).encode()
+    ).hexdigest()
+
+
+def _map_cache_file(value, key):
+    """Find the disk cache file of a `map.jinja` value, if it may be stored.
+
+    Only values not merged with the pillar are stored, since it holds private
+    data (e.g. `metalk8s.private`), and only if enabled with the
+    `metalk8s_map_disk_cache` minion option.
+    """
+    cachedir = __opts__.get("cachedir")
+    if not cachedir or not __opts__.get(MAP_CACHE_OPTION, False):
+        return None
+    if value == "defaults" or MAP_PILLAR_KEYS.get(value, value) in __pillar__:
+        return None
+    return os.path.join(cachedir, MAP_CACHE_DIR, f"{key}.json")
+
+
+def _read_map_cache(value, key):
+    cache_file = _map_cache_file(value, key)
+    if cache_file is None:
+        return None
+
+    try:
+        with salt.utils.files.fopen(cache_file, "r") as fd:
+            return json.load(fd)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_map_cache(value, key, result):
+    cache_file = _map_cache_file(value, key)
+    if cache_file is None:
+        return
+
+    cache_dir = os.path.dirname(cache_file)
+    tmp_file = f"{cache_file}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(cache_dir, mode=0o700, exist_ok=True)
+        os.chmod(cache_dir, 0o700)
+        with salt.utils.files.set_umask(0o077), salt.utils.files.fopen(
+            tmp_file, "w"
+        ) as fd:
+            json.dump(result, fd)
+        os.replace(tmp_file, cache_file)
+
+        entries = sorted(
+            (
+                os.path.join(cache_dir, entry)
+                for entry in os.listdir(cache_dir)
+                if entry.endswith(".json")
+            ),
+            key=os.path.getmtime,
+            reverse=True,
+        )
+        for entry in entries[MAP_CACHE_SIZE:]:
+            os.remove(entry)
+    except (OSError, TypeError, ValueError) as exc:
+        log.debug("Unable to store map value in cache: %s", exc)
+
+
+def get_from_map(value, saltenv=None, use_cache=True):
     """Get a value from map.jinja so that we have an up to date value
     computed from defaults.yaml and pillar.
 
@@ -636,9 +912,17 @@ def get_from_map(value, saltenv=None):
 
     Also add logic to retrieve the saltenv using version in the pillar.
 
+    Computed values are cached in memory for the current run, keyed on the
+    saltenv, the value name and a fingerprint of the `map.jinja` inputs
+    (files, grains and pillar), so a change in any of these inputs gives a
+    new key. If the `metalk8s_map_disk_cache` minion option is set, values
+    not merged with the pillar are also cached on disk, in the Salt cachedir,
+    for the next runs.
+
     Arguments:
 
         value (str): Name of the value to retrieve
+        use_cache (bool): Whether or not to use the cache
 
     CLI Example:
 
@@ -667,6 +951,15 @@ def get_from_map(value, saltenv=None):
         else:
             saltenv = f"metalk8s-{current_version}"
 
+    cache_key = _map_cache_key(value, saltenv) if use_cache else None
+    if cache_key:
+        cache = __context__.setdefault("metalk8s.get_from_map", {})
+        if cache_key not in cache:
+            cache[cache_key] = _read_map_cache(value, cache_key)
+        if cache[cache_key] is not None:
+            log.debug("Using cached value of %s for saltenv %s", value, saltenv)
+            return copy.deepcopy(cache[cache_key])
+
     tmplstr = textwrap.dedent(
         """\
         {{% from "{path}" import {value} with context %}}
@@ -675,7 +968,7 @@ def get_from_map(value, saltenv=None):
             path=path, value=value
         )
     )
-    return salt.template.compile_template(
+    result = salt.template.compile_template(
         ":string:",
         salt.loader.render(__opts__, __salt__),
         __opts__["renderer"],
@@ -685,6 +978,12 @@ def get_from_map(value, saltenv=None):
         saltenv=saltenv,
     )
 
+    if cache_key:
+        cache[cache_key] = copy.deepcopy(result)
+        _write_map_cache(value, cache_key, result)
+
+    return result
+
 
 def get_bootstrap_config():
     """Return the bootstrap config file content"""
@@ -8,9 +8,14 @@ This module's functions are merged into the `metalk8s_kubernetes`
 module when called by salt by virtue of its `__virtualname__` attribute.
 """
 
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+import functools
 import json
 import logging
 import operator
+import random
+import re
+import threading
 import time
 
 from salt.exceptions import CommandExecutionError
@@ -105,6 +110,41 @@ def _get_controller_of(pod):
     return None
 
 
+def _controller_key(namespace, controller_ref):
+    """Identify a controller, as a (namespace, apiVersion, kind, name) tuple."""
+    return (
+        namespace,
+        controller_ref["apiVersion"],
+        controller_ref["kind"],
+        controller_ref["name"],
+    )
+
+
+def _pod_key(pod):
+    """Identify a pod instance, as a (namespace, name, UID) tuple."""
+    metadata = pod["metadata"]
+    return metadata.get("namespace"), metadata["name"], metadata.get("uid")
+
+
+def _watch_pods(resource_version=None, timeout=None, field_selector=None, **kwargs):
+    """Watch pods in all namespaces.
+
+    Returns a generator of events, see `watch_objects` in the
+    `metalk8s_kubernetes` utils.
+    """
+    kubeconfig, context = __salt__["metalk8s_kubernetes.get_kubeconfig"](**kwargs)
+    return __utils__["metalk8s_kubernetes.watch_objects"](
+        kubeconfig=kubeconfig,
+        context=context,
+        kind="Pod",
+        apiVersion="v1",
+        all_namespaces=True,
+        field_selector=field_selector,
+        resource_version=resource_version,
+        timeout=timeout,
+    )
+
+
 def _message_from_pods_dict(errors_dict):
     """Form a message string from a 'pod kind': [pod name...] dict.
 
@@ -132,6 +172,13 @@ class Drain(object):
 
     # According to `kubectl` code, this value should be 1 second by default
     KUBECTL_INTERVAL = 1
+    # Number of evictions created concurrently
+    EVICTION_WORKERS = 8
+    # Backoff between eviction attempts of a blocked pod, in seconds
+    # (`kubectl` waits 5 seconds between each attempt)
+    EVICTION_BACKOFF = 5
+    EVICTION_BACKOFF_MAX = 60
+    EVICTION_BACKOFF_JITTER = 0.2
     WARNING_MSG = {
         "daemonset": "Ignoring DaemonSet-managed pods",
         "localStorage": "Deleting pods with local storage",
@@ -161,6 +208,9 @@ class Drain(object):
         timeout=0,
         delete_local_data=False,
         best_effort=False,
+        workers=None,
+        budgets=None,
+        watcher=None,
         **kwargs,
     ):
         self._node_name = node_name
@@ -172,7 +222,15 @@ class Drain(object):
         self._timeout = timeout or 3600
         self._delete_local_data = delete_local_data
         self._best_effort = best_effort
+        self._workers = workers or self.EVICTION_WORKERS
+        self._budgets = budgets
+        self._watcher = watcher or EvictionWatcher(node_name, **kwargs)
         self._kwargs = kwargs
+        self._blocked_time = {}
+        self._timings = {}
+        # Controllers retrieved during this drain, keyed on
+        # (namespace, apiVersion, kind, name)
+        self._controllers = {}
 
     node_name = property(operator.attrgetter("_node_name"))
     force = property(operator.attrgetter("_force"))
@@ -181,6 +239,17 @@ class Drain(object):
     ignore_pending = property(operator.attrgetter("_ignore_pending"))
     timeout = property(operator.attrgetter("_timeout"))
     delete_local_data = property(operator.attrgetter("_delete_local_data"))
+    workers = property(operator.attrgetter("_workers"))
+
+    @property
+    def blocked_time(self):
+        """Time spent blocked, in seconds, per PodDisruptionBudget."""
+        return dict(self._blocked_time)
+
+    @property
+    def timings(self):
+        """Duration of each drain phase, in seconds."""
+        return dict(self._timings)
 
     def localstorage_filter(self, pod):
         """Compute eviction status for the pod according to local storage.
@@ -225,6 +294,8 @@ class Drain(object):
     def get_controller(self, namespace, controller_ref):
         """Get the controller object from a reference to it
 
+        Controllers are cached for the whole drain, see `prefetch_controllers`.
+
         Args:
           - namespace: the queried controller's namespace
           - controller_ref: the queried controller's reference
@@ -233,8 +304,12 @@ class Drain(object):
           - None if not found
         Raises: CommandExecutionError if API fails
         """
+        key = _controller_key(namespace, controller_ref)
+        if key in self._controllers:
+            return self._controllers[key]
+
         try:
-            return __salt__["metalk8s_kubernetes.get_object"](
+            controller = __salt__["metalk8s_kubernetes.get_object"](
                 name=controller_ref["name"],
                 kind=controller_ref["kind"],
                 apiVersion=controller_ref["apiVersion"],
@@ -247,8 +322,62 @@ class Drain(object):
             if isinstance(exc.__cause__, ValueError) and "Unknown object type" in str(
                 exc.__cause__
             ):
-                return None
-            raise
+                controller = None
+            else:
+                raise
+
+        self._controllers[key] = controller
+        return controller
+
+    def prefetch_controllers(self, pods):
+        """Retrieve the controllers of all pods, with a single LIST per kind.
+
+        Controllers found are cached for `get_controller`, and referenced
+        controllers which do not exist are cached as missing. If a kind
+        cannot be listed, its controllers are retrieved one by one later on.
+
+        Args:
+          - pods: the pods for which we want the controllers
+        Returns: None
+        """
+        refs_by_kind = {}
+        for pod in pods:
+            controller_ref = _get_controller_of(pod)
+            if controller_ref is None:
+                continue
+            key = _controller_key(pod["metadata"]["namespace"], controller_ref)
+            if key not in self._controllers:
+                refs_by_kind.setdefault(key[1:3], set()).add(key)
+
+        for (api_version, kind), keys in refs_by_kind.items():
+            namespaces = {key[0] for key in keys}
+            list_kwargs = dict(self._kwargs)
+            if len(namespaces) == 1:
+                list_kwargs["namespace"] = next(iter(namespaces))
+            else:
+                list_kwargs["all_namespaces"] = True
+
+            try:
+                controllers = __salt__["metalk8s_kubernetes.list_objects"](
+                    kind=kind, apiVersion=api_version, **list_kwargs
+                )
+            except CommandExecutionError as exc:
+                log.debug(
+                    "Unable to list %s/%s controllers: %s", api_version, kind, exc
+                )
+                continue
+
+            found = {
+                (
+                    controller["metadata"]["namespace"],
+                    api_version,
+                    kind,
+                    controller["metadata"]["name"],
+                ): controller
+                for controller in controllers
+            }
+            for key in keys:
+                self._controllers[key] = found.get(key)
 
     def get_pod_controller(self, pod):
         """Get a pod's controller object reference
@@ -318,13 +447,9 @@ class Drain(object):
 
         return False, self.WARNING_MSG["daemonset"]
 
-    def get_pods_for_eviction(self):
-        """Compute node drain status according to deletable pods."""
-        warnings = {}
-        failures = {}
-        pods = []
-
-        all_pods = __salt__["metalk8s_kubernetes.list_objects"](
+    def list_node_pods(self):
+        """List all pods running on the targeted node, with a single LIST."""
+        return __salt__["metalk8s_kubernetes.list_objects"](
             kind="Pod",
             apiVersion="v1",
             all_namespaces=True,
@@ -332,6 +457,15 @@ class Drain(object):
             **self._kwargs,
         )
 
+    def get_pods_for_eviction(self):
+        """Compute node drain status according to deletable pods."""
+        warnings = {}
+        failures = {}
+        pods = []
+
+        all_pods = self.list_node_pods()
+        self.prefetch_controllers(all_pods)
+
         for pod in all_pods:
             is_deletable = True
             for pod_filter in (
@@ -373,6 +507,7 @@ class Drain(object):
         Raises: CommandExecutionError in case of timeout or eviction failure
         """
         log.debug("Beginning drain of Node %s", self.node_name)
+        start = time.time()
         try:
             pods = self.get_pods_for_eviction()
         except DrainException as exc:
@@ -383,6 +518,8 @@ class Drain(object):
                     "ignore_daemonset flag."
                 )
             ) from exc
+        finally:
+            self._timings["selection"] = time.time() - start
 
         if pods:
             pods_to_evict = ", ".join([pod["metadata"]["name"] for pod in pods])
@@ -422,27 +559,135 @@ class Drain(object):
                 after the specified timeout value
         """
         self.start_timer()
-        evicted_pods = []
-        for pod in pods:
-            while self.check_timer():
-                evicted = evict_pod(
-                    name=pod["metadata"]["name"],
-                    namespace=pod["metadata"]["namespace"],
-                    grace_period=self.grace_period,
-                    **self._kwargs,
+        evicted_pods = self.create_evictions(pods)
+        self._timings["eviction"] = time.time() - self._start
+
+        start = time.time()
+        self.wait_for_eviction(evicted_pods)
+        self._timings["deletion"] = time.time() - start
+
+    def create_evictions(self, pods):
+        """Create the Evictions for all pods passed.
+
+        Evictions are created concurrently (see `workers`). When an eviction
+        is rejected (e.g. because of a PodDisruptionBudget), the pod is retried
+        with a jittered exponential backoff, honoring the `Retry-After` advice
+        if any, while evictions of other pods keep going. If `budgets` are
+        shared with other drains, evictions are only requested when they
+        allow it.
+
+        Args:
+          - pods: list of Kubernetes API pods to evict
+        Returns: the list of pods for which an Eviction was created
+        Raises: DrainTimeoutException if the eviction process is not complete
+                after the specified timeout value
+        """
+        evicted = set()
+        # Pods to evict, as [next attempt time, attempts done, pod]
+        waiting = [[0, 0, pod] for pod in pods]
+        # Blocked pods, as {pod key: (disruption budget, blocked since)}
+        blocked = {}
+
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                running = {}
+                while waiting or running:
+                    self.check_timer()
+                    now = time.time()
+
+                    waiting.sort(key=operator.itemgetter(0))
+                    while (
+                        waiting and waiting[0][0] <= now and len(running) < self.workers
+                    ):
+                        entry = waiting.pop(0)
+                        _, attempts, pod = entry
+                        budget = None
+                        if self._budgets is not None:
+                            budget = self._budgets.acquire(pod)
+                        if budget is not None:
+                            # Do not even try, this budget does not allow it
+                            if not self._best_effort:
+                                blocked.setdefault(_pod_key(pod), (budget, now))
+                                delay = self.eviction_backoff(attempts)
+                                waiting.append([now + delay, attempts + 1, pod])
+                            continue
+
+                        future = executor.submit(
+                            _create_eviction,
+                            name=pod["metadata"]["name"],
+                            namespace=pod["metadata"]["namespace"],
+                            grace_period=self.grace_period,
+                            **self._kwargs,
+                        )
+                        running[future] = entry
+
+                    if not running:
+                        if waiting:
+                            time.sleep(max(0, min(entry[0] for entry in waiting) - now))
+                        continue
+
+                    done, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        _, attempts, pod = running.pop(future)
+                        result = future.result()
+                        key = _pod_key(pod)
+                        if result["evicted"]:
+                            evicted.add(key)
+                            self._unblock(blocked, key)
+                            continue
+
+                        if self._budgets is not None:
+                            self._budgets.release(pod)
+                        if not self._best_effort:
+                            blocked.setdefault(
+                                key, (result["disruption_budget"], time.time())
+                            )
+                            delay = self.eviction_backoff(
+                                attempts, result["retry_after"]
+                            )
+                            waiting.append([time.time() + delay, attempts + 1, pod])
+        finally:
+            for key in list(blocked):
+                self._unblock(blocked, key)
+            if self._blocked_time:
+                log.info(
+                    "Time spent blocked by PodDisruptionBudgets: %s",
+                    ", ".join(
+                        f"{budget}: {duration:.1f}s"
+                        for budget, duration in sorted(self._blocked_time.items())
+                    ),
                 )
-                if evicted:
-                    evicted_pods.append(pod)
-                    break
 
-                if self._best_effort:
-                    break
-                time.sleep(5)  # kubectl waits 5 seconds
+        return [pod for pod in pods if _pod_key(pod) in evicted]
 
-        self.wait_for_eviction(evicted_pods)
+    def eviction_backoff(self, attempts, retry_after=None):
+        """Compute the delay before the next eviction attempt of a pod.
+
+        Args:
+          - attempts: number of attempts already rejected for this pod, minus one
+          - retry_after: delay advised by the API server, if any
+        Returns: the delay in seconds
+        """
+        delay = min(
+            self.EVICTION_BACKOFF * 2**attempts, self.EVICTION_BACKOFF_MAX
+        ) * random.uniform(
+            1 - self.EVICTION_BACKOFF_JITTER, 1 + self.EVICTION_BACKOFF_JITTER
+        )
+        if retry_after:
+            delay = max(delay, retry_after)
+        return delay
+
+    def _unblock(self, blocked, key):
+        if key not in blocked:
+            return
+        budget, since = blocked.pop(key)
+        budget = budget or "<unknown>"
+        self._blocked_time[budget] = self._blocked_time.get(budget, 0) + (
+            time.time() - since
+        )
 
     def wait_for_eviction(self, pods):
-        """Wait for pods deletion.
+        """Wait for pods deletion, see `EvictionWatcher`.
 
         Args:
           - pods: the list of pods on which eviction was triggered, for which
@@ -451,34 +696,12 @@ class Drain(object):
         Raises: DrainTimeoutException if the eviction process is not complete
                 after the specified timeout value
         """
-        while self.check_timer():
-            self.tick(self.KUBECTL_INTERVAL)
-            pending = []
-            for pod in pods:
-                response = __salt__["metalk8s_kubernetes.get_object"](
-                    kind="Pod",
-                    apiVersion="v1",
-                    name=pod["metadata"]["name"],
-                    namespace=pod["metadata"]["namespace"],
-                    **self._kwargs,
-                )
-                if (
-                    not response
-                    or response["metadata"]["uid"] != pod["metadata"]["uid"]
-                ):
-                    log.info("%s evicted", pod["metadata"]["name"])
-                else:
-                    log.debug(
-                        "Waiting for eviction of Pod %s (current status: %s)",
-                        pod["metadata"]["name"],
-                        pod.get("status", {}).get("phase"),
-                    )
-                    pending.append(pod)
-
-            if not pending:
-                break
-
-            pods = pending
+        self._watcher.wait(
+            pods,
+            self.check_timer,
+            functools.partial(self.tick, self.KUBECTL_INTERVAL),
+            deadline=self._start + self.timeout,
+        )
 
     def start_timer(self):
         self._start = time.time()
@@ -499,14 +722,305 @@ class Drain(object):
         self._tick = time.time()
 
 
-def evict_pod(name, namespace="default", grace_period=1, **kwargs):
-    """Trigger the eviction process for a single pod.
+def _selector_matches(selector, labels):
+    """Check whether some labels match a label selector.
 
     Args:
-        - name          : the name of the pod to evict
-        - namespace     : the namespace of the pod to evict
-        - grace_period  : the time to wait before killing the pod
-    Returns: whether the eviction was successfully created or not
+      - selector: the label selector, with `matchLabels` and `matchExpressions`
+      - labels: the labels to check
+    Returns: whether the labels match, a null selector matching nothing
+    """
+    if selector is None:
+        return False
+
+    labels = labels or {}
+    for key, value in (selector.get("matchLabels") or {}).items():
+        if labels.get(key) != value:
+            return False
+
+    for expression in selector.get("matchExpressions") or []:
+        key = expression["key"]
+        operator_ = expression["operator"]
+        values = expression.get("values") or []
+        if operator_ == "In" and labels.get(key) not in values:
+            return False
+        if operator_ == "NotIn" and key in labels and labels[key] in values:
+            return False
+        if operator_ == "Exists" and key not in labels:
+            return False
+        if operator_ == "DoesNotExist" and key in labels:
+            return False
+
+    return True
+
+
+class DisruptionBudgets(object):
+    """Disruptions allowed by PodDisruptionBudgets, shared between drains.
+
+    Evictions are only requested for pods whose budgets still allow a
+    disruption, accounting for the evictions requested since the budgets were
+    last retrieved, so that concurrent drains never request more evictions
+    than allowed.
+    """
+
+    # Number of seconds after which budgets are retrieved again
+    REFRESH_INTERVAL = 5
+
+    def __init__(self, **kwargs):
+        self._kwargs = kwargs
+        self._lock = threading.Lock()
+        self._budgets = {}
+        self._refreshed_at = None
+        # Incremented each time budgets are retrieved, disruptions reserved
+        # before are already accounted for by the API server
+        self._generation = 0
+        # Disruptions reserved for each pod, as {pod key: (generation, names)}
+        self._acquired = {}
+
+    def _refresh(self):
+        if (
+            self._refreshed_at is not None
+            and time.time() - self._refreshed_at < self.REFRESH_INTERVAL
+        ):
+            return
+
+        self._refreshed_at = time.time()
+        self._generation += 1
+        try:
+            budgets = __salt__["metalk8s_kubernetes.list_objects"](
+                kind="PodDisruptionBudget",
+                apiVersion="policy/v1",
+                all_namespaces=True,
+                **self._kwargs,
+            )
+        except CommandExecutionError as exc:
+            # Budgets are still enforced by the API server
+            log.debug("Unable to list PodDisruptionBudgets: %s", exc)
+            budgets = []
+
+        self._budgets = {
+            f"{budget['metadata']['namespace']}/{budget['metadata']['name']}": {
+                "namespace": budget["metadata"]["namespace"],
+                "selector": (budget.get("spec") or {}).get("selector"),
+                "allowed": (budget.get("status") or {}).get("disruptionsAllowed", 0),
+            }
+            for budget in budgets
+        }
+
+    def _matching(self, pod):
+        metadata = pod["metadata"]
+        return [
+            name
+            for name, budget in self._budgets.items()
+            if budget["namespace"] == metadata["namespace"]
+            and _selector_matches(budget["selector"], metadata.get("labels"))
+        ]
+
+    def acquire(self, pod):
+        """Reserve a disruption for the eviction of a pod.
+
+        Returns: the name of a budget not allowing the eviction, or None if
+                 the disruption is reserved
+        """
+        with self._lock:
+            self._refresh()
+            names = self._matching(pod)
+            for name in names:
+                if self._budgets[name]["allowed"] <= 0:
+                    return name
+            for name in names:
+                self._budgets[name]["allowed"] -= 1
+            self._acquired[_pod_key(pod)] = (self._generation, names)
+            return None
+
+    def release(self, pod):
+        """Release a disruption reserved for a pod whose eviction failed.
+
+        Disruptions reserved before budgets were last retrieved are not
+        released, since the retrieved budgets do not account for them.
+        """
+        with self._lock:
+            generation, names = self._acquired.pop(_pod_key(pod), (None, []))
+            if generation != self._generation:
+                return
+            for name in names:
+                self._budgets[name]["allowed"] += 1
+
+
+class EvictionWatcher(object):
+    """Follow pod deletions on a node, with a single pod watch.
+
+    Pods still present are retrieved with a single LIST of the pods on the
+    node, then deletions are followed with a single watch on these pods,
+    resumed from the last seen resource version. If watching is not possible,
+    pods are listed once per tick instead.
+
+    The pods seen on the node are kept between calls to `wait`, so that pods
+    are only listed again when the watch expires or fails, or when some pods
+    waited for are not among the pods seen on the node.
+    """
+
+    # Maximum duration of a single Pod watch request, in seconds
+    WATCH_TIMEOUT = 60
+
+    def __init__(self, node_name, **kwargs):
+        self._field_selector = f"spec.nodeName={node_name}"
+        self._kwargs = kwargs
+        # Keys of the pods present on the node, from the last LIST and the
+        # events watched since, None until the pods get listed
+        self._present = None
+        self._resource_version = None
+        self._use_watch = True
+
+    def wait(self, pods, check_timer, tick, deadline=None):
+        """Wait for pods deletion.
+
+        Args:
+          - pods: the list of pods on which eviction was triggered, for which
+                  we wait until they are no longer present in API queries.
+          - check_timer: called before each LIST or watch, raises to stop
+                         waiting
+          - tick: called before each LIST, to wait between them
+          - deadline: time after which watch requests are not needed anymore
+        Returns: None
+        """
+        pending = {_pod_key(pod): pod for pod in pods}
+        if self._present is not None and not set(pending) <= self._present:
+            # Pods deleted (or created) since they were last seen
+            self._resource_version = None
+
+        while pending:
+            check_timer()
+
+            if self._resource_version is None:
+                tick()
+                self._resource_version = self._sync(pending)
+                if not pending:
+                    break
+
+            if not self._use_watch or self._resource_version is None:
+                self._resource_version = None
+                continue
+
+            timeout = self.WATCH_TIMEOUT
+            if deadline is not None:
+                timeout = max(1, int(min(timeout, deadline - time.time())))
+
+            try:
+                self._resource_version = self._watch(pending, timeout)
+            except CommandExecutionError as exc:
+                # "410 Gone" means our resource version is too old, so we need
+                # to list the pods again, otherwise stop using the watch
+                if getattr(exc.__cause__, "status", None) != 410:
+                    log.debug("Unable to watch Pods, falling back to polling: %s", exc)
+                    self._use_watch = False
+                self._resource_version = None
+
+    def _sync(self, pending):
+        """Remove evicted pods from `pending`, using a single LIST.
+
+        Args:
+          - pending: dict of pods waiting for eviction, keyed by `_pod_key`
+        Returns: the resource version to start watching from, or None if
+                 it cannot be computed
+        """
+        node_pods = __salt__["metalk8s_kubernetes.list_objects"](
+            kind="Pod",
+            apiVersion="v1",
+            all_namespaces=True,
+            field_selector=self._field_selector,
+            **self._kwargs,
+        )
+        self._present = {_pod_key(pod) for pod in node_pods}
+
+        for key, pod in list(pending.items()):
+            if key not in self._present:
+                log.info("%s evicted", pod["metadata"]["name"])
+                del pending[key]
+            else:
+                log.debug(
+                    "Waiting for eviction of Pod %s (current status: %s)",
+                    pod["metadata"]["name"],
+                    pod.get("status", {}).get("phase"),
+                )
+
+        # Pods resource versions are lower or equal to the one of the list,
+        # watching from the highest one may only replay some events
+        try:
+            return str(
+                max(int(pod["metadata"]["resourceVersion"]) for pod in node_pods)
+            )
+        except (KeyError, TypeError, ValueError):
+            return None
+
+    def _watch(self, pending, timeout):
+        """Remove evicted pods from `pending`, using a single Pod watch.
+
+        Args:
+          - pending: dict of pods waiting for eviction, keyed by `_pod_key`
+          - timeout: maximum duration of the watch, in seconds
+        Returns: the last resource version seen
+        Raises: CommandExecutionError if the watch fails
+        """
+        resource_version = self._resource_version
+        events = _watch_pods(
+            field_selector=self._field_selector,
+            resource_version=resource_version,
+            timeout=timeout,
+            **self._kwargs,
+        )
+
+        for event in events:
+            pod = event["object"]
+            key = _pod_key(pod)
+            resource_version = (
+                pod["metadata"].get("resourceVersion") or resource_version
+            )
+
+            if event["type"] == "DELETED":
+                self._present.discard(key)
+                if key in pending:
+                    del pending[key]
+                    log.info("%s evicted", pod["metadata"]["name"])
+                    if not pending:
+                        break
+            else:
+                self._present.add(key)
+
+        return resource_version
+
+
+def _retry_after(exc, status):
+    """Extract the `Retry-After` advice from an eviction rejection, if any."""
+    headers = getattr(exc, "headers", None) or {}
+    for value in (
+        headers.get("Retry-After"),
+        (status.get("details") or {}).get("retryAfterSeconds"),
+    ):
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            continue
+    return None
+
+
+def _disruption_budget(status, namespace):
+    """Find the PodDisruptionBudget blocking an eviction, if any."""
+    for cause in (status.get("details") or {}).get("causes") or []:
+        if cause.get("reason") != "DisruptionBudget":
+            continue
+        match = re.match(r"The disruption budget (\S+) ", cause.get("message", ""))
+        if match:
+            return f"{namespace}/{match.group(1)}"
+    return None
+
+
+def _create_eviction(name, namespace="default", grace_period=1, **kwargs):
+    """Create an Eviction for a single pod.
+
+    Returns: a dict with `evicted` (whether the eviction was successfully
+             created or not), and for rejected evictions the `retry_after`
+             advice and the `disruption_budget` blocking it, if known
     Raises: CommandExecutionError in case of API error
     """
     delete_options = kubernetes.client.V1DeleteOptions()
@@ -527,6 +1041,8 @@ def evict_pod(name, namespace="default", grace_period=1, **kwargs):
         + "/eviction"
     )
 
+    result = {"evicted": True, "retry_after": None, "disruption_budget": None}
+
     try:
         client.request(
             "post",
@@ -542,24 +1058,46 @@ def evict_pod(name, namespace="default", grace_period=1, **kwargs):
                     "ignoring",
                     name,
                 )
-                return True
+                return result
             if exc.status == 429:
                 # Too Many Requests: the eviction is rejected, but indicates
                 # we should retry later (probably due to a disruption budget)
-                status = json.loads(exc.body, encoding="utf-8")
+                try:
+                    status = json.loads(exc.body)
+                except (TypeError, ValueError):
+                    status = {}
                 log.info(
                     "Cannot evict %s at the moment: %s",
                     name,
-                    status["message"],
+                    status.get("message"),
+                )
+                result.update(
+                    evicted=False,
+                    retry_after=_retry_after(exc, status),
+                    disruption_budget=_disruption_budget(status, namespace),
                 )
-                # When implemented by Kubernetes, read the `Retry-After` advice
-                return False
+                return result
 
         raise CommandExecutionError(
             f'Failed to evict pod "{name}" in namespace "{namespace}"'
         ) from exc
 
-    return True
+    return result
+
+
+def evict_pod(name, namespace="default", grace_period=1, **kwargs):
+    """Trigger the eviction process for a single pod.
+
+    Args:
+        - name          : the name of the pod to evict
+        - namespace     : the namespace of the pod to evict
+        - grace_period  : the time to wait before killing the pod
+    Returns: whether the eviction was successfully created or not
+    Raises: CommandExecutionError in case of API error
+    """
+    return _create_eviction(
+        name, namespace=namespace, grace_period=grace_period, **kwargs
+    )["evicted"]
 
 
 def node_drain(
@@ -572,6 +1110,7 @@ def node_drain(
     delete_local_data=False,
     best_effort=False,
     dry_run=False,
+    workers=None,
     **kwargs,
 ):
     """Trigger the drain process for a node.
@@ -586,6 +1125,7 @@ def node_drain(
       - best_effort       : try to drain the node as much as possible but do not
                             retry/fail if unable to evict some pods
       - dry_run           : only run pod selection process, not eviction
+      - workers           : number of evictions created concurrently
 
     Keyword args: connection parameters, passed through to connection utility
                   module.
@@ -602,8 +1142,85 @@ def node_drain(
         timeout=timeout,
         delete_local_data=delete_local_data,
         best_effort=best_effort,
+        workers=workers,
         **kwargs,
     )
     __salt__["metalk8s_kubernetes.cordon_node"](node_name, **kwargs)
 
     return drainer.run_drain(dry_run=dry_run)
+
+
+def nodes_drain(
+    node_names,
+    max_parallel=1,
+    force=False,
+    grace_period=1,
+    ignore_daemonset=False,
+    ignore_pending=False,
+    timeout=0,
+    delete_local_data=False,
+    best_effort=False,
+    dry_run=False,
+    workers=None,
+    **kwargs,
+):
+    """Trigger the drain process for several nodes, in parallel.
+
+    Drains share the PodDisruptionBudgets accounting, so that evictions
+    requested across nodes never exceed the disruptions allowed, and each
+    drain follows pods deletion with a single watch on the pods of its node.
+
+    Args:
+      - node_names        : list of nodes to drain
+      - max_parallel      : maximum number of nodes drained at the same time
+      - other arguments   : see `node_drain`, applied to each node drain
+
+    Keyword args: connection parameters, passed through to connection utility
+                  module.
+    Returns: a dict with the result, comment and timings of each node drain
+    """
+    budgets = DisruptionBudgets(**kwargs)
+
+    def _drain_node(node_name):
+        drainer = Drain(
+            node_name,
+            force=force,
+            grace_period=grace_period,
+            ignore_daemonset=ignore_daemonset,
+            ignore_pending=ignore_pending,
+            timeout=timeout,
+            delete_local_data=delete_local_data,
+            best_effort=best_effort,
+            workers=workers,
+            budgets=budgets,
+            **kwargs,
+        )
+        start = time.time()
+        ret = {"result": False}
+        log.info("Starting drain of node %s", node_name)
+        try:
+            __salt__["metalk8s_kubernetes.cordon_node"](node_name, **kwargs)
+            ret["comment"] = drainer.run_drain(dry_run=dry_run)
+            ret["result"] = True
+        except CommandExecutionError as exc:
+            ret["comment"] = str(exc)
+
+        ret["duration"] = round(time.time() - start, 3)
+        ret["timings"] = {
+            phase: round(duration, 3) for phase, duration in drainer.timings.items()
+        }
+        ret["blocked_time"] = {
+            budget: round(duration, 3)
+            for budget, duration in drainer.blocked_time.items()
+        }
+        log.info(
+            "Drain of node %s %s after %.1f seconds",
+            node_name,
+            "completed" if ret["result"] else "failed",
+            ret["duration"],
+        )
+        return ret
+
+    with ThreadPoolExecutor(max_workers=max(1, int(max_parallel))) as executor:
+        results = executor.map(_drain_node, node_names)
+        return dict(zip(node_names, results))
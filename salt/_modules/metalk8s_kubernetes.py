@@ -9,6 +9,7 @@ module, while other methods can be found in `metalk8s_kubernetes_utils.py`,
 `metalk8s_drain.py` and `metalk8s_cordon.py`.
 """
 
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 import json
 import logging
@@ -17,6 +18,7 @@ import re
 from salt.exceptions import CommandExecutionError
 from salt.utils import yaml
 import salt.utils.data
+import salt.utils.hashutils
 
 MISSING_DEPS = []
 
@@ -36,6 +38,13 @@ log = logging.getLogger(__name__)
 
 __virtualname__ = "metalk8s_kubernetes"
 
+# Annotation holding the digest of the last manifest applied by `apply_object`
+APPLIED_DIGEST_ANNOTATION = "metalk8s.scality.com/applied-digest"
+# Field manager used for server-side apply
+FIELD_MANAGER = "salt"
+# Maximum number of concurrent requests sent by `get_objects`
+GET_OBJECTS_WORKERS = 8
+
 
 def __virtual__():
     if MISSING_DEPS:
@@ -69,6 +78,72 @@ def _handle_error(exception, action):
         raise CommandExecutionError(base_msg) from exception
 
 
+def _writable_manifest(manifest):
+    """Copy the parts of a manifest modified before writing it.
+
+    `metalk8s.format_slots` does not copy manifests without slots, and the
+    caller's manifest must be left untouched.
+    """
+    manifest = dict(manifest)
+    if isinstance(manifest.get("metadata"), dict):
+        metadata = manifest["metadata"] = dict(manifest["metadata"])
+        for key in ["labels", "annotations"]:
+            if isinstance(metadata.get(key), dict):
+                metadata[key] = dict(metadata[key])
+    if isinstance(manifest.get("spec"), dict):
+        manifest["spec"] = dict(manifest["spec"])
+
+    return manifest
+
+
+def _add_salt_labels(manifest, saltenv):
+    """Add the labels set on every object managed by Salt."""
+    match = re.search(r"^metalk8s-(?P<version>.+)$", saltenv)
+    labels = manifest.setdefault("metadata", {}).setdefault("labels", {})
+    labels["metalk8s.scality.com/version"] = (
+        match.group("version") if match else "unknown"
+    )
+    labels["app.kubernetes.io/managed-by"] = "salt"
+    labels["heritage"] = "salt"
+
+
+def _manifest_digest(manifest):
+    """Compute the digest of a manifest, ignoring the digest annotation."""
+    annotations = dict(manifest.get("metadata", {}).get("annotations") or {})
+    annotations.pop(APPLIED_DIGEST_ANNOTATION, None)
+    manifest = dict(manifest)
+    manifest["metadata"] = dict(manifest.get("metadata") or {}, annotations=annotations)
+
+    return salt.utils.hashutils.sha256_digest(
+        json.dumps(manifest, sort_keys=True, default=str)
+    )
+
+
+def _manifest_matches(expected, current):
+    """Check that all values set in `expected` are the same in `current`.
+
+    Values not set in `expected` are ignored, since they may be defaulted by
+    the API server, as are empty or null values.
+    """
+    if isinstance(expected, dict):
+        if not isinstance(current, dict):
+            return not expected and current is None
+        return all(
+            _manifest_matches(value, current.get(key))
+            for key, value in expected.items()
+        )
+
+    if isinstance(expected, list):
+        if not isinstance(current, list):
+            return not expected and current is None
+        return len(expected) == len(current) and all(
+            _manifest_matches(exp_elt, cur_elt)
+            for exp_elt, cur_elt in zip(expected, current)
+        )
+
+    return expected is None or expected == current
+
+
 def _object_manipulation_function(action):
     """Generate an execution function based on a CRUD method to use."""
     assert action in (
@@ -77,6 +152,7 @@ def _object_manipulation_function(action):
         "replace",
         "delete",
         "patch",
+        "apply",
     ), f'Method "{action}" is not supported'
 
     def method(
@@ -152,15 +228,12 @@ def _object_manipulation_function(action):
 
         # Format slots on the manifest
         manifest = __salt__.metalk8s.format_slots(manifest)
+        if action not in ["delete", "get"]:
+            manifest = _writable_manifest(manifest)
 
         # Adding label containing metalk8s version (retrieved from saltenv)
-        if action in ["create", "replace"]:
-            match = re.search(r"^metalk8s-(?P<version>.+)$", saltenv)
-            manifest.setdefault("metadata", {}).setdefault("labels", {})[
-                "metalk8s.scality.com/version"
-            ] = (match.group("version") if match else "unknown")
-            manifest["metadata"]["labels"]["app.kubernetes.io/managed-by"] = "salt"
-            manifest["metadata"]["labels"]["heritage"] = "salt"
+        if action in ["create", "replace", "apply"]:
+            _add_salt_labels(manifest, saltenv)
 
         log.debug("%sing object with manifest: %s", action[:-1].capitalize(), manifest)
 
@@ -173,11 +246,14 @@ def _object_manipulation_function(action):
                 api_version=manifest["apiVersion"], kind=manifest["kind"]
             )
         except ResourceNotFoundError as exc:
+            # The cached client may be outdated (e.g. CRD just created)
+            __utils__["metalk8s_kubernetes.invalidate_client"](kubeconfig, context)
             raise CommandExecutionError(
                 f"Kind '{manifest['kind']}' from apiVersion '{manifest['apiVersion']}' is unknown"
             ) from exc
 
-        method_func = getattr(api, action)
+        # Server-side apply is a PATCH with a specific content type
+        method_func = getattr(api, "patch" if action == "apply" else action)
 
         call_kwargs = {}
         if action != "create":
@@ -202,6 +278,17 @@ def _object_manipulation_function(action):
                 call_kwargs["body"]["metadata"].pop("name")
                 # Namespace may be empty so add a default to not failing
                 call_kwargs["body"]["metadata"].pop("namespace", None)
+        elif action == "apply":
+            # The client only serializes JSON bodies, others are sent as is,
+            # and JSON is valid YAML
+            call_kwargs["body"] = json.dumps(manifest, default=str)
+            if api.namespaced and not call_kwargs["namespace"]:
+                call_kwargs["namespace"] = namespace
+            call_kwargs["content_type"] = "application/apply-patch+yaml"
+            call_kwargs["query_params"] = [
+                ("fieldManager", FIELD_MANAGER),
+                ("force", "true"),
+            ]
         elif action != "get":
             call_kwargs["body"] = manifest
 
@@ -285,6 +372,26 @@ def _object_manipulation_function(action):
         salt-call metalk8s_kubernetes.{action}_object name="bootstrap" kind="Node" apiVersion="v1"
         salt-call metalk8s_kubernetes.{action}_object name="coredns-123" kind="Pod" apiVersion="v1" namespace="kube-system"
         """
+    elif action == "apply":
+        example_manifest = {
+            "kind": "Namespace",
+            "apiVersion": "v1",
+            "metadata": {"name": "my-namespace"},
+        }
+        method.__doc__ = f"""
+    Apply an object from its manifest, using server-side apply.
+
+    A manifest should be passed in standard Kubernetes format as a dictionary,
+    or through a filepath. Fields are owned by the "{FIELD_MANAGER}" field
+    manager, conflicts with other field managers are forced.
+
+    CLI Examples:
+
+    .. code-block:: bash
+
+        salt-call metalk8s_kubernetes.server_side_apply_object name=/root/object.yaml
+        salt-call metalk8s_kubernetes.server_side_apply_object manifest="{example_manifest}"
+        """
     elif action == "patch":
         example_manifest = {
             "kind": "Node",
@@ -315,6 +422,7 @@ delete_object = _object_manipulation_function("delete")
 replace_object = _object_manipulation_function("replace")
 get_object = _object_manipulation_function("get")
 update_object = _object_manipulation_function("patch")
+server_side_apply_object = _object_manipulation_function("apply")
 
 
 # Check if a specific object exists
@@ -331,6 +439,64 @@ def object_exists(kind, apiVersion, name, **kwargs):
     return get_object(kind=kind, apiVersion=apiVersion, name=name, **kwargs) is not None
 
 
+# Retrieve several objects at once
+def get_objects(refs, workers=None, **kwargs):
+    """
+    Retrieve several objects, sending requests concurrently.
+
+    Each reference is either a dict with `kind`, `apiVersion`, `name` and
+    optionally `namespace` keys, or a manifest (with `metadata.name` and
+    optionally `metadata.namespace`).
+    At most `workers` requests are in flight at the same time (defaults to
+    `GET_OBJECTS_WORKERS`), all of them using the same client, hence the same
+    connection pool.
+
+    Returns the list of objects, in the same order as `refs`, with `None` for
+    objects that do not exist.
+
+    CLI Examples:
+
+    .. code-block:: bash
+
+        salt-call metalk8s_kubernetes.get_objects refs="[{'kind': 'Node', 'apiVersion': 'v1', 'name': 'node-1'}, {'kind': 'Node', 'apiVersion': 'v1', 'name': 'node-2'}]"
+    """
+    if not refs:
+        return []
+
+    workers = int(workers or GET_OBJECTS_WORKERS)
+
+    # Resolve all the API resources first, so that the API discovery is not
+    # run concurrently by the workers
+    kubeconfig, context = __salt__["metalk8s_kubernetes.get_kubeconfig"](**kwargs)
+    client = __utils__["metalk8s_kubernetes.get_client"](kubeconfig, context)
+    for api_version, kind in {(ref["apiVersion"], ref["kind"]) for ref in refs}:
+        try:
+            client.resources.get(api_version=api_version, kind=kind)
+        except ResourceNotFoundError:
+            # Error raised (and client invalidated) by `get_object`
+            pass
+
+    def _get(ref):
+        if "metadata" in ref:
+            return get_object(manifest=ref, **kwargs)
+
+        ref_kwargs = dict(kwargs)
+        if ref.get("namespace"):
+            ref_kwargs["namespace"] = ref["namespace"]
+        return get_object(
+            kind=ref["kind"],
+            apiVersion=ref["apiVersion"],
+            name=ref["name"],
+            **ref_kwargs,
+        )
+
+    if workers == 1 or len(refs) == 1:
+        return [_get(ref) for ref in refs]
+
+    with ThreadPoolExecutor(max_workers=min(workers, len(refs))) as executor:
+        return list(executor.map(_get, refs))
+
+
 # Equivalent of "kubectl rollout restart"
 def rollout_restart(*args, **kwargs):
     """
@@ -357,6 +523,31 @@ def rollout_restart(*args, **kwargs):
     return update_object(patch=patch, *args, **kwargs)
 
 
+def is_namespaced(kind, apiVersion, **kwargs):
+    """
+    Check if objects of a type are namespaced or cluster-scoped.
+
+    CLI Examples:
+
+    .. code-block:: bash
+
+        salt-call metalk8s_kubernetes.is_namespaced kind="Node" apiVersion="v1"
+    """
+    kubeconfig, context = __salt__["metalk8s_kubernetes.get_kubeconfig"](**kwargs)
+
+    client = __utils__["metalk8s_kubernetes.get_client"](kubeconfig, context)
+    try:
+        api = client.resources.get(api_version=apiVersion, kind=kind)
+    except ResourceNotFoundError as exc:
+        # The cached client may be outdated (e.g. CRD just created)
+        __utils__["metalk8s_kubernetes.invalidate_client"](kubeconfig, context)
+        raise CommandExecutionError(
+            f"Kind '{kind}' from apiVersion '{apiVersion}' is unknown"
+        ) from exc
+
+    return bool(api.namespaced)
+
+
 # Listing resources can benefit from a simpler signature
 def list_objects(
     kind,
@@ -384,10 +575,11 @@ def list_objects(
     try:
         api = client.resources.get(api_version=apiVersion, kind=kind)
     except ResourceNotFoundError as exc:
+        # The cached client may be outdated (e.g. CRD just created)
+        __utils__["metalk8s_kubernetes.invalidate_client"](kubeconfig, context)
         raise CommandExecutionError(
             f"Kind '{kind}' from apiVersion '{apiVersion}' is unknown"
         ) from exc
-    api = client.resources.get(api_version=apiVersion, kind=kind)
 
     call_kwargs = {}
     if all_namespaces:
@@ -410,6 +602,67 @@ def list_objects(
     return result.to_dict()["items"]
 
 
+def apply_object(
+    manifest, old_object=None, saltenv="base", test=False, server_side=False, **kwargs
+):
+    """
+    Create or replace an object from its manifest, knowing its current state.
+
+    `old_object` is the object currently stored in the API server, as
+    returned by `get_object` or `list_objects`, or `None` if the object does
+    not exist yet.
+    The digest of the manifest is stored in the
+    `metalk8s.scality.com/applied-digest` annotation, and the object is only
+    replaced if this digest changed or if the object no longer matches the
+    manifest, so that re-applying an unchanged manifest does not issue any
+    write.
+
+    If `server_side` is True, the object is written using server-side apply
+    (see `server_side_apply_object`) instead of being created or replaced.
+
+    If `test` is True, nothing is written.
+
+    Returns a dict with the `action` ("created", "replaced" or "unchanged"),
+    and the `old` and `new` objects.
+
+    CLI Examples:
+
+    .. code-block:: bash
+
+        salt-call metalk8s_kubernetes.apply_object manifest="{'kind': 'Namespace', 'apiVersion': 'v1', 'metadata': {'name': 'my-ns'}}"
+    """
+    manifest = _writable_manifest(__salt__.metalk8s.format_slots(manifest))
+    _add_salt_labels(manifest, saltenv)
+    manifest["metadata"].setdefault("annotations", {})[
+        APPLIED_DIGEST_ANNOTATION
+    ] = _manifest_digest(manifest)
+
+    if old_object is None:
+        action = "created"
+    elif _manifest_matches(manifest, old_object):
+        action = "unchanged"
+    else:
+        action = "replaced"
+
+    ret = {"action": action, "old": old_object, "new": old_object}
+
+    if test or action == "unchanged":
+        return ret
+
+    if server_side:
+        ret["new"] = server_side_apply_object(
+            manifest=manifest, saltenv=saltenv, **kwargs
+        )
+    elif action == "created":
+        ret["new"] = create_object(manifest=manifest, saltenv=saltenv, **kwargs)
+    else:
+        ret["new"] = replace_object(
+            manifest=manifest, old_object=old_object, saltenv=saltenv, **kwargs
+        )
+
+    return ret
+
+
 def get_object_digest(path=None, checksum="sha256", *args, **kwargs):
     """
     Helper to get the digest of one kubernetes object or from a specific key
@@ -5,6 +5,10 @@ by virtue of its `__virtualname__`.
 """
 from __future__ import absolute_import
 
+import glob
+import json
+import os
+
 from salt.exceptions import CommandExecutionError
 import salt.utils.files
 import salt.utils.templates
@@ -24,6 +28,9 @@ except ImportError:
 
 __virtualname__ = "metalk8s_kubernetes"
 
+# Location of the `metalk8s_kubernetes` renderer cache, in the Salt cachedir
+RENDER_CACHE_DIR = "metalk8s/render-cache"
+
 
 def __virtual__():
     if MISSING_DEPS:
@@ -105,6 +112,41 @@ def ping(**kwargs):
     return True
 
 
+def client_cache_stats():
+    """Retrieve the Kubernetes client cache counters of the current process.
+
+    Returns a dict with the number of cache hits, misses, discovery refreshes
+    and invalidations, along with the current number of cached clients.
+
+    CLI Example:
+        salt-call metalk8s_kubernetes.client_cache_stats
+    """
+    return __utils__["metalk8s_kubernetes.get_client_cache_stats"]()
+
+
+def render_cache_stats():
+    """Retrieve the `metalk8s_kubernetes` renderer cache counters.
+
+    Returns a dict with the number of cache hits and misses, along with the
+    current number of cached sources.
+
+    CLI Example:
+        salt-call metalk8s_kubernetes.render_cache_stats
+    """
+    cache_dir = os.path.join(__opts__["cachedir"], RENDER_CACHE_DIR)
+    stats = {"hits": 0, "misses": 0}
+
+    try:
+        with salt.utils.files.fopen(os.path.join(cache_dir, "stats.json")) as fd:
+            stats.update(json.load(fd))
+    except (IOError, OSError, ValueError):
+        pass
+
+    stats["size"] = len(glob.glob(os.path.join(cache_dir, "*.p")))
+
+    return stats
+
+
 def read_and_render_yaml_file(source, template, context=None, saltenv="base"):
     """
     Read a yaml file and, if needed, renders that using the specifieds
@@ -3,6 +3,7 @@ Describes our custom way to deal with yum packages
 so that we can support downgrade in metalk8s
 """
 import logging
+import re
 
 from salt.exceptions import CommandExecutionError
 
@@ -11,6 +12,13 @@ log = logging.getLogger(__name__)
 
 __virtualname__ = "metalk8s_package_manager"
 
+# Lines starting the error report of a failed yum transaction
+_YUM_ERROR_START_RE = re.compile(
+    r"^\s*(Error|Problem|No match for argument|Transaction check error)"
+)
+# Separators between the package names and NEVRAs of a yum error report
+_YUM_TOKEN_SEP_RE = re.compile(r"[\s,:()]+")
+
 
 def __virtual__():
     if __grains__["os_family"] == "RedHat":
@@ -133,19 +141,12 @@ def list_pkg_dependents(name, version=None, fromrepo=None, pkgs_info=None):
 
     all_pkgs.update(dependents)
 
-    for pkg_name in list(all_pkgs):
-        ret = __salt__["cmd.run_all"](["rpm", "-qa", pkg_name])
-
-        if ret["retcode"] != 0:
-            log.error(
-                'Failed to check if package "%s" is installed: %s',
-                pkg_name,
-                ret["stderr"] or ret["stdout"],
-            )
-            return None
+    installed = _list_installed(list(all_pkgs))
+    if installed is None:
+        return None
 
-        is_installed = bool(ret["stdout"].strip())
-        if not is_installed and pkg_name != name:
+    for pkg_name in list(all_pkgs):
+        if pkg_name not in installed and pkg_name != name:
             # Any package requiring the target `name` that is not yet installed
             # should not be installed
             del all_pkgs[pkg_name]
@@ -153,6 +154,86 @@ def list_pkg_dependents(name, version=None, fromrepo=None, pkgs_info=None):
     return all_pkgs
 
 
+def _list_installed(names):
+    """Return the subset of package `names` which are installed.
+
+    All the packages are queried with a single `rpm -q` call, which exits
+    with the number of packages not installed.
+    """
+    ret = __salt__["cmd.run_all"](
+        ["rpm", "-q", "--queryformat", "%{NAME}\\n"] + list(names),
+        ignore_retcode=True,
+    )
+
+    installed = set()
+    missing = 0
+    for line in ret["stdout"].splitlines():
+        line = line.strip()
+        if re.match(r"^package \S+ is not installed$", line):
+            missing += 1
+        elif line:
+            installed.add(line)
+
+    if ret["retcode"] != missing:
+        log.error(
+            'Failed to check if packages "%s" are installed: %s',
+            '", "'.join(names),
+            ret["stderr"] or ret["stdout"],
+        )
+        return None
+
+    return installed
+
+
+def _pkg_spec(name, info):
+    if info.get("version"):
+        pkg_version = str(info["version"])
+        return f"{name}{'-' if pkg_version[0].isdigit() else ' '}{pkg_version}"
+    return name
+
+
+def _yum_check_install(pkg_specs, exclude=None):
+    cmd = (
+        ["yum", "install"]
+        + pkg_specs
+        + [
+            "--setopt",
+            "tsflags=test",
+            "--assumeyes",
+            "--disableplugin=versionlock",
+        ]
+    )
+    if exclude:
+        cmd.extend(["--setopt", f"exclude={exclude}"])
+
+    return __salt__["cmd.run_all"](cmd)
+
+
+def _attribute_yum_errors(ret, pkgs):
+    """Find the lines of a failed yum transaction report mentioning packages.
+
+    `pkgs` maps package names to their spec in the transaction, the lines are
+    returned keyed on these specs.
+    """
+    errors = {}
+    in_report = False
+    for line in f"{ret['stdout']}\n{ret['stderr']}".splitlines():
+        if not in_report:
+            in_report = bool(_YUM_ERROR_START_RE.match(line))
+            if not in_report:
+                continue
+
+        for token in _YUM_TOKEN_SEP_RE.split(line):
+            for name, spec in pkgs.items():
+                # Either the name, the spec or a NEVRA of the package
+                if token in (name, spec) or re.match(rf"{re.escape(name)}-\d", token):
+                    errors.setdefault(spec, [])
+                    if line.strip() not in errors[spec]:
+                        errors[spec].append(line.strip())
+
+    return errors
+
+
 def check_pkg_availability(pkgs_info, exclude=None):
     """
     Check that provided packages and their dependencies are available
@@ -162,32 +243,45 @@ def check_pkg_availability(pkgs_info, exclude=None):
         packages to check (format {"<name>": {"version": "<version>"}, ...})
     exclude
         List of package to exclude (e.g.: containerd.io)
+
+    All packages are checked in a single test transaction. If it fails, the
+    errors are attributed to packages based on the yum output, or, if no
+    package is mentioned there, by checking each package on its own.
     """
-    for name, info in pkgs_info.items():
-        if info.get("version"):
-            pkg_version = str(info["version"])
-            pkg_name = f"{name}{'-' if pkg_version[0].isdigit() else ' '}{pkg_version}"
-        else:
-            pkg_name = name
+    if not pkgs_info:
+        return
 
-        cmd = [
-            "yum",
-            "install",
-            pkg_name,
-            "--setopt",
-            "tsflags=test",
-            "--assumeyes",
-            "--disableplugin=versionlock",
-        ]
-        if exclude:
-            if isinstance(exclude, list):
-                exclude = ",".join(exclude)
-            cmd.extend(["--setopt", f"exclude={exclude}"])
+    if isinstance(exclude, list):
+        exclude = ",".join(exclude)
+
+    pkgs = {name: _pkg_spec(name, info) for name, info in pkgs_info.items()}
 
-        ret = __salt__["cmd.run_all"](cmd)
+    ret = _yum_check_install(list(pkgs.values()), exclude)
+    if ret["retcode"] == 0:
+        return
 
-        if ret["retcode"] != 0:
-            raise CommandExecutionError(
-                f"Check availability of package {pkg_name} failed:\n"
-                f"{ret['stdout']}\n{ret['stderr']}"
+    errors = _attribute_yum_errors(ret, pkgs)
+    if errors:
+        raise CommandExecutionError(
+            "\n".join(
+                f"Check availability of package {pkg_spec} failed:\n" + "\n".join(lines)
+                for pkg_spec, lines in errors.items()
             )
+        )
+
+    if len(pkgs) > 1:
+        for pkg_spec in pkgs.values():
+            pkg_ret = _yum_check_install([pkg_spec], exclude)
+            if pkg_ret["retcode"] != 0:
+                ret = pkg_ret
+                break
+        else:
+            # Packages can only be installed separately
+            pkg_spec = ", ".join(pkgs.values())
+    else:
+        pkg_spec = next(iter(pkgs.values()))
+
+    raise CommandExecutionError(
+        f"Check availability of package {pkg_spec} failed:\n"
+        f"{ret['stdout']}\n{ret['stderr']}"
+    )
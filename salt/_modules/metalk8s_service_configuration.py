@@ -1,9 +1,16 @@
-"""Metalk8s cluster and service configuration utility."""
+"""Metalk8s cluster and service configuration utility.
 
+Service configurations are cached for the duration of a run (in
+`__context__`): ConfigMaps are fetched at most once, the ones of the MetalK8s
+services being retrieved together on first use, and each configuration is
+merged with its defaults at most once.
+"""
+
+import copy
 import logging
 import yaml
 
-import salt
+import salt.utils.dictupdate
 from salt.exceptions import CommandExecutionError
 
 
@@ -11,11 +18,109 @@ log = logging.getLogger(__name__)
 
 __virtualname__ = "metalk8s_service_configuration"
 
+# Key of the service configurations cache in `__context__`
+CONTEXT_KEY = "metalk8s_service_configuration"
+# ConfigMaps of the MetalK8s services, retrieved by `prefetch_service_confs`
+SERVICE_CONFS = {
+    "metalk8s-auth": ["metalk8s-dex-config"],
+    "metalk8s-ingress": ["metalk8s-ingress-controller-config"],
+    "metalk8s-logging": ["metalk8s-fluent-bit-config", "metalk8s-loki-config"],
+    "metalk8s-monitoring": [
+        "metalk8s-alertmanager-config",
+        "metalk8s-grafana-config",
+        "metalk8s-prometheus-config",
+    ],
+    "metalk8s-ui": [
+        "deployed-ui-apps",
+        "metalk8s-shell-ui-config",
+        "metalk8s-ui-config",
+        "workloadplane-shell-ui-config",
+    ],
+}
+
 
 def __virtual__():
     return __virtualname__
 
 
+def _cache():
+    return __context__.setdefault(
+        CONTEXT_KEY, {"prefetched": None, "configmaps": {}, "merged": {}}
+    )
+
+
+def prefetch_service_confs(namespaces=None, **kwargs):
+    """Retrieve the service configuration ConfigMaps, with a single batch
+    of concurrent requests
+
+    ConfigMaps of the MetalK8s services (see `SERVICE_CONFS`), in the given
+    `namespaces` (defaults to all of them), are stored in the cache used by
+    `get_service_conf`, so that no other call to the Kubernetes API is needed
+    to read them during this run.
+
+    Returns:
+        The sorted list of ConfigMaps found, as `<namespace>/<name>`
+
+    CLI Examples:
+
+    .. code-block:: bash
+
+        salt-call metalk8s_service_configuration.prefetch_service_confs
+        salt-call metalk8s_service_configuration.prefetch_service_confs namespaces='["metalk8s-ui"]'
+    """
+    cache = _cache()
+    if cache["prefetched"] is None:
+        cache["prefetched"] = set()
+
+    keys = [
+        (namespace, name)
+        for namespace in namespaces or SERVICE_CONFS
+        for name in SERVICE_CONFS.get(namespace, [])
+    ]
+    configmaps = __salt__["metalk8s_kubernetes.get_objects"](
+        [
+            {
+                "kind": "ConfigMap",
+                "apiVersion": "v1",
+                "namespace": namespace,
+                "name": name,
+            }
+            for namespace, name in keys
+        ],
+        **kwargs,
+    )
+    for key, configmap in zip(keys, configmaps):
+        cache["configmaps"][key] = configmap
+        cache["prefetched"].add(key)
+
+    return sorted(
+        f"{namespace}/{name}"
+        for (namespace, name), configmap in cache["configmaps"].items()
+        if configmap is not None
+    )
+
+
+def _get_configmap(namespace, configmap_name):
+    cache = _cache()
+    key = (namespace, configmap_name)
+
+    if configmap_name in SERVICE_CONFS.get(namespace, []):
+        if cache["prefetched"] is None:
+            try:
+                prefetch_service_confs()
+            except CommandExecutionError as exc:
+                log.debug("Unable to prefetch service configurations: %s", exc)
+        if key in cache["prefetched"]:
+            return cache["configmaps"][key]
+
+    if key not in cache["configmaps"]:
+        cache["configmaps"][key] = __salt__["metalk8s_kubernetes.get_object"](
+            kind="ConfigMap", apiVersion="v1", namespace=namespace, name=configmap_name
+        )
+
+    return cache["configmaps"][key]
+
+
 def get_service_conf(
     namespace, configmap_name, default_csc, apiVersion=None, kind=None
 ):
@@ -48,9 +153,7 @@ def get_service_conf(
         )
 
     try:
-        manifest = __salt__["metalk8s_kubernetes.get_object"](
-            kind="ConfigMap", apiVersion="v1", namespace=namespace, name=configmap_name
-        )
+        manifest = _get_configmap(namespace, configmap_name)
     except ValueError as exc:
         raise CommandExecutionError(
             f"Failed to read ConfigMap object {configmap_name}"
@@ -59,6 +162,11 @@ def get_service_conf(
     if manifest is None:
         return default_csc
 
+    cache_key = (namespace, configmap_name, apiVersion, kind)
+    merged = _cache()["merged"]
+    if cache_key in merged:
+        return copy.deepcopy(merged[cache_key])
+
     try:
         conf_section = manifest.get("data", {}).get("config.yaml", {})
         config = yaml.safe_load(conf_section) or {}
@@ -85,6 +193,7 @@ def get_service_conf(
     merged_config = salt.utils.dictupdate.merge(
         default_csc, config, strategy="recurse", merge_lists=True
     )
+    merged[cache_key] = copy.deepcopy(merged_config)
 
     return merged_config
 
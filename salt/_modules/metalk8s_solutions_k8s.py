@@ -67,8 +67,21 @@ def list_environments(**kwargs):
         **kwargs
     )
 
+    configs = __salt__["metalk8s_kubernetes.get_objects"](
+        [
+            {
+                "kind": "ConfigMap",
+                "apiVersion": "v1",
+                "name": ENVIRONMENT_CONFIGMAP_NAME,
+                "namespace": namespace["metadata"]["name"],
+            }
+            for namespace in env_namespaces
+        ],
+        **kwargs
+    )
+
     environments = {}
-    for namespace in env_namespaces:
+    for namespace, config in zip(env_namespaces, configs):
         name = namespace["metadata"]["labels"][ENVIRONMENT_LABEL]
         env = environments.setdefault(name, {"name": name})
 
@@ -79,18 +92,8 @@ def list_environments(**kwargs):
             env["description"] = description
 
         namespaces = env.setdefault("namespaces", {})
-
-        config = (
-            __salt__["metalk8s_kubernetes.get_object"](
-                kind="ConfigMap",
-                apiVersion="v1",
-                name=ENVIRONMENT_CONFIGMAP_NAME,
-                namespace=namespace["metadata"]["name"],
-                **kwargs
-            )
-            or {}
-        )
-
-        namespaces[namespace["metadata"]["name"]] = {"config": config.get("data")}
+        namespaces[namespace["metadata"]["name"]] = {
+            "config": (config or {}).get("data")
+        }
 
     return environments
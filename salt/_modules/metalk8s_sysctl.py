@@ -4,6 +4,7 @@ Execution module to handle MetalK8s sysctl.
 """
 
 import configparser
+import os
 import pathlib
 
 from salt.exceptions import CommandExecutionError
@@ -22,11 +23,50 @@ SYSCTL_CFG_DIRECTORIES = [
 # This file is applied last no matter what
 SYSCTL_DEFAULT_CFG = "/etc/sysctl.conf"
 
+# Key, in `__context__`, of the index of sysctl configuration files
+CONTEXT_KEY = "metalk8s_sysctl.index"
+
 
 def __virtual__():
     return __virtualname__
 
 
+def _index_cache():
+    return __context__.setdefault(CONTEXT_KEY, {"files": {}, "definitions": {}})
+
+
+def _stamp(path):
+    # Files are usually replaced rather than modified in place (e.g. by Salt
+    # `file` states), hence the inode
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+
+def _read_sysctl_file(sysctl_file):
+    """
+    Return the parameters defined in a sysctl configuration file, cached
+    until the file is modified, along with the file stamp.
+    Missing files (e.g. no `/etc/sysctl.conf`) are skipped by the system, so
+    they do not define any parameter.
+    """
+    cache = _index_cache()["files"]
+    stamp = _stamp(sysctl_file)
+    if stamp is None:
+        cache.pop(sysctl_file, None)
+        return None, {}
+
+    cached = cache.get(sysctl_file)
+    if cached is None or cached[0] != stamp:
+        parser = configparser.ConfigParser(interpolation=None)
+        with salt.utils.files.fopen(sysctl_file, "r") as sysctl_fd:
+            parser.read_file(["[global]", *sysctl_fd], source=sysctl_file)
+        cached = cache[sysctl_file] = (stamp, dict(parser.items("global")))
+    return cached
+
+
 def _get_sysctl_files(config):
     """
     Return all the sysctl configuration files ordered as they are
@@ -55,20 +95,16 @@ def _get_sysctl_files(config):
     return sorted_files
 
 
-def has_precedence(name, value, config, strict=False):
+def _get_overriding_files(config):
     """
-    Read all sysctl configuration file to check if the passed `name` and
-    `value` are not overwritten by an already existing sysctl configuration
-    file.
-    If `strict` is set, check that the final value comes from the passed
-    `config` and not another sysctl configuration file (even if the value is
-    equal to `value`).
+    Return the sysctl configuration files read by the system after the
+    `config` one.
     """
     sysctl_files = _get_sysctl_files(config)
 
     # Ignore files before the `config` one.
     try:
-        sysctl_files = sysctl_files[sysctl_files.index(config) + 1 :]
+        return sysctl_files[sysctl_files.index(config) + 1 :]
     except ValueError:
         # If the file is not in the list, it means it's overwritten by an
         # other sysctl configuration file with higher precedence.
@@ -87,17 +123,73 @@ def has_precedence(name, value, config, strict=False):
             + "\n- ".join(SYSCTL_CFG_DIRECTORIES)
         )
 
-    parser = configparser.ConfigParser(interpolation=None)
-    epured_value = " ".join(str(value).split())
 
-    for sysctl_file in sysctl_files:
-        with salt.utils.files.fopen(sysctl_file, "r") as sysctl_fd:
-            parser.read_file(["[global]", *sysctl_fd], source=sysctl_file)
-        sysctl = dict(parser.items("global"))
-        parser.remove_section("global")
-        if name in sysctl and (
-            strict or " ".join(sysctl[name].split()) != epured_value
-        ):
-            raise CommandExecutionError(
-                f"'{sysctl_file}' redefines '{name}' with value '{sysctl[name]}'"
-            )
+def _get_definitions(config):
+    """
+    Index the sysctl parameters defined after the `config` file.
+
+    Returns a dict mapping each parameter name to the list of its definitions,
+    as `(file, value)` tuples in the order they are applied by the system (so
+    the last one is the effective one). The index is cached until one of the
+    sysctl configuration files is added, removed or modified (see `_stamp`).
+    """
+    parsed = [
+        (sysctl_file, _read_sysctl_file(sysctl_file))
+        for sysctl_file in _get_overriding_files(config)
+    ]
+    stamps = [(sysctl_file, stamp) for sysctl_file, (stamp, _) in parsed]
+    cache = _index_cache()["definitions"]
+
+    cached = cache.get(config)
+    if cached is None or cached[0] != stamps:
+        definitions = {}
+        for sysctl_file, (_, sysctl) in parsed:
+            for key, value in sysctl.items():
+                definitions.setdefault(key, []).append((sysctl_file, value))
+        cached = cache[config] = (stamps, definitions)
+
+    return cached[1]
+
+
+def has_precedence(name, value, config, strict=False):
+    """
+    Read all sysctl configuration file to check if the passed `name` and
+    `value` are not overwritten by an already existing sysctl configuration
+    file.
+    If `strict` is set, check that the final value comes from the passed
+    `config` and not another sysctl configuration file (even if the value is
+    equal to `value`).
+    """
+    has_precedence_many({name: value}, config, strict=strict)
+
+
+def has_precedence_many(params, config, strict=False):
+    """
+    Same as `has_precedence`, for several sysctl parameters at once.
+
+    Sysctl configuration files are only read once (and not read again until
+    they are modified), whatever the number of parameters checked.
+
+    Arguments:
+        params (dict): the sysctl parameters to check keyed by name and with
+            their expected value as value
+        config (str): path of the sysctl configuration file defining them
+        strict (bool): check that the final values come from `config`
+
+    Raises:
+        CommandExecutionError: listing all the parameters overwritten
+    """
+    definitions = _get_definitions(config)
+    errors = []
+
+    for name, value in params.items():
+        epured_value = " ".join(str(value).split())
+        for sysctl_file, sysctl_value in definitions.get(name, []):
+            if strict or " ".join(sysctl_value.split()) != epured_value:
+                errors.append(
+                    f"'{sysctl_file}' redefines '{name}' with value '{sysctl_value}'"
+                )
+                break
+
+    if errors:
+        raise CommandExecutionError("\n".join(errors))
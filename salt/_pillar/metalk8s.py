@@ -179,7 +179,7 @@ def _load_salt(config_data):
     return salt_data
 
 
-def ext_pillar(minion_id, pillar, bootstrap_config):  # pylint: disable=unused-argument
+def _ext_pillar(minion_id, pillar, bootstrap_config):  # pylint: disable=unused-argument
     config = _load_config(bootstrap_config)
     if config.get("_errors"):
         metal_data = __utils__["pillar_utils.errors_to_dict"](config["_errors"])
@@ -217,3 +217,14 @@ def ext_pillar(minion_id, pillar, bootstrap_config):  # pylint: disable=unused-a
             __utils__["pillar_utils.promote_errors"](result, key)
 
         return result
+
+
+def ext_pillar(minion_id, pillar, bootstrap_config, extra_minion_data=None):
+    return __utils__["pillar_utils.compile_source"](
+        "metalk8s",
+        _ext_pillar,
+        minion_id,
+        pillar,
+        bootstrap_config,
+        extra_minion_data=extra_minion_data,
+    )
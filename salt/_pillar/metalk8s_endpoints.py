@@ -17,7 +17,14 @@ def __virtual__():
         return __virtualname__
 
 
-def ext_pillar(minion_id, pillar, kubeconfig):  # pylint: disable=unused-argument
+def _snapshot(key, fetch):
+    # Endpoints of the bootstrap services are only read by MetalK8s states
+    return __utils__["pillar_utils.cluster_snapshot"](
+        __opts__, key, fetch, read_only=True
+    )
+
+
+def _ext_pillar(minion_id, pillar, kubeconfig):  # pylint: disable=unused-argument
     services = {
         "kube-system": ["salt-master", "repositories"],
     }
@@ -36,9 +43,13 @@ def ext_pillar(minion_id, pillar, kubeconfig):  # pylint: disable=unused-argumen
             for service in services:
                 service_endpoints = []
                 try:
-                    service_endpoints = __salt__[
-                        "metalk8s_kubernetes.get_service_endpoints"
-                    ](service, namespace, kubeconfig=kubeconfig)
+                    service_endpoints = _snapshot(
+                        f"{kubeconfig}:endpoints:{namespace}/{service}",
+                        # pylint: disable=cell-var-from-loop
+                        lambda: __salt__["metalk8s_kubernetes.get_service_endpoints"](
+                            service, namespace, kubeconfig=kubeconfig
+                        ),
+                    )
                 except CommandExecutionError as exc:
                     errors.append(str(exc))
 
@@ -52,3 +63,14 @@ def ext_pillar(minion_id, pillar, kubeconfig):  # pylint: disable=unused-argumen
     __utils__["pillar_utils.promote_errors"](result["metalk8s"], "endpoints")
 
     return result
+
+
+def ext_pillar(minion_id, pillar, kubeconfig, extra_minion_data=None):
+    return __utils__["pillar_utils.compile_source"](
+        __virtualname__,
+        _ext_pillar,
+        minion_id,
+        pillar,
+        kubeconfig,
+        extra_minion_data=extra_minion_data,
+    )
@@ -12,8 +12,12 @@ def __virtual__():
 def _load_members(pillar):
     errors = []
     try:
-        members = __salt__["metalk8s_etcd.get_etcd_member_list"](
-            nodes=pillar["metalk8s"]["nodes"]
+        members = __utils__["pillar_utils.cluster_snapshot"](
+            __opts__,
+            "etcd:members",
+            lambda: __salt__["metalk8s_etcd.get_etcd_member_list"](
+                nodes=pillar["metalk8s"]["nodes"]
+            ),
         )
     except Exception as exc:  # pylint: disable=broad-except
         members = []
@@ -25,5 +29,15 @@ def _load_members(pillar):
     return result
 
 
-def ext_pillar(minion_id, pillar):  # pylint: disable=unused-argument
+def _ext_pillar(minion_id, pillar):  # pylint: disable=unused-argument
     return {"metalk8s": {"etcd": _load_members(pillar)}}
+
+
+def ext_pillar(minion_id, pillar, extra_minion_data=None):
+    return __utils__["pillar_utils.compile_source"](
+        __virtualname__,
+        _ext_pillar,
+        minion_id,
+        pillar,
+        extra_minion_data=extra_minion_data,
+    )
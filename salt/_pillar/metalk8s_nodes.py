@@ -20,6 +20,12 @@ def __virtual__():
         return __virtualname__
 
 
+def _snapshot(key, fetch, item=None, read_only=False):
+    return __utils__["pillar_utils.cluster_snapshot"](
+        __opts__, key, fetch, item=item, read_only=read_only
+    )
+
+
 def node_info(node, ca_minion, pillar):
     result = {
         "roles": [],
@@ -74,8 +80,14 @@ def node_info(node, ca_minion, pillar):
 
 def get_cluster_version(kubeconfig=None):
     try:
-        namespace = __salt__["metalk8s_kubernetes.get_object"](
-            name="kube-system", kind="Namespace", apiVersion="v1", kubeconfig=kubeconfig
+        namespace = _snapshot(
+            f"{kubeconfig}:namespace:kube-system",
+            lambda: __salt__["metalk8s_kubernetes.get_object"](
+                name="kube-system",
+                kind="Namespace",
+                apiVersion="v1",
+                kubeconfig=kubeconfig,
+            ),
         )
     except CommandExecutionError as exc:
         return __utils__["pillar_utils.errors_to_dict"](
@@ -93,11 +105,14 @@ def get_cluster_version(kubeconfig=None):
 
 def get_cluster_config(kubeconfig=None):
     try:
-        return __salt__["metalk8s_kubernetes.get_object"](
-            name="main",
-            kind="ClusterConfig",
-            apiVersion="metalk8s.scality.com/v1alpha1",
-            kubeconfig=kubeconfig,
+        return _snapshot(
+            f"{kubeconfig}:clusterconfig:main",
+            lambda: __salt__["metalk8s_kubernetes.get_object"](
+                name="main",
+                kind="ClusterConfig",
+                apiVersion="metalk8s.scality.com/v1alpha1",
+                kubeconfig=kubeconfig,
+            ),
         )
     except CommandExecutionError as exc:
         return __utils__["pillar_utils.errors_to_dict"](
@@ -107,8 +122,12 @@ def get_cluster_config(kubeconfig=None):
 
 def get_storage_classes(kubeconfig=None):
     storage_classes = {}
-    storageclass_list = __salt__["metalk8s_kubernetes.list_objects"](
-        kind="StorageClass", apiVersion="storage.k8s.io/v1", kubeconfig=kubeconfig
+    storageclass_list = _snapshot(
+        f"{kubeconfig}:storageclasses",
+        lambda: __salt__["metalk8s_kubernetes.list_objects"](
+            kind="StorageClass", apiVersion="storage.k8s.io/v1", kubeconfig=kubeconfig
+        ),
+        read_only=True,
     )
     for storageclass in storageclass_list:
         storage_classes[storageclass["metadata"]["name"]] = storageclass
@@ -116,6 +135,23 @@ def get_storage_classes(kubeconfig=None):
     return storage_classes
 
 
+def get_volumes_by_node(kubeconfig=None, node_name=None):
+    """Retrieve all Volumes with a single LIST, indexed by node name.
+
+    If `node_name` is set, only the Volumes of this node are indexed.
+    """
+    volumes_by_node = {}
+    for volume in __salt__["metalk8s_kubernetes.list_objects"](
+        kind="Volume",
+        apiVersion="storage.metalk8s.scality.com/v1alpha1",
+        kubeconfig=kubeconfig,
+    ):
+        if node_name is None or volume["spec"]["nodeName"] == node_name:
+            volumes_by_node.setdefault(volume["spec"]["nodeName"], []).append(volume)
+
+    return volumes_by_node
+
+
 def list_volumes(minion_id, kubeconfig=None):
     try:
         storage_classes = get_storage_classes(kubeconfig=kubeconfig)
@@ -125,21 +161,25 @@ def list_volumes(minion_id, kubeconfig=None):
         )
 
     try:
-        volumes = __salt__["metalk8s_kubernetes.list_objects"](
-            kind="Volume",
-            apiVersion="storage.metalk8s.scality.com/v1alpha1",
-            kubeconfig=kubeconfig,
-        )
+        # Volumes are deployed right after their creation, so they are not
+        # shared unless the snapshot is enabled for all data
+        if __utils__["pillar_utils.snapshot_ttl"](__opts__):
+            volumes = _snapshot(
+                f"{kubeconfig}:volumes-by-node",
+                lambda: get_volumes_by_node(kubeconfig=kubeconfig),
+                item=minion_id,
+            )
+        else:
+            volumes = get_volumes_by_node(
+                kubeconfig=kubeconfig, node_name=minion_id
+            ).get(minion_id)
     except CommandExecutionError as exc:
         return __utils__["pillar_utils.errors_to_dict"](
             [f"Unable to retrieve list of Volumes: {exc}"]
         )
 
     results = {}
-    local_volumes = (
-        volume for volume in volumes if volume["spec"]["nodeName"] == minion_id
-    )
-    for volume in local_volumes:
+    for volume in volumes or []:
         name = volume["metadata"]["name"]
         storageclass = storage_classes.get(
             volume["spec"]["storageClassName"], volume["spec"]["storageClassName"]
@@ -151,7 +191,7 @@ def list_volumes(minion_id, kubeconfig=None):
     return results
 
 
-def ext_pillar(minion_id, pillar, kubeconfig):
+def _ext_pillar(minion_id, pillar, kubeconfig):
     if not os.path.isfile(kubeconfig):
         error_tplt = "{}: kubeconfig not found at {}"
         pillar_nodes = __utils__["pillar_utils.errors_to_dict"](
@@ -168,8 +208,11 @@ def ext_pillar(minion_id, pillar, kubeconfig):
                 ca_minion = pillar["metalk8s"]["ca"].get("minion", None)
 
         try:
-            node_list = __salt__["metalk8s_kubernetes.list_objects"](
-                kind="Node", apiVersion="v1", kubeconfig=kubeconfig
+            node_list = _snapshot(
+                f"{kubeconfig}:nodes",
+                lambda: __salt__["metalk8s_kubernetes.list_objects"](
+                    kind="Node", apiVersion="v1", kubeconfig=kubeconfig
+                ),
             )
         except CommandExecutionError as exc:
             log.exception("Failed to retrieve nodes for ext_pillar", exc_info=exc)
@@ -199,3 +242,14 @@ def ext_pillar(minion_id, pillar, kubeconfig):
         __utils__["pillar_utils.promote_errors"](result["metalk8s"], key)
 
     return result
+
+
+def ext_pillar(minion_id, pillar, kubeconfig, extra_minion_data=None):
+    return __utils__["pillar_utils.compile_source"](
+        __virtualname__,
+        _ext_pillar,
+        minion_id,
+        pillar,
+        kubeconfig,
+        extra_minion_data=extra_minion_data,
+    )
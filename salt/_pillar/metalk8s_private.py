@@ -46,7 +46,7 @@ def _read_apiserver_key():
     return _read_private_key("apiserver_key", APISERVER_KEY_PATH)
 
 
-def ext_pillar(minion_id, pillar):
+def _ext_pillar(minion_id, pillar):
     nodes_info = pillar.get("metalk8s", {}).get("nodes", {})
 
     if minion_id not in nodes_info:
@@ -67,3 +67,13 @@ def ext_pillar(minion_id, pillar):
     result = {"metalk8s": private_data}
 
     return result
+
+
+def ext_pillar(minion_id, pillar, extra_minion_data=None):
+    return __utils__["pillar_utils.compile_source"](
+        __virtualname__,
+        _ext_pillar,
+        minion_id,
+        pillar,
+        extra_minion_data=extra_minion_data,
+    )
@@ -12,6 +12,10 @@ def __virtual__():
     return __virtualname__
 
 
+def _snapshot(key, fetch):
+    return __utils__["pillar_utils.cluster_snapshot"](__opts__, key, fetch)
+
+
 def _load_solutions(bootstrap_id):
     """Load Solutions from ConfigMap and config file."""
     result = {
@@ -27,21 +31,28 @@ def _load_solutions(bootstrap_id):
             [f"Error when reading Solutions config file: {exc}"]
         )
 
-    errors = []
-    try:
+    def _list_available():
         available_ret = __salt__["saltutil.cmd"](
             tgt=bootstrap_id,
             fun="metalk8s_solutions.list_available",
         )[bootstrap_id]
+        # Raise from the fetch, so that failures are not kept in the snapshot
         if available_ret["retcode"] != 0:
             raise Exception(f"[{available_ret['retcode']}] {available_ret['ret']}")
+        return available_ret["ret"]
 
-        result["available"] = available_ret["ret"]
+    errors = []
+    try:
+        result["available"] = _snapshot(
+            f"solutions:available:{bootstrap_id}", _list_available
+        )
     except Exception as exc:  # pylint: disable=broad-except
         errors.append(f"Error when listing available Solutions: {exc}")
 
     try:
-        active = __salt__["metalk8s_solutions.list_active"]()
+        active = _snapshot(
+            "solutions:active", __salt__["metalk8s_solutions.list_active"]
+        )
     except Exception as exc:  # pylint: disable=broad-except
         errors.append(f"Error when listing active Solution versions: {exc}")
 
@@ -55,7 +66,9 @@ def _load_solutions(bootstrap_id):
                 version_info["active"] = version_info["version"] == active_version
 
     try:
-        result["environments"] = __salt__["metalk8s_solutions.list_environments"]()
+        result["environments"] = _snapshot(
+            "solutions:environments", __salt__["metalk8s_solutions.list_environments"]
+        )
     except Exception as exc:  # pylint: disable=broad-except
         result["environments"] = __utils__["pillar_utils.errors_to_dict"](
             [f"Error when listing Solution Environments: {exc}"]
@@ -67,7 +80,7 @@ def _load_solutions(bootstrap_id):
     return result
 
 
-def ext_pillar(minion_id, pillar):  # pylint: disable=unused-argument
+def _ext_pillar(minion_id, pillar):  # pylint: disable=unused-argument
     # NOTE: this ext_pillar relies on the `metalk8s_nodes` ext_pillar to find
     # the Bootstrap minion ID, for the remote execution of
     # `metalk8s_solutions.list_available`.
@@ -93,3 +106,13 @@ def ext_pillar(minion_id, pillar):  # pylint: disable=unused-argument
         return {"metalk8s": {"solutions": error_dict}}
 
     return {"metalk8s": {"solutions": _load_solutions(bootstrap_id)}}
+
+
+def ext_pillar(minion_id, pillar, extra_minion_data=None):
+    return __utils__["pillar_utils.compile_source"](
+        __virtualname__,
+        _ext_pillar,
+        minion_id,
+        pillar,
+        extra_minion_data=extra_minion_data,
+    )
@@ -19,16 +19,64 @@ The supported options are:
   salt-master configuration
 - `absent`, a boolean to toggle which state function variant (`object_present`
   or `object_absent`) to use (defaults to False)
+- `bulk`, a boolean to render all the objects into a single
+  `objects_present` state, which lists existing objects once per kind and
+  namespace and only writes the ones that changed (defaults to False, ignored
+  if `absent` is set)
+- `workers`, the maximum number of objects written concurrently in `bulk`
+  mode
+- `server_side`, a boolean to write objects using server-side apply instead
+  of create/replace (defaults to False)
+
+Parsing large manifests (e.g. rendered charts) is expensive, so parsed
+objects are cached in the Salt cachedir, keyed on the hash of the source this
+renderer receives. When used in a pipeline, this source is the output of the
+previous renderers, so any change in a template or in its context (pillar,
+saltenv, ...) gives a new key. Hits and misses are counted, see
+`metalk8s_kubernetes.render_cache_stats`.
+
+Manifests are parsed using the Salt YAML loader, which relies on libyaml
+(`yaml.CSafeLoader`) when available and falls back to the pure-Python parser
+otherwise, with the same output. File handles are parsed incrementally,
+without reading the whole source in memory first.
+See `salt/tests/benchmarks/bench_renderer.py` to measure parsing times on the
+charts shipped with MetalK8s.
 """
+import fcntl
+import glob
+import hashlib
+import json
+import logging
+import os
+import pickle
+
 import yaml
 
 from salt.exceptions import SaltRenderError
 from salt.ext import six
+import salt.utils.data
+import salt.version
 from salt.utils.yaml import SaltYamlSafeLoader
 from salt.utils.odict import OrderedDict
 
+log = logging.getLogger(__name__)
+
 __virtualname__ = "metalk8s_kubernetes"
 
+# Parsed manifests cache, in the Salt cachedir
+RENDER_CACHE_DIR = "metalk8s/render-cache"
+# Version of the cache layout, bump it to ignore previously written entries
+RENDER_CACHE_VERSION = 1
+# Maximum number of cached sources
+RENDER_CACHE_SIZE = 32
+# Sources smaller than this (in bytes) are always parsed
+RENDER_CACHE_MIN_SIZE = 64 * 1024
+# Size of the chunks read from file handles when hashing them
+READ_CHUNK_SIZE = 1024 * 1024
+
+# `SaltYamlSafeLoader` derives from `yaml.CSafeLoader` if libyaml is available
+HAS_LIBYAML = issubclass(SaltYamlSafeLoader, getattr(yaml, "CSafeLoader", ()))
+
 
 def __virtual__():
     return __virtualname__
@@ -52,7 +100,7 @@ def _step_name(manifest, absent=False):
     )
 
 
-def _step(manifest, kubeconfig=None, context=None, absent=False):
+def _step(manifest, kubeconfig=None, context=None, absent=False, server_side=False):
     """Render a single Kubernetes object into a state 'step'."""
     step_name = _step_name(manifest, absent)
     state_func = f"metalk8s_kubernetes.object_{'absent' if absent else 'present'}"
@@ -62,10 +110,177 @@ def _step(manifest, kubeconfig=None, context=None, absent=False):
         {"context": context},
         {"manifest": manifest},
     ]
+    if server_side and not absent:
+        state_args.append({"server_side": True})
 
     return step_name, {state_func: state_args}
 
 
+def _bulk_step(
+    manifests, kubeconfig=None, context=None, workers=None, server_side=False, sls=""
+):
+    """Render a list of Kubernetes objects into a single state 'step'."""
+    for manifest in manifests:
+        # Check that all objects are valid
+        _step_name(manifest)
+
+    step_name = f"Apply Kubernetes objects from '{sls}'"
+    state_args = [
+        {"name": step_name},
+        {"kubeconfig": kubeconfig},
+        {"context": context},
+        {"manifests": manifests},
+        {"workers": workers},
+        {"server_side": server_side},
+    ]
+
+    return step_name, {"metalk8s_kubernetes.objects_present": state_args}
+
+
+def _iter_manifests(source):
+    """Parse a YAML stream (string or file handle), one document at a time."""
+    if not HAS_LIBYAML:
+        log.debug("libyaml is not available, using the pure-Python YAML parser")
+
+    for manifest in yaml.load_all(source, Loader=SaltYamlSafeLoader):
+        if manifest:
+            yield manifest
+
+
+def _load_manifests(source):
+    return list(_iter_manifests(source))
+
+
+def _is_seekable(source):
+    try:
+        return source.seekable()
+    except (AttributeError, OSError, ValueError):
+        return False
+
+
+def _source_digest(source):
+    """Hash a source, reading file handles by chunks.
+
+    Returns the digest along with the size of the source, file handles are
+    rewinded to their initial position.
+    """
+    digest = hashlib.sha256()
+    digest.update(
+        f"{RENDER_CACHE_VERSION}:{salt.version.__version__}:{yaml.__version__}\n".encode()
+    )
+
+    if isinstance(source, six.string_types):
+        chunks = [source]
+    else:
+        position = source.tell()
+        chunks = iter(lambda: source.read(READ_CHUNK_SIZE), source.read(0))
+
+    size = 0
+    for chunk in chunks:
+        if isinstance(chunk, six.text_type):
+            chunk = chunk.encode("utf-8")
+        digest.update(chunk)
+        size += len(chunk)
+
+    if not isinstance(source, six.string_types):
+        source.seek(position)
+
+    return digest.hexdigest(), size
+
+
+def _record_render_cache_stats(cache_dir, hit):
+    stats_file = os.path.join(cache_dir, "stats.json")
+    try:
+        lock_fd = open(f"{stats_file}.lock", "w", encoding="utf-8")
+    except OSError as exc:
+        log.debug("Unable to write render cache statistics: %s", exc)
+        return
+
+    with lock_fd:
+        # Other renders update the same counters
+        fcntl.flock(lock_fd, fcntl.LOCK_EX)
+        try:
+            try:
+                with open(stats_file, "r", encoding="utf-8") as fd:
+                    stats = json.load(fd)
+            except (OSError, ValueError):
+                stats = {}
+
+            stats.setdefault("hits", 0)
+            stats.setdefault("misses", 0)
+            stats["hits" if hit else "misses"] += 1
+
+            tmp_file = f"{stats_file}.{os.getpid()}.tmp"
+            try:
+                with open(tmp_file, "w", encoding="utf-8") as fd:
+                    json.dump(stats, fd)
+                os.replace(tmp_file, stats_file)
+            except OSError as exc:
+                log.debug("Unable to write render cache statistics: %s", exc)
+        finally:
+            fcntl.flock(lock_fd, fcntl.LOCK_UN)
+
+
+def _prune_render_cache(cache_dir):
+    entries = sorted(
+        glob.glob(os.path.join(cache_dir, "*.p")), key=os.path.getmtime, reverse=True
+    )
+    for entry in entries[RENDER_CACHE_SIZE:]:
+        try:
+            os.remove(entry)
+        except OSError:
+            pass
+
+
+def _cached_manifests(source, sls=""):
+    """Parse a YAML stream of manifests, using the render cache if possible.
+
+    The source is either a string or a seekable file handle. Manifests are
+    returned as a list on cache hits and misses, and as a generator when the
+    cache is not used.
+    """
+    cachedir = __opts__.get("cachedir")
+    if not cachedir:
+        return _iter_manifests(source)
+
+    digest, size = _source_digest(source)
+    if size < RENDER_CACHE_MIN_SIZE:
+        return _iter_manifests(source)
+
+    cache_dir = os.path.join(cachedir, RENDER_CACHE_DIR)
+    cache_file = os.path.join(cache_dir, f"{digest}.p")
+
+    try:
+        with open(cache_file, "rb") as fd:
+            manifests = pickle.load(fd)
+        # Keep recently used entries when pruning
+        os.utime(cache_file)
+    except (OSError, EOFError, pickle.UnpicklingError) as exc:
+        log.debug("Render cache miss for '%s': %s", sls, exc)
+        hit = False
+    else:
+        log.debug("Render cache hit for '%s'", sls)
+        hit = True
+
+    if not hit:
+        manifests = _load_manifests(source)
+        tmp_file = f"{cache_file}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(cache_dir, mode=0o700, exist_ok=True)
+            # Manifests may contain Secrets, only readable by their owner
+            tmp_fd = os.open(tmp_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(tmp_fd, "wb") as fd:
+                pickle.dump(manifests, fd, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_file, cache_file)
+            _prune_render_cache(cache_dir)
+        except (OSError, pickle.PicklingError) as exc:
+            log.debug("Unable to store '%s' in the render cache: %s", sls, exc)
+
+    _record_render_cache_stats(cache_dir, hit)
+
+    return manifests
+
+
 def render(
     source, saltenv="", sls="", argline="", **_kwargs
 ):  # pylint: disable=unused-argument
@@ -74,6 +289,9 @@ def render(
     kubeconfig = args.get("kubeconfig", [None])[0]
     context = args.get("context", [None])[0]
     absent = args.get("absent", [False])[0]
+    bulk = salt.utils.data.is_true(args.get("bulk", [False])[0])
+    workers = args.get("workers", [None])[0]
+    server_side = salt.utils.data.is_true(args.get("server_side", [False])[0])
 
     # Allow to force absent arg from pillar
     if (
@@ -82,14 +300,34 @@ def render(
     ):
         absent = __pillar__["_metalk8s_kubernetes_renderer"]["force_absent"]
 
-    if not isinstance(source, six.string_types):
-        # Assume it is a file handle
+    if not isinstance(source, six.string_types) and not _is_seekable(source):
+        # Assume it is a file handle, that we need to read twice (to compute
+        # its hash and to parse it)
         source = source.read()
 
-    data = yaml.load_all(source, Loader=SaltYamlSafeLoader)
+    data = _cached_manifests(source, sls=sls)
+
+    if bulk and not absent:
+        return OrderedDict(
+            [
+                _bulk_step(
+                    list(data),
+                    kubeconfig=kubeconfig,
+                    context=context,
+                    workers=workers,
+                    server_side=server_side,
+                    sls=sls,
+                )
+            ]
+        )
 
     return OrderedDict(
-        _step(manifest, kubeconfig=kubeconfig, context=context, absent=absent)
+        _step(
+            manifest,
+            kubeconfig=kubeconfig,
+            context=context,
+            absent=absent,
+            server_side=server_side,
+        )
         for manifest in data
-        if manifest
     )
@@ -3,6 +3,8 @@
 Runner module handling MetalK8s cluster checks.
 """
 
+import time
+
 from salt.exceptions import CheckError
 
 __virtualname__ = "metalk8s_checks"
@@ -28,37 +30,85 @@ def _handle_errors(errors, raises):
     return {"retcode": 1, "errors": errors}
 
 
-def nodes(node_list=None, raises=True):
+def nodes(node_list=None, raises=True, label_selector=None, details=False):
     """Check that all nodes are Ready
 
+    All nodes are retrieved using a single Node LIST, and their conditions
+    are evaluated locally.
+
     Args:
-        node_list (list, optional): List of node to check. Defaults to `pillar.metalk8s.nodes`.
+        node_list (list, optional): List of node to check. Defaults to `pillar.metalk8s.nodes`,
+            or to all the nodes matching `label_selector` if set.
         raises (bool, optional): Whether or not this function should raise. Defaults to True.
+        label_selector (str, optional): Only check nodes matching this label selector.
+        details (bool, optional): Whether or not the conditions of each node should be returned. Defaults to False.
 
     Raises:
         CheckError: If 'raises' is True and some nodes are not ready
 
     Returns:
-        dict or True: An error message or True if everything OK
+        dict or True: An error message or True if everything OK, or if `details` is True,
+            a dict with the `result`, the `errors`, the `duration` of the check and
+            the conditions of each node in `nodes`
     """
     errors = []
+    start = time.monotonic()
 
-    if node_list is None:
+    if node_list is None and label_selector is None:
         node_list = __pillar__["metalk8s"]["nodes"].keys()
 
-    not_ready_nodes = {}
-    for node_name in node_list:
-        node_obj = __salt__["salt.cmd"](
-            fun="metalk8s_kubernetes.get_object",
+    list_kwargs = {}
+    if label_selector:
+        list_kwargs["label_selector"] = label_selector
+    if node_list is not None:
+        node_list = list(node_list)
+        if len(node_list) == 1:
+            list_kwargs["field_selector"] = f"metadata.name={node_list[0]}"
+
+    node_objs = {
+        node_obj["metadata"]["name"]: node_obj
+        for node_obj in __salt__["salt.cmd"](
+            fun="metalk8s_kubernetes.list_objects",
             kind="Node",
             apiVersion="v1",
-            name=node_name,
+            **list_kwargs,
         )
+    }
+    if node_list is None:
+        node_list = sorted(node_objs)
 
-        condition = next(
-            cond for cond in node_obj["status"]["conditions"] if cond["type"] == "Ready"
-        )
-        if condition["status"] != "True":
+    nodes_details = {}
+    not_ready_nodes = {}
+    for node_name in node_list:
+        node_obj = node_objs.get(node_name)
+        if node_obj is None:
+            nodes_details[node_name] = {
+                "ready": False,
+                "reason": "NotFound",
+                "conditions": {},
+            }
+            not_ready_nodes.setdefault("NotFound", []).append(node_name)
+            continue
+
+        conditions = {
+            cond["type"]: {
+                "status": cond["status"],
+                "reason": cond.get("reason"),
+                "message": cond.get("message"),
+                "last_heartbeat_time": cond.get("lastHeartbeatTime"),
+                "last_transition_time": cond.get("lastTransitionTime"),
+            }
+            for cond in (node_obj.get("status") or {}).get("conditions") or []
+        }
+        condition = conditions.get("Ready") or {"status": "Unknown", "reason": None}
+        ready = condition["status"] == "True"
+
+        nodes_details[node_name] = {
+            "ready": ready,
+            "reason": condition["reason"],
+            "conditions": conditions,
+        }
+        if not ready:
             not_ready_nodes.setdefault(condition["reason"], []).append(node_name)
 
     for reason, nodes_names in not_ready_nodes.items():
@@ -68,7 +118,19 @@ def nodes(node_list=None, raises=True):
             )
         )
 
-    return _handle_errors(errors, raises)
+    ret = _handle_errors(errors, raises)
+    if details:
+        if ret is True:
+            ret = {"errors": []}
+        ret.update(
+            {
+                "result": not errors,
+                "duration": time.monotonic() - start,
+                "nodes": nodes_details,
+            }
+        )
+
+    return ret
 
 
 def minions(minion_list=None, raises=True):
@@ -144,11 +206,17 @@ def upgrade(dest_version, saltenv, raises=True):
     dest = dest_version.split(".")
     min_version = f"{int(dest[0]) - 1}.0.0"
 
+    # Compare each distinct version only once
+    too_old_versions = {
+        version
+        for version in {
+            node_info["version"] for node_info in metalk8s_pillar["nodes"].values()
+        }
+        if __salt__["salt.cmd"]("pkg.version_cmp", min_version, version) == 1
+    }
+
     for node_name, node_info in metalk8s_pillar["nodes"].items():
-        if (
-            __salt__["salt.cmd"]("pkg.version_cmp", min_version, node_info["version"])
-            == 1
-        ):
+        if node_info["version"] in too_old_versions:
             errors.append(
                 "Unable to upgrade from more than 1 major version, Node "
                 f"{node_name} is in {node_info['version']} and you try to upgrade "
@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+"""
+Runner module handling the drain of several MetalK8s nodes.
+"""
+
+import logging
+
+from salt.exceptions import CommandExecutionError
+import salt.utils.args
+
+log = logging.getLogger(__name__)
+
+__virtualname__ = "metalk8s_drain"
+
+
+def __virtual__():
+    return __virtualname__
+
+
+def drain_nodes(nodes, max_parallel=1, raises=True, **kwargs):
+    """Drain several nodes, in parallel
+
+    Evictions requested across all nodes never exceed the disruptions allowed
+    by PodDisruptionBudgets, and each node drain follows pods deletion with a
+    single watch on the pods of this node.
+
+    Args:
+        nodes (list): List of nodes to drain (or a comma-separated string).
+        max_parallel (int, optional): Maximum number of nodes drained at the same time. Defaults to 1.
+        raises (bool, optional): Whether or not this function should raise. Defaults to True.
+        kwargs: Drain options, see `metalk8s_kubernetes.node_drain`.
+
+    Raises:
+        CommandExecutionError: If 'raises' is True and some nodes could not be drained
+
+    Returns:
+        dict: The result, comment and timings of each node drain
+
+    CLI Examples:
+
+    .. code-block:: bash
+
+        salt-run metalk8s_drain.drain_nodes nodes='[node-1, node-2, node-3]' max_parallel=2 ignore_daemonset=True delete_local_data=True force=True
+    """
+    if isinstance(nodes, str):
+        nodes = [node.strip() for node in nodes.split(",") if node.strip()]
+
+    ret = __salt__["salt.cmd"](
+        fun="metalk8s_kubernetes.nodes_drain",
+        node_names=nodes,
+        max_parallel=max_parallel,
+        **salt.utils.args.clean_kwargs(**kwargs),
+    )
+
+    errors = [
+        f"Node '{node}': {node_ret['comment']}"
+        for node, node_ret in ret.items()
+        if not node_ret["result"]
+    ]
+    if errors:
+        if raises:
+            raise CommandExecutionError("\n".join(errors))
+
+        # See `metalk8s_checks._handle_errors`
+        ret["retcode"] = 1
+
+    return ret
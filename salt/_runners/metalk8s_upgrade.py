@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+"""
+Runner module reporting the progress of a MetalK8s cluster upgrade.
+"""
+
+import json
+import logging
+import os
+import time
+
+log = logging.getLogger(__name__)
+
+__virtualname__ = "metalk8s_upgrade"
+
+# File, in the Salt cachedir, holding the start time of upgrade waves
+WAVES_FILE = "metalk8s/upgrade-waves.json"
+
+
+def __virtual__():
+    return __virtualname__
+
+
+def _waves_file():
+    return os.path.join(__opts__["cachedir"], WAVES_FILE)
+
+
+def _read_waves():
+    try:
+        with open(_waves_file(), "r", encoding="utf-8") as fd:
+            return json.load(fd)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_waves(waves):
+    waves_file = _waves_file()
+    os.makedirs(os.path.dirname(waves_file), exist_ok=True)
+    tmp_file = f"{waves_file}.{os.getpid()}.tmp"
+    with open(tmp_file, "w", encoding="utf-8") as fd:
+        json.dump(waves, fd)
+    os.replace(tmp_file, waves_file)
+
+
+def wave_started(wave, nodes, reset=False):
+    """Record the start of an upgrade wave
+
+    Args:
+        wave (str): Name of the wave
+        nodes (list): Nodes upgraded in this wave
+        reset (bool, optional): Whether or not previously recorded waves should be dropped. Defaults to False.
+
+    Returns:
+        dict: The wave name and nodes
+
+    CLI Examples:
+
+    .. code-block:: bash
+
+        salt-run metalk8s_upgrade.wave_started wave=1 nodes='[node-1, node-2]'
+    """
+    wave = str(wave)
+    waves = {} if reset else _read_waves()
+    waves[wave] = {"nodes": list(nodes), "started_at": time.time()}
+    _write_waves(waves)
+
+    log.info("Starting upgrade wave %s on nodes: %s", wave, ", ".join(nodes))
+
+    return {"wave": wave, "nodes": list(nodes)}
+
+
+def wave_done(wave):
+    """Record the end of an upgrade wave, and report its duration
+
+    Args:
+        wave (str): Name of the wave
+
+    Returns:
+        dict: The wave name, nodes and duration (in seconds, `None` if the
+            start of the wave was not recorded)
+
+    CLI Examples:
+
+    .. code-block:: bash
+
+        salt-run metalk8s_upgrade.wave_done wave=1
+    """
+    wave = str(wave)
+    waves = _read_waves()
+    info = waves.get(wave, {})
+
+    duration = None
+    if "started_at" in info:
+        duration = round(time.time() - info["started_at"], 3)
+        info["duration"] = duration
+        _write_waves(waves)
+
+    log.info("Upgrade wave %s done in %s seconds", wave, duration)
+
+    return {"wave": wave, "nodes": info.get("nodes", []), "duration": duration}
+
+
+def waves_report():
+    """Report the duration of all the recorded upgrade waves
+
+    CLI Examples:
+
+    .. code-block:: bash
+
+        salt-run metalk8s_upgrade.waves_report
+    """
+    return {
+        wave: {"nodes": info.get("nodes", []), "duration": info.get("duration")}
+        for wave, info in _read_waves().items()
+    }
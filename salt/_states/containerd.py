@@ -4,6 +4,7 @@ States to manage the :program:`containerd` CRI runtime.
 
 import logging
 import os
+import time
 
 log = logging.getLogger(__name__)
 
@@ -116,3 +117,74 @@ def image_managed(name, archive_path=None):
             ret["comment"] = "Failed to pull image"
 
     return ret
+
+
+def images_present(name, images, concurrency=None):
+    """
+    Ensure several images are in the CRI image cache, pulling missing ones
+    concurrently.
+
+    name
+        Name of the state
+    images
+        List of tags or digests of the images
+    concurrency : None
+        Maximum number of images pulled at the same time (defaults to the
+        `cri.pull_images` default)
+
+    The duration of each pull and the size of each pulled image are
+    reported in the state changes.
+    """
+    ret = {
+        "name": name,
+        "result": False,
+        "changes": {},
+        "pchanges": {},
+        "comment": "",
+    }
+
+    availability = __salt__["cri.available_many"](images)
+    missing = [image for image in images if not availability[image]]
+
+    if not missing:
+        ret["comment"] = "All images already available"
+        ret["result"] = True
+        return ret
+
+    if __opts__["test"]:
+        ret["comment"] = f"Will pull {len(missing)} images"
+        ret["result"] = None
+        ret["pchanges"] = {
+            image: {"old": {}, "new": {"name": image}} for image in missing
+        }
+        return ret
+
+    pull_kwargs = {}
+    if concurrency:
+        pull_kwargs["concurrency"] = concurrency
+
+    start = time.monotonic()
+    results = __salt__["cri.pull_images"](missing, **pull_kwargs)
+    duration = time.monotonic() - start
+
+    failed = []
+    total_size = 0
+    for image in missing:
+        result = results.get(image)
+        if not result:
+            failed.append(image)
+            continue
+
+        total_size += result.get("size") or 0
+        ret["changes"][image] = {"old": {}, "new": result}
+
+    ret["comment"] = (
+        f"Pulled {len(ret['changes'])} images ({total_size} bytes) "
+        f"in {duration:.1f} seconds"
+    )
+    if failed:
+        ret["comment"] += f", failed to pull: {', '.join(failed)}"
+    else:
+        ret["result"] = True
+
+    return ret
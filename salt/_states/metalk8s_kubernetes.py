@@ -1,16 +1,31 @@
 """Management of Kubernetes objects as Salt states.
 
 This module defines three state functions: `object_present`, `object_absent`
-and `object_updated`.
+and `object_updated`, along with `objects_present` to apply a whole stream of
+manifests at once.
 Those will then simply delegate all the logic to the `metalk8s_kubernetes`
 execution module, only managing simple dicts in this state module.
 """
 
+from concurrent.futures import ThreadPoolExecutor
 import time
 from salt.exceptions import CommandExecutionError
 
 __virtualname__ = "metalk8s_kubernetes"
 
+# Default number of objects written concurrently by `objects_present`
+BULK_DEFAULT_WORKERS = 8
+
+# Kinds other objects may depend on, `objects_present` applies them one by one
+# and only once all the objects before them in the stream have been applied
+BULK_BARRIER_KINDS = {
+    "Namespace",
+    "CustomResourceDefinition",
+    "APIService",
+    "MutatingWebhookConfiguration",
+    "ValidatingWebhookConfiguration",
+}
+
 
 def __virtual__():
     if "metalk8s_kubernetes.create_object" not in __salt__:
@@ -96,13 +111,18 @@ def object_absent(name, manifest=None, wait=None, **kwargs):
     return ret
 
 
-def object_present(name, manifest=None, **kwargs):
+def object_present(name, manifest=None, server_side=False, **kwargs):
     """Ensure that the object is present.
 
+    The object is only written if it does not exist or if its manifest
+    changed since it was last applied (see the `apply_object` execution
+    function).
+
     Arguments:
         name (str): Path to a manifest yaml file
                     or just a name if manifest provided
         manifest (dict): Manifest content
+        server_side (bool): Use server-side apply to write the object
     """
     ret = {"name": name, "changes": {}, "result": True, "comment": ""}
 
@@ -139,33 +159,16 @@ def object_present(name, manifest=None, **kwargs):
                 name=name_arg, manifest=manifest, saltenv=__env__, **kwargs
             )
 
-        if __opts__["test"]:
-            ret["result"] = None
-            ret[
-                "comment"
-            ] = f"The object is going to be {'created' if obj is None else 'replaced'}"
-            return ret
-
-        if obj is None:
-            __salt__["metalk8s_kubernetes.create_object"](
-                name=name_arg, manifest=manifest, saltenv=__env__, **kwargs
-            )
-            ret["changes"] = {"old": "absent", "new": "present"}
-            ret["comment"] = "The object was created"
-
-            return ret
+        if not manifest_content:
+            raise CommandExecutionError(f'Unable to read manifest "{name}"')
 
-        # TODO: Attempt to handle idempotency as much as possible here, we don't
-        #       want to always replace if nothing changed. Currently though, we
-        #       don't know how to achieve this, since some fields may be set by
-        #       api-server or by the user without us being able to distinguish
-        #       them.
         try:
-            new = __salt__["metalk8s_kubernetes.replace_object"](
-                name=name_arg,
-                manifest=manifest,
+            result = __salt__["metalk8s_kubernetes.apply_object"](
+                manifest=manifest_content,
                 old_object=obj,
                 saltenv=__env__,
+                test=__opts__["test"],
+                server_side=server_side,
                 **kwargs,
             )
         # Handle the conflict error by getting the most up to date object
@@ -176,8 +179,23 @@ def object_present(name, manifest=None, **kwargs):
                 continue
             raise
 
-        diff = __utils__["dictdiffer.recursive_diff"](obj, new)
-        if new.get("kind") == "Secret":
+        if result["action"] == "unchanged":
+            ret["comment"] = "The object is already up to date"
+            return ret
+
+        if __opts__["test"]:
+            ret["result"] = None
+            ret["comment"] = f"The object is going to be {result['action']}"
+            return ret
+
+        if result["action"] == "created":
+            ret["changes"] = {"old": "absent", "new": "present"}
+            ret["comment"] = "The object was created"
+
+            return ret
+
+        diff = __utils__["dictdiffer.recursive_diff"](obj, result["new"])
+        if result["new"].get("kind") == "Secret":
             ret["changes"] = {"old": "REDACTED", "new": "REDACTED"}
         else:
             ret["changes"] = diff.diffs
@@ -190,6 +208,191 @@ def object_present(name, manifest=None, **kwargs):
     )
 
 
+def _object_desc(manifest):
+    metadata = manifest.get("metadata") or {}
+    name = metadata.get("name") or metadata.get("generateName")
+    if metadata.get("namespace"):
+        name = f"{metadata['namespace']}/{name}"
+
+    return f"{manifest['apiVersion']}/{manifest['kind']} '{name}'"
+
+
+def _bulk_segments(manifests):
+    """Split a stream of manifests in segments that can be applied concurrently.
+
+    Objects of `BULK_BARRIER_KINDS` are put in their own sequential segments,
+    so that the stream order is kept between segments.
+    """
+    segments = []
+    for manifest in manifests:
+        sequential = manifest["kind"] in BULK_BARRIER_KINDS
+        if not segments or segments[-1][0] != sequential:
+            segments.append((sequential, []))
+        segments[-1][1].append(manifest)
+
+    return segments
+
+
+def _bulk_group(manifest, scopes, **kwargs):
+    """Return the (apiVersion, kind, namespace) an object is listed with.
+
+    The namespace is `None` for cluster-scoped kinds. The `scopes` dict maps
+    each (apiVersion, kind) to whether it is namespaced, or to `None` if it
+    is unknown (e.g. it comes from a CRD not yet served).
+    """
+    kind = (manifest["apiVersion"], manifest["kind"])
+    if kind not in scopes:
+        try:
+            scopes[kind] = __salt__["metalk8s_kubernetes.is_namespaced"](
+                kind=kind[1], apiVersion=kind[0], **kwargs
+            )
+        except CommandExecutionError:
+            scopes[kind] = None
+
+    if scopes[kind] is False:
+        return kind + (None,)
+    return kind + (manifest["metadata"].get("namespace") or "default",)
+
+
+def _bulk_prefetch(groups, cache, **kwargs):
+    """Retrieve existing objects with a single LIST per kind and namespace.
+
+    The `cache` dict maps each (apiVersion, kind, namespace) group (see
+    `_bulk_group`) to the listed objects by name, or to `None` if the listing
+    failed (e.g. the kind comes from a CRD not yet served), in which case
+    objects are retrieved one by one.
+    """
+    for group in groups:
+        if group in cache:
+            continue
+
+        try:
+            objects = __salt__["metalk8s_kubernetes.list_objects"](
+                kind=group[1], apiVersion=group[0], namespace=group[2], **kwargs
+            )
+        except CommandExecutionError:
+            cache[group] = None
+        else:
+            cache[group] = {obj["metadata"]["name"]: obj for obj in objects}
+
+
+def _bulk_apply(manifest, group, cache, retries=5, server_side=False, **kwargs):
+    metadata = manifest["metadata"]
+    listed = cache.get(group)
+
+    for _ in range(retries):
+        # Objects with a "generateName" are unique, we always create them
+        if metadata.get("generateName"):
+            obj = None
+        elif listed is not None:
+            obj = listed.get(metadata["name"])
+        else:
+            obj = __salt__["metalk8s_kubernetes.get_object"](
+                manifest=manifest, saltenv=__env__, **kwargs
+            )
+
+        try:
+            return __salt__["metalk8s_kubernetes.apply_object"](
+                manifest=manifest,
+                old_object=obj,
+                saltenv=__env__,
+                test=__opts__["test"],
+                server_side=server_side,
+                **kwargs,
+            )
+        # Handle the conflict error by getting the most up to date object
+        # and retrying
+        except CommandExecutionError as exc:
+            if exc.message != "409 Conflict":
+                raise
+            listed = None
+
+    raise CommandExecutionError(
+        f"After {retries} retries, still getting 409 Conflict error, aborting."
+    )
+
+
+def objects_present(name, manifests, workers=None, server_side=False, **kwargs):
+    """Ensure that all objects from a list of manifests are present.
+
+    Existing objects are retrieved with a single LIST per kind and namespace,
+    and only objects whose manifest changed are written, `workers` of them
+    concurrently. Objects of some kinds (see `BULK_BARRIER_KINDS`) are
+    applied sequentially, before any object following them in `manifests`.
+
+    Arguments:
+        name (str): Name of the state
+        manifests (list): List of manifests content
+        workers (int): Maximum number of objects written concurrently
+        server_side (bool): Use server-side apply to write the objects
+    """
+    ret = {"name": name, "changes": {}, "result": True, "comment": ""}
+
+    workers = int(workers or BULK_DEFAULT_WORKERS)
+    counts = {"created": 0, "replaced": 0, "unchanged": 0}
+    errors = []
+    scopes = {}
+    cache = {}
+
+    for sequential, segment in _bulk_segments(manifests):
+        groups = [_bulk_group(manifest, scopes, **kwargs) for manifest in segment]
+        _bulk_prefetch(groups, cache, **kwargs)
+
+        with ThreadPoolExecutor(max_workers=1 if sequential else workers) as pool:
+            futures = [
+                (
+                    manifest,
+                    pool.submit(
+                        _bulk_apply,
+                        manifest,
+                        group,
+                        cache,
+                        server_side=server_side,
+                        **kwargs,
+                    ),
+                )
+                for manifest, group in zip(segment, groups)
+            ]
+
+            for manifest, future in futures:
+                desc = _object_desc(manifest)
+                try:
+                    result = future.result()
+                except Exception as exc:  # pylint: disable=broad-except
+                    errors.append(f"{desc}: {exc}")
+                    continue
+
+                counts[result["action"]] += 1
+                if result["action"] == "created":
+                    ret["changes"][desc] = {"old": "absent", "new": "present"}
+                elif result["action"] == "replaced":
+                    if __opts__["test"]:
+                        ret["changes"][desc] = {"old": "present", "new": "replaced"}
+                    elif manifest["kind"] == "Secret":
+                        ret["changes"][desc] = {"old": "REDACTED", "new": "REDACTED"}
+                    else:
+                        ret["changes"][desc] = __utils__["dictdiffer.recursive_diff"](
+                            result["old"], result["new"]
+                        ).diffs
+
+    verb = "are going to be" if __opts__["test"] else "were"
+    comments = [
+        f"{counts['created']} object(s) {verb} created, "
+        f"{counts['replaced']} {verb} replaced, "
+        f"{counts['unchanged']} already up to date"
+    ]
+    if errors:
+        ret["result"] = False
+        comments.append(f"Failed to apply {len(errors)} object(s):")
+        comments.extend(errors)
+    elif __opts__["test"] and ret["changes"]:
+        ret["result"] = None
+
+    ret["comment"] = "\n".join(comments)
+
+    return ret
+
+
 def object_updated(name, manifest=None, **kwargs):
     """Update an existing object.
 
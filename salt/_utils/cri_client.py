@@ -0,0 +1,382 @@
+"""In-process client for the CRI API, talking to the container runtime over
+gRPC.
+
+Only the subset of the CRI API (`runtime.v1`) used by the `cri` execution
+module is described here, the messages being built at runtime so that no
+generated code is needed.
+"""
+
+import logging
+import os
+import threading
+
+MISSING_DEPS = []
+
+try:
+    import grpc
+except ImportError:
+    MISSING_DEPS.append("grpcio")
+
+try:
+    from google.protobuf import descriptor_pb2
+    from google.protobuf import descriptor_pool
+    from google.protobuf import json_format
+    from google.protobuf import message_factory
+except ImportError:
+    MISSING_DEPS.append("protobuf")
+
+from salt.exceptions import CommandExecutionError
+import salt.utils.files
+import salt.utils.yaml
+
+log = logging.getLogger(__name__)
+
+__virtualname__ = "cri"
+
+# Runtime endpoint used if not set in `CRICTL_CONFIG`
+DEFAULT_ENDPOINT = "unix:///run/containerd/containerd.sock"
+CRICTL_CONFIG = "/etc/crictl.yaml"
+# Default timeout (in seconds) of CRI calls
+TIMEOUT = 10
+
+CRI_PACKAGE = "runtime.v1"
+
+# Enums, as `{name: [values]}`
+CRI_ENUMS = {
+    "PodSandboxState": ["SANDBOX_READY", "SANDBOX_NOTREADY"],
+    "ContainerState": [
+        "CONTAINER_CREATED",
+        "CONTAINER_RUNNING",
+        "CONTAINER_EXITED",
+        "CONTAINER_UNKNOWN",
+    ],
+}
+
+# Messages, as `{name: [(field name, field number, field type, repeated)]}`,
+# where the field type is either a scalar type, `map` (string to string) or
+# the name of an enum or a message
+CRI_MESSAGES = {
+    "VersionRequest": [("version", 1, "string", False)],
+    "VersionResponse": [
+        ("version", 1, "string", False),
+        ("runtime_name", 2, "string", False),
+        ("runtime_version", 3, "string", False),
+        ("runtime_api_version", 4, "string", False),
+    ],
+    "PodSandboxMetadata": [
+        ("name", 1, "string", False),
+        ("uid", 2, "string", False),
+        ("namespace", 3, "string", False),
+        ("attempt", 4, "uint32", False),
+    ],
+    "PodSandboxStateValue": [("state", 1, "PodSandboxState", False)],
+    "PodSandboxFilter": [
+        ("id", 1, "string", False),
+        ("state", 2, "PodSandboxStateValue", False),
+        ("label_selector", 3, "map", False),
+    ],
+    "ListPodSandboxRequest": [("filter", 1, "PodSandboxFilter", False)],
+    "PodSandbox": [
+        ("id", 1, "string", False),
+        ("metadata", 2, "PodSandboxMetadata", False),
+        ("state", 3, "PodSandboxState", False),
+        ("created_at", 4, "int64", False),
+        ("labels", 5, "map", False),
+        ("annotations", 6, "map", False),
+        ("runtime_handler", 7, "string", False),
+    ],
+    "ListPodSandboxResponse": [("items", 1, "PodSandbox", True)],
+    "StopPodSandboxRequest": [("pod_sandbox_id", 1, "string", False)],
+    "StopPodSandboxResponse": [],
+    "ContainerMetadata": [
+        ("name", 1, "string", False),
+        ("attempt", 2, "uint32", False),
+    ],
+    "ImageSpec": [
+        ("image", 1, "string", False),
+        ("annotations", 2, "map", False),
+    ],
+    "ContainerStateValue": [("state", 1, "ContainerState", False)],
+    "ContainerFilter": [
+        ("id", 1, "string", False),
+        ("state", 2, "ContainerStateValue", False),
+        ("pod_sandbox_id", 3, "string", False),
+        ("label_selector", 4, "map", False),
+    ],
+    "ListContainersRequest": [("filter", 1, "ContainerFilter", False)],
+    "Container": [
+        ("id", 1, "string", False),
+        ("pod_sandbox_id", 2, "string", False),
+        ("metadata", 3, "ContainerMetadata", False),
+        ("image", 4, "ImageSpec", False),
+        ("image_ref", 5, "string", False),
+        ("state", 6, "ContainerState", False),
+        ("created_at", 7, "int64", False),
+        ("labels", 8, "map", False),
+        ("annotations", 9, "map", False),
+    ],
+    "ListContainersResponse": [("containers", 1, "Container", True)],
+    "Int64Value": [("value", 1, "int64", False)],
+    "ImageFilter": [("image", 1, "ImageSpec", False)],
+    "ListImagesRequest": [("filter", 1, "ImageFilter", False)],
+    "Image": [
+        ("id", 1, "string", False),
+        ("repo_tags", 2, "string", True),
+        ("repo_digests", 3, "string", True),
+        ("size", 4, "uint64", False),
+        ("uid", 5, "Int64Value", False),
+        ("username", 6, "string", False),
+    ],
+    "ListImagesResponse": [("images", 1, "Image", True)],
+}
+
+# RPCs, as `{name: (service, request message, response message)}`
+CRI_METHODS = {
+    "Version": ("RuntimeService", "VersionRequest", "VersionResponse"),
+    "ListPodSandbox": (
+        "RuntimeService",
+        "ListPodSandboxRequest",
+        "ListPodSandboxResponse",
+    ),
+    "StopPodSandbox": (
+        "RuntimeService",
+        "StopPodSandboxRequest",
+        "StopPodSandboxResponse",
+    ),
+    "ListContainers": (
+        "RuntimeService",
+        "ListContainersRequest",
+        "ListContainersResponse",
+    ),
+    "ListImages": ("ImageService", "ListImagesRequest", "ListImagesResponse"),
+}
+
+_MESSAGE_CLASSES = {}
+_MESSAGE_CLASSES_LOCK = threading.Lock()
+
+# Clients, keyed on their endpoint
+_CLIENTS = {}
+_CLIENTS_LOCK = threading.Lock()
+
+
+def __virtual__():
+    if MISSING_DEPS:
+        error_msg = f"Missing dependencies: {', '.join(MISSING_DEPS)}"
+        return False, error_msg
+
+    return __virtualname__
+
+
+def _build_file_descriptor():
+    scalar_types = {
+        "string": descriptor_pb2.FieldDescriptorProto.TYPE_STRING,
+        "uint32": descriptor_pb2.FieldDescriptorProto.TYPE_UINT32,
+        "int64": descriptor_pb2.FieldDescriptorProto.TYPE_INT64,
+        "uint64": descriptor_pb2.FieldDescriptorProto.TYPE_UINT64,
+        "bool": descriptor_pb2.FieldDescriptorProto.TYPE_BOOL,
+    }
+
+    file_proto = descriptor_pb2.FileDescriptorProto(
+        name="metalk8s/cri.proto", package=CRI_PACKAGE, syntax="proto3"
+    )
+
+    for enum_name, values in CRI_ENUMS.items():
+        enum_proto = file_proto.enum_type.add(name=enum_name)
+        for number, value in enumerate(values):
+            enum_proto.value.add(name=value, number=number)
+
+    for message_name, fields in CRI_MESSAGES.items():
+        message_proto = file_proto.message_type.add(name=message_name)
+        for field_name, number, field_type, repeated in fields:
+            field_proto = message_proto.field.add(
+                name=field_name,
+                number=number,
+                label=(
+                    descriptor_pb2.FieldDescriptorProto.LABEL_REPEATED
+                    if repeated or field_type == "map"
+                    else descriptor_pb2.FieldDescriptorProto.LABEL_OPTIONAL
+                ),
+            )
+            if field_type in scalar_types:
+                field_proto.type = scalar_types[field_type]
+            elif field_type == "map":
+                entry_name = (
+                    "".join(part.capitalize() for part in field_name.split("_"))
+                    + "Entry"
+                )
+                entry_proto = message_proto.nested_type.add(name=entry_name)
+                entry_proto.options.map_entry = True
+                for entry_field, entry_number in (("key", 1), ("value", 2)):
+                    entry_proto.field.add(
+                        name=entry_field,
+                        number=entry_number,
+                        type=descriptor_pb2.FieldDescriptorProto.TYPE_STRING,
+                        label=descriptor_pb2.FieldDescriptorProto.LABEL_OPTIONAL,
+                    )
+                field_proto.type = descriptor_pb2.FieldDescriptorProto.TYPE_MESSAGE
+                field_proto.type_name = f".{CRI_PACKAGE}.{message_name}.{entry_name}"
+            elif field_type in CRI_ENUMS:
+                field_proto.type = descriptor_pb2.FieldDescriptorProto.TYPE_ENUM
+                field_proto.type_name = f".{CRI_PACKAGE}.{field_type}"
+            else:
+                field_proto.type = descriptor_pb2.FieldDescriptorProto.TYPE_MESSAGE
+                field_proto.type_name = f".{CRI_PACKAGE}.{field_type}"
+
+    return file_proto
+
+
+def get_message_classes():
+    """
+    Return the classes of the CRI messages, keyed on their name
+    """
+    with _MESSAGE_CLASSES_LOCK:
+        if not _MESSAGE_CLASSES:
+            pool = descriptor_pool.DescriptorPool()
+            pool.Add(_build_file_descriptor())
+            for message_name in CRI_MESSAGES:
+                descriptor = pool.FindMessageTypeByName(f"{CRI_PACKAGE}.{message_name}")
+                if hasattr(message_factory, "GetMessageClass"):
+                    message_class = message_factory.GetMessageClass(descriptor)
+                else:
+                    message_class = message_factory.MessageFactory(pool).GetPrototype(
+                        descriptor
+                    )
+                _MESSAGE_CLASSES[message_name] = message_class
+
+        return dict(_MESSAGE_CLASSES)
+
+
+def message_to_dict(message):
+    """
+    Convert a CRI message to a dict, in the same format as `crictl -o json`
+    """
+    try:
+        return json_format.MessageToDict(
+            message, always_print_fields_with_no_presence=True
+        )
+    except TypeError:
+        # protobuf < 5.26
+        return json_format.MessageToDict(message, including_default_value_fields=True)
+
+
+class CriClient:
+    """
+    CRI client, using a single gRPC channel to the container runtime
+    """
+
+    def __init__(self, endpoint, timeout=TIMEOUT):
+        self.endpoint = endpoint
+        self.timeout = timeout
+        self.channel = grpc.insecure_channel(endpoint)
+        self._messages = get_message_classes()
+        self._methods = {}
+
+    def close(self):
+        self.channel.close()
+
+    def call(self, method, timeout=None, **request):
+        """
+        Call a CRI method, the request and response being dicts
+        """
+        service, request_name, response_name = CRI_METHODS[method]
+        if method not in self._methods:
+            self._methods[method] = self.channel.unary_unary(
+                f"/{CRI_PACKAGE}.{service}/{method}",
+                request_serializer=self._messages[request_name].SerializeToString,
+                response_deserializer=self._messages[response_name].FromString,
+            )
+
+        message = json_format.ParseDict(request, self._messages[request_name]())
+        try:
+            response = self._methods[method](message, timeout=timeout or self.timeout)
+        except grpc.RpcError as exc:
+            raise CommandExecutionError(
+                f"CRI call {method} on {self.endpoint} failed: {exc}"
+            ) from exc
+
+        return message_to_dict(response)
+
+    def version(self, timeout=None):
+        return self.call("Version", timeout=timeout)
+
+    def list_pod_sandboxes(self, labels=None, state=None):
+        """
+        List pod sandboxes, optionally filtered on labels and state
+        (`ready` or `notready`)
+        """
+        pod_filter = {}
+        if labels:
+            pod_filter["labelSelector"] = labels
+        if state:
+            pod_filter["state"] = {"state": f"SANDBOX_{state.upper()}"}
+
+        return self.call("ListPodSandbox", filter=pod_filter).get("items", [])
+
+    def stop_pod_sandbox(self, pod_id):
+        return self.call("StopPodSandbox", podSandboxId=pod_id)
+
+    def list_containers(self, labels=None, state=None):
+        """
+        List containers, optionally filtered on labels and state (`created`,
+        `running`, `exited` or `unknown`)
+        """
+        container_filter = {}
+        if labels:
+            container_filter["labelSelector"] = labels
+        if state:
+            container_filter["state"] = {"state": f"CONTAINER_{state.upper()}"}
+
+        return self.call("ListContainers", filter=container_filter).get(
+            "containers", []
+        )
+
+    def list_images(self):
+        return self.call("ListImages").get("images", [])
+
+
+def _runtime_endpoint():
+    try:
+        with salt.utils.files.fopen(CRICTL_CONFIG, "r") as fd:
+            config = salt.utils.yaml.safe_load(fd) or {}
+    except (OSError, salt.utils.yaml.YAMLError):
+        config = {}
+
+    return config.get("runtime-endpoint") or DEFAULT_ENDPOINT
+
+
+def get_client(endpoint=None):
+    """
+    Retrieve the CRI client for the given endpoint (defaults to the runtime
+    endpoint from `/etc/crictl.yaml`)
+
+    Clients are cached, so that a single gRPC channel is used by the current
+    process. Returns `None` if the in-process client is disabled (using the
+    `metalk8s_cri_grpc` option) or if the runtime socket does not exist, in
+    which case `crictl` should be used instead.
+    """
+    if not __opts__.get("metalk8s_cri_grpc", True):
+        return None
+
+    if endpoint is None:
+        endpoint = _runtime_endpoint()
+
+    if endpoint.startswith("unix://") and not os.path.exists(
+        endpoint[len("unix://") :]
+    ):
+        log.debug("CRI socket %s does not exist", endpoint)
+        return None
+
+    with _CLIENTS_LOCK:
+        if endpoint not in _CLIENTS:
+            _CLIENTS[endpoint] = CriClient(endpoint)
+        return _CLIENTS[endpoint]
+
+
+def invalidate_client(endpoint=None):
+    """
+    Close and forget the client for the given endpoint, or all of them
+    """
+    with _CLIENTS_LOCK:
+        for cached_endpoint in list(_CLIENTS):
+            if endpoint is None or cached_endpoint == endpoint:
+                _CLIENTS.pop(cached_endpoint).close()
@@ -1,17 +1,55 @@
 """Utility methods for MetalK8s Kubernetes modules.
 """
 
+from collections import OrderedDict
+import glob
+import hashlib
+import logging
+import os
+import threading
 import time
 
 MISSING_DEPS = []
 
 try:
     import kubernetes
+    from kubernetes.client.rest import ApiException
+    from kubernetes.dynamic.exceptions import ResourceNotFoundError
 except ImportError:
     MISSING_DEPS.append("kubernetes")
 
+try:
+    from urllib3.exceptions import HTTPError
+except ImportError:
+    MISSING_DEPS.append("urllib3")
+
+from salt.exceptions import CommandExecutionError
+
+log = logging.getLogger(__name__)
+
 __virtualname__ = "metalk8s_kubernetes"
 
+# Maximum number of `DynamicClient` kept in the process-wide client cache
+CLIENT_CACHE_SIZE = 8
+# Number of seconds after which the API discovery of a cached client is
+# refreshed
+CLIENT_DISCOVERY_TTL = 300
+
+# Version of the on-disk API discovery cache layout, bump it to ignore
+# previously written cache files
+DISCOVERY_CACHE_VERSION = 1
+DISCOVERY_CACHE_DIR = "metalk8s/kubernetes-discovery"
+
+# Cached clients, keyed on (kubeconfig path, kubeconfig mtime, context)
+_CLIENT_CACHE = OrderedDict()
+_CLIENT_CACHE_LOCK = threading.Lock()
+_CLIENT_CACHE_STATS = {
+    "hits": 0,
+    "misses": 0,
+    "refreshes": 0,
+    "invalidations": 0,
+}
+
 
 def __virtual__():
     if MISSING_DEPS:
@@ -21,18 +59,203 @@ def __virtual__():
     return __virtualname__
 
 
-def get_client(kubeconfig, context, attempts=5):
+def _client_cache_key(kubeconfig, context):
+    try:
+        mtime = os.stat(kubeconfig).st_mtime
+    except (OSError, TypeError):
+        mtime = None
+
+    return (kubeconfig, mtime, context)
+
+
+def _discovery_cache_file(api_client):
     """
-    Simple wrapper to retry on DynamicClient creation since it
-    may fail from time to time
+    Compute the path of the API discovery cache file for an API client
+
+    The file lives in the Salt cachedir and is keyed on the API server URL
+    and the API server version, so that a cluster upgrade always triggers
+    a new discovery. Previous cache files for the same API server are removed.
+
+    Returns `None` if no cache file can be used.
     """
+    cachedir = __opts__.get("cachedir")
+    if not cachedir:
+        return None
+
+    try:
+        version_info = kubernetes.client.VersionApi(api_client).get_code()
+    except Exception as exc:  # pylint: disable=broad-except
+        log.debug("Unable to retrieve API server version: %s", exc)
+        return None
+
+    cache_dir = os.path.join(cachedir, DISCOVERY_CACHE_DIR)
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+    except OSError as exc:
+        log.debug("Unable to create API discovery cache directory: %s", exc)
+        return None
+
+    host_hash = hashlib.sha256(api_client.configuration.host.encode()).hexdigest()
+    version_hash = hashlib.sha256(version_info.git_version.encode()).hexdigest()
+    cache_file = os.path.join(
+        cache_dir,
+        f"v{DISCOVERY_CACHE_VERSION}-{host_hash[:16]}-{version_hash[:16]}.json",
+    )
+
+    for stale_file in glob.glob(os.path.join(cache_dir, f"*-{host_hash[:16]}-*.json")):
+        if stale_file != cache_file:
+            try:
+                os.remove(stale_file)
+            except OSError:
+                pass
+
+    return cache_file
+
+
+def _new_client(kubeconfig, context, attempts):
     while True:
         try:
+            api_client = kubernetes.config.new_client_from_config(kubeconfig, context)
             return kubernetes.dynamic.DynamicClient(
-                kubernetes.config.new_client_from_config(kubeconfig, context)
+                api_client, cache_file=_discovery_cache_file(api_client)
             )
         except Exception:  # pylint: disable=broad-except
             if attempts < 0:
                 raise
             attempts -= 1
             time.sleep(5)
+
+
+def get_client(kubeconfig, context, attempts=5, use_cache=True):
+    """
+    Retrieve a `DynamicClient` for the given kubeconfig and context
+
+    Clients are cached in the current process (see `CLIENT_CACHE_SIZE`),
+    so that the kubeconfig parsing, the connection pool and the API discovery
+    are shared between calls. The cache key includes the kubeconfig
+    modification time, so an updated kubeconfig always gives a new client,
+    and the API discovery of a cached client is refreshed after
+    `CLIENT_DISCOVERY_TTL` seconds.
+
+    API discovery results are also persisted in the Salt cachedir (see
+    `_discovery_cache_file`), so that new processes only discover the API
+    groups they do not know yet.
+
+    Client creation is retried since it may fail from time to time
+    """
+    if not use_cache:
+        return _new_client(kubeconfig, context, attempts)
+
+    key = _client_cache_key(kubeconfig, context)
+    refresh = False
+
+    with _CLIENT_CACHE_LOCK:
+        entry = _CLIENT_CACHE.get(key)
+        if entry is not None:
+            _CLIENT_CACHE.move_to_end(key)
+            _CLIENT_CACHE_STATS["hits"] += 1
+            if time.monotonic() - entry["discovered_at"] > CLIENT_DISCOVERY_TTL:
+                # Only one caller refreshes the discovery
+                entry["discovered_at"] = time.monotonic()
+                refresh = True
+
+    if entry is not None:
+        if not refresh:
+            return entry["client"]
+
+        try:
+            entry["client"].resources.invalidate_cache()
+        except Exception as exc:  # pylint: disable=broad-except
+            log.debug("Unable to refresh API discovery, dropping client: %s", exc)
+            invalidate_client(kubeconfig, context)
+        else:
+            with _CLIENT_CACHE_LOCK:
+                _CLIENT_CACHE_STATS["refreshes"] += 1
+            return entry["client"]
+
+    client = _new_client(kubeconfig, context, attempts)
+
+    with _CLIENT_CACHE_LOCK:
+        _CLIENT_CACHE_STATS["misses"] += 1
+        # Drop clients built from an outdated version of this kubeconfig
+        for cached_key in list(_CLIENT_CACHE):
+            if cached_key[0] == key[0] and cached_key[2] == key[2]:
+                del _CLIENT_CACHE[cached_key]
+        _CLIENT_CACHE[key] = {"client": client, "discovered_at": time.monotonic()}
+        while len(_CLIENT_CACHE) > CLIENT_CACHE_SIZE:
+            _CLIENT_CACHE.popitem(last=False)
+
+    return client
+
+
+def invalidate_client(kubeconfig=None, context=None):
+    """
+    Remove cached clients for the given kubeconfig and context, or all of
+    them if no kubeconfig is given
+
+    Used when a cached client may be outdated, e.g. when an API resource
+    cannot be found
+    """
+    with _CLIENT_CACHE_LOCK:
+        for key in list(_CLIENT_CACHE):
+            if kubeconfig is None or (key[0] == kubeconfig and key[2] == context):
+                del _CLIENT_CACHE[key]
+                _CLIENT_CACHE_STATS["invalidations"] += 1
+
+
+def get_client_cache_stats():
+    """
+    Return the client cache counters, along with the current cache size
+    """
+    with _CLIENT_CACHE_LOCK:
+        return dict(_CLIENT_CACHE_STATS, size=len(_CLIENT_CACHE))
+
+
+def watch_objects(
+    kubeconfig,
+    context,
+    kind,
+    apiVersion,
+    namespace="default",
+    all_namespaces=False,
+    field_selector=None,
+    label_selector=None,
+    resource_version=None,
+    timeout=None,
+):
+    """
+    Watch objects of a type using some object description
+
+    Returns a generator of events, as dicts with the event `type` ("ADDED",
+    "MODIFIED" or "DELETED") and the `object`. The watch starts from
+    `resource_version` if provided, and ends after `timeout` seconds.
+    """
+    client = get_client(kubeconfig, context)
+    try:
+        api = client.resources.get(api_version=apiVersion, kind=kind)
+    except ResourceNotFoundError as exc:
+        # The cached client may be outdated (e.g. CRD just created)
+        invalidate_client(kubeconfig, context)
+        raise CommandExecutionError(
+            f"Kind '{kind}' from apiVersion '{apiVersion}' is unknown"
+        ) from exc
+
+    call_kwargs = {}
+    if not all_namespaces and api.namespaced:
+        call_kwargs["namespace"] = namespace
+    if field_selector:
+        call_kwargs["field_selector"] = field_selector
+    if label_selector:
+        call_kwargs["label_selector"] = label_selector
+    if resource_version:
+        call_kwargs["resource_version"] = resource_version
+    if timeout:
+        call_kwargs["timeout"] = int(timeout)
+
+    try:
+        for event in api.watch(**call_kwargs):
+            yield {"type": event["type"], "object": event["raw_object"]}
+    except (ApiException, HTTPError) as exc:
+        raise CommandExecutionError(
+            f'Failed to watch resources "{apiVersion}/{kind}"'
+        ) from exc
@@ -5,6 +5,70 @@ The utilities contained in this module have no external dependencies, so
 they may be imported as is in external pillar modules.
 """
 
+import copy
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+log = logging.getLogger(__name__)
+
+# Default number of seconds a cluster snapshot entry is shared between pillar
+# compilations, disabled by default since callers often expect the pillar to
+# reflect changes they just made (e.g. a Node label or a new Volume)
+SNAPSHOT_TTL = 0
+# Default number of seconds for data only read by MetalK8s states, so that a
+# pillar compilation for every minion (e.g. a highstate) only fetches it once
+READ_ONLY_SNAPSHOT_TTL = 5
+SNAPSHOT_DIR = "metalk8s/pillar-snapshot"
+
+# In-process snapshot entries, as {key: (timestamp, data)}
+_SNAPSHOT = {}
+_SNAPSHOT_LOCKS = {}
+_SNAPSHOT_LOCKS_LOCK = threading.Lock()
+
+# Key of the `extra_minion_data` sent with a pillar compilation request, which
+# lists the only MetalK8s ext_pillars to evaluate (see `pillar_sources`)
+SOURCES_KEY = "metalk8s_pillar_sources"
+
+# Pillar key prefixes provided by each MetalK8s ext_pillar
+SOURCE_PREFIXES = {
+    "metalk8s": [
+        "addons",
+        "kubernetes",
+        "metalk8s.archives",
+        "metalk8s.ca",
+        "metalk8s.debug",
+        "networks",
+        "proxies",
+        "salt",
+    ],
+    "metalk8s_endpoints": ["metalk8s.endpoints"],
+    "metalk8s_nodes": [
+        "metalk8s.cluster_config",
+        "metalk8s.cluster_version",
+        "metalk8s.nodes",
+        "metalk8s.volumes",
+    ],
+    "metalk8s_private": ["metalk8s.private"],
+    "metalk8s_solutions": ["metalk8s.solutions"],
+    "metalk8s_etcd": ["metalk8s.etcd"],
+}
+
+# ext_pillars relying on the data of other ext_pillars
+SOURCE_REQUIREMENTS = {
+    "metalk8s_nodes": ["metalk8s"],
+    "metalk8s_private": ["metalk8s_nodes"],
+    "metalk8s_solutions": ["metalk8s_nodes"],
+    "metalk8s_etcd": ["metalk8s_nodes"],
+}
+
+# Number of seconds above which an ext_pillar is reported as slow
+SLOW_SOURCE_THRESHOLD = 5
+
 
 def assert_equals(source_dict, expected_dict):
     """
@@ -78,3 +142,218 @@ def errors_to_dict(error_list):
      dict: a dict with `_errors` key and error list value
     """
     return {"_errors": error_list}
+
+
+def pillar_sources(keys):
+    """
+    Find the MetalK8s ext_pillars needed to compute some pillar keys.
+
+    Args:
+     - keys (list): the keys, each one either a dotted str or a list of str
+
+    Returns:
+     list: sorted names of the ext_pillars providing the keys, and of the
+           ext_pillars they rely on, or None if some key is not provided by a
+           MetalK8s ext_pillar (so the whole pillar must be compiled)
+    """
+    sources = set()
+    for key in keys:
+        key_list = key if isinstance(key, list) else key.split(".")
+        for source, prefixes in SOURCE_PREFIXES.items():
+            if any(
+                key_list[: len(prefix.split("."))] == prefix.split(".")
+                for prefix in prefixes
+            ):
+                sources.add(source)
+                break
+        else:
+            return None
+
+    pending = list(sources)
+    while pending:
+        for required in SOURCE_REQUIREMENTS.get(pending.pop(), []):
+            if required not in sources:
+                sources.add(required)
+                pending.append(required)
+
+    return sorted(sources)
+
+
+def sources_minion_data(keys):
+    """
+    Build the `extra_minion_data` of a pillar compilation request, so that
+    only the MetalK8s ext_pillars needed to compute some keys are evaluated.
+
+    Args:
+     - keys (list): the keys, each one either a dotted str or a list of str
+
+    Returns:
+     dict: the `extra_minion_data` to send, or None if the whole pillar must
+           be compiled
+    """
+    sources = pillar_sources(keys)
+    if sources is None:
+        return None
+    return {SOURCES_KEY: sources}
+
+
+def compile_source(name, func, minion_id, pillar, *args, extra_minion_data=None):
+    """
+    Compute the data of a MetalK8s ext_pillar, logging how long it takes.
+
+    If the `extra_minion_data` of the pillar compilation request restricts
+    the ext_pillars to evaluate (see `SOURCES_KEY`) and this one is not part
+    of them, it is skipped.
+
+    Args:
+     - name               (str): the name of the ext_pillar
+     - func              (func): function computing the ext_pillar data, called
+                                 with `minion_id`, `pillar` and `args`
+     - minion_id          (str): the ID of the minion the pillar is for
+     - pillar            (dict): the pillar data computed so far
+     - extra_minion_data (dict): the extra data sent by the minion
+
+    Returns:
+     dict: the ext_pillar data
+    """
+    sources = (extra_minion_data or {}).get(SOURCES_KEY)
+    if sources is not None and name not in sources:
+        log.debug("Skipping ext_pillar %s for %s", name, minion_id)
+        return {}
+
+    start = time.time()
+    try:
+        return func(minion_id, pillar, *args)
+    finally:
+        duration = time.time() - start
+        if duration > SLOW_SOURCE_THRESHOLD:
+            log.warning(
+                "Slow ext_pillar %s for %s: took %.3f seconds",
+                name,
+                minion_id,
+                duration,
+            )
+        else:
+            log.debug(
+                "ext_pillar %s for %s took %.3f seconds", name, minion_id, duration
+            )
+
+
+def _snapshot_lock(key):
+    with _SNAPSHOT_LOCKS_LOCK:
+        return _SNAPSHOT_LOCKS.setdefault(key, threading.Lock())
+
+
+def _read_snapshot_file(path, key, ttl):
+    try:
+        with open(path, "r", encoding="utf-8") as fd:
+            content = json.load(fd)
+    except (OSError, ValueError):
+        return None
+
+    if content.get("key") != key or time.time() - content["timestamp"] > ttl:
+        return None
+
+    return content["timestamp"], content["data"]
+
+
+def _write_snapshot_file(path, key, timestamp, data):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as fd:
+            json.dump({"key": key, "timestamp": timestamp, "data": data}, fd)
+        os.replace(tmp_path, path)
+    except (OSError, TypeError, ValueError) as exc:
+        log.debug("Unable to write pillar snapshot for %s: %s", key, exc)
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+
+
+def _fetch_shared_snapshot(cachedir, key, ttl, fetch):
+    snapshot_dir = os.path.join(cachedir, SNAPSHOT_DIR)
+    path = os.path.join(snapshot_dir, hashlib.sha256(key.encode()).hexdigest())
+    try:
+        os.makedirs(snapshot_dir, exist_ok=True)
+        lock_fd = open(f"{path}.lock", "w", encoding="utf-8")
+    except OSError as exc:
+        log.debug("Unable to use pillar snapshot directory: %s", exc)
+        return None
+
+    with lock_fd:
+        # Other processes fetching the same data hold this lock
+        fcntl.flock(lock_fd, fcntl.LOCK_EX)
+        try:
+            entry = _read_snapshot_file(path, key, ttl)
+            if entry is None:
+                entry = (time.time(), fetch())
+                _write_snapshot_file(path, key, *entry)
+        finally:
+            fcntl.flock(lock_fd, fcntl.LOCK_UN)
+
+    return entry
+
+
+def snapshot_ttl(opts, read_only=False):
+    """
+    Compute the number of seconds a cluster snapshot entry is kept for.
+
+    Args:
+     - opts      (dict): the Salt master options
+     - read_only (bool): whether the data is only read by MetalK8s states,
+                         see `READ_ONLY_SNAPSHOT_TTL`
+
+    Returns:
+     int: the `metalk8s_pillar_snapshot_ttl` master option if set, the
+          default for the data otherwise (0 if the snapshot is disabled)
+    """
+    default = READ_ONLY_SNAPSHOT_TTL if read_only else SNAPSHOT_TTL
+    return opts.get("metalk8s_pillar_snapshot_ttl", default)
+
+
+def cluster_snapshot(opts, key, fetch, item=None, read_only=False):
+    """
+    Retrieve some cluster data from a snapshot shared between pillar
+    compilations, or fetch it.
+
+    Data is kept for a few seconds (see `snapshot_ttl`), in memory and in the
+    Salt cachedir so that all master worker processes share it. Fetching is
+    done by a single caller at a time for a given key, others wait for its
+    result. Exceptions raised by `fetch` are not cached.
+
+    Args:
+     - opts      (dict): the Salt master options
+     - key        (str): identifier of the data, e.g. "nodes"
+     - fetch     (func): function called without argument to fetch the data,
+                         which must be JSON serializable
+     - item       (str): if set, the data must be a dict and only this key of
+                         it is returned (or None if missing), so that callers
+                         only copy the part of the data they need
+     - read_only (bool): whether the data is only read by MetalK8s states,
+                         so that it is shared by default (unlike data callers
+                         may change and read again right away)
+
+    Returns:
+     a copy of the data
+    """
+    ttl = snapshot_ttl(opts, read_only=read_only)
+    cachedir = opts.get("cachedir")
+    if not ttl:
+        data = fetch()
+        return data if item is None else data.get(item)
+
+    with _snapshot_lock(key):
+        entry = _SNAPSHOT.get(key)
+        if entry is None or time.time() - entry[0] > ttl:
+            entry = None
+            if cachedir:
+                entry = _fetch_shared_snapshot(cachedir, key, ttl, fetch)
+            if entry is None:
+                entry = (time.time(), fetch())
+            _SNAPSHOT[key] = entry
+
+        data = entry[1]
+        if item is not None:
+            data = data.get(item)
+        return copy.deepcopy(data)
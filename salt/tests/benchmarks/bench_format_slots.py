@@ -0,0 +1,105 @@
+"""Benchmark `metalk8s.format_slots` on the manifests of the MetalK8s charts.
+
+Manifests are parsed from the chart SLS files (see `bench_renderer.py`),
+then formatted:
+- with the previous implementation, rebuilding every dict and list,
+- with the current implementation, on the manifests as is (some charts
+  hold slots, e.g. to compute the digest of a Secret),
+- with the current implementation, with the same slot added in every object
+  (as a label).
+
+All slots return a static value.
+
+Usage:
+
+    python salt/tests/benchmarks/bench_format_slots.py [--repeat N] [CHART_SLS...]
+"""
+import argparse
+import collections
+import glob
+import importlib.util
+import os
+
+import yaml
+
+from bench_renderer import CHARTS_GLOB, SALT_ROOT, bench, chart_source
+
+
+SLOT = "__slot__:salt:test.echo(slot-value)"
+
+
+def load_module():
+    spec = importlib.util.spec_from_file_location(
+        "metalk8s_module", os.path.join(SALT_ROOT, "_modules", "metalk8s.py")
+    )
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    module.__salt__ = collections.defaultdict(lambda: lambda *_, **__: "slot-value")
+    return module
+
+
+def format_slots_copy(module, data):
+    """Previous implementation of `format_slots`, copying all the data."""
+    if isinstance(data, list):
+        return [format_slots_copy(module, elt) for elt in data]
+
+    if isinstance(data, dict):
+        return {key: format_slots_copy(module, value) for key, value in data.items()}
+
+    if isinstance(data, str) and data.startswith(module.SLOT_PREFIX):
+        return module.format_slots(data)
+
+    return data
+
+
+def with_slot(manifest):
+    metadata = manifest.get("metadata") or {}
+    labels = dict(metadata.get("labels") or {}, slot=SLOT)
+    return dict(manifest, metadata=dict(metadata, labels=labels))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n", 1)[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("charts", nargs="*")
+    args = parser.parse_args()
+
+    charts = args.charts or sorted(glob.glob(CHARTS_GLOB))
+    module = load_module()
+    loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+    print(
+        f"{'chart':<55} {'objects':>8} {'copy':>8} {'as is':>8} "
+        f"{'slots':>8} {'speedup':>8}"
+    )
+    for path in charts:
+        name = os.path.relpath(path, os.path.join(SALT_ROOT, "metalk8s"))
+        manifests = [
+            manifest
+            for manifest in yaml.load_all(chart_source(path), Loader=loader)
+            if manifest
+        ]
+        slotted = [with_slot(manifest) for manifest in manifests]
+
+        for manifest in manifests + slotted:
+            assert module.format_slots(manifest) == format_slots_copy(module, manifest)
+
+        copy_time = bench(
+            lambda: [format_slots_copy(module, m) for m in manifests], args.repeat
+        )
+        as_is_time = bench(
+            lambda: [module.format_slots(m) for m in manifests], args.repeat
+        )
+        slots_time = bench(
+            lambda: [module.format_slots(m) for m in slotted], args.repeat
+        )
+
+        print(
+            f"{name:<55} {len(manifests):>8} {copy_time:>7.4f}s "
+            f"{as_is_time:>7.4f}s {slots_time:>7.4f}s "
+            f"{copy_time / as_is_time:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""Benchmark the `metalk8s_kubernetes` renderer on the charts from MetalK8s.
+
+Jinja statements are stripped from the chart SLS files (image names are
+replaced with a placeholder), then each source is parsed:
+- with the pure-Python PyYAML parser, as used when libyaml is not available,
+- with the renderer, parsing the source from a file handle,
+- with the renderer, when the parsed manifests are in the render cache.
+
+Usage:
+
+    python salt/tests/benchmarks/bench_renderer.py [--repeat N] [CHART_SLS...]
+"""
+import argparse
+import glob
+import importlib.util
+import io
+import os
+import re
+import tempfile
+import timeit
+
+import yaml
+from yaml.loader import SafeLoader as PySafeLoader
+
+
+SALT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+CHARTS_GLOB = os.path.join(
+    SALT_ROOT, "metalk8s", "addons", "*", "deployed", "*chart.sls"
+)
+
+JINJA_EXPR_RE = re.compile(r"\{\{.*?\}\}", re.DOTALL)
+JINJA_STMT_RE = re.compile(r"\{%-?\s*(end)?raw\s*-?%\}|\{%.*?%\}", re.DOTALL)
+
+
+def load_renderer(cachedir):
+    spec = importlib.util.spec_from_file_location(
+        "metalk8s_kubernetes_renderer",
+        os.path.join(SALT_ROOT, "_renderers", "metalk8s_kubernetes.py"),
+    )
+    renderer = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(renderer)
+    renderer.__opts__ = {"cachedir": cachedir}
+    renderer.__pillar__ = {}
+    return renderer
+
+
+def chart_source(path):
+    with open(path, "r", encoding="utf-8") as fd:
+        content = fd.read()
+
+    if content.startswith("#!"):
+        content = content.split("\n", 1)[1]
+    content = JINJA_EXPR_RE.sub("placeholder", content)
+    content = JINJA_STMT_RE.sub("", content)
+    return content
+
+
+def bench(func, repeat):
+    return min(timeit.repeat(func, number=1, repeat=repeat))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n", 1)[0])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("charts", nargs="*")
+    args = parser.parse_args()
+
+    charts = args.charts or sorted(glob.glob(CHARTS_GLOB))
+
+    with tempfile.TemporaryDirectory() as cachedir:
+        renderer = load_renderer(cachedir)
+        print(f"libyaml available: {renderer.HAS_LIBYAML}")
+        print(
+            f"{'chart':<55} {'size':>9} {'objects':>8} "
+            f"{'python':>8} {'render':>8} {'cached':>8} {'speedup':>8}"
+        )
+
+        for path in charts:
+            source = chart_source(path)
+            name = os.path.relpath(path, os.path.join(SALT_ROOT, "metalk8s"))
+
+            def render(source=source, path=path):
+                return renderer.render(io.StringIO(source), sls=path)
+
+            expected = [
+                manifest
+                for manifest in yaml.load_all(source, Loader=PySafeLoader)
+                if manifest
+            ]
+            python_time = bench(
+                lambda source=source: list(yaml.load_all(source, Loader=PySafeLoader)),
+                args.repeat,
+            )
+
+            # Render once without cache, then measure cache hits
+            renderer.__opts__["cachedir"] = None
+            render_time = bench(render, args.repeat)
+            renderer.__opts__["cachedir"] = cachedir
+            rendered = render()
+            cached_time = bench(render, args.repeat)
+
+            manifests = [
+                state["metalk8s_kubernetes.object_present"][3]["manifest"]
+                for state in rendered.values()
+            ]
+            assert manifests == expected, f"Unexpected output for {name}"
+
+            print(
+                f"{name:<55} {len(source) // 1024:>7}KB {len(manifests):>8} "
+                f"{python_time:>7.3f}s {render_time:>7.3f}s {cached_time:>7.3f}s "
+                f"{python_time / render_time:>7.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -9,6 +9,7 @@ import string
 from typing import Any, Callable, Dict, List, Optional, Type
 from unittest.mock import MagicMock
 
+from _modules import metalk8s  # type: ignore
 from _modules import metalk8s_service_configuration  # type: ignore
 
 import jinja2
@@ -284,6 +285,18 @@ def metalk8s_minions_by_role(salt_mock: SaltMock, role: str) -> List[str]:
     ]
 
 
+@register("metalk8s.upgrade_waves")
+def metalk8s_upgrade_waves(
+    salt_mock: SaltMock, node_list: Optional[List[str]] = None, batch_size: int = 1
+) -> List[List[str]]:
+    """Use pillar.metalk8s.nodes to derive this."""
+    return metalk8s.upgrade_waves(
+        node_list,
+        batch_size=batch_size,
+        nodes=copy.deepcopy(salt_mock._pillar["metalk8s"]["nodes"]),
+    )
+
+
 @register("metalk8s_kubernetes.get_object")
 def metalk8s_kubernetes_get_object(
     salt_mock: SaltMock,
@@ -0,0 +1,108 @@
+"""Fake CRI gRPC server for use in unit tests.
+
+Serves the subset of the CRI API described in the `cri` utils module, over
+a UNIX socket, from an in-memory list of pods, containers and images (in the
+same format as `crictl -o json` outputs).
+"""
+from concurrent.futures import ThreadPoolExecutor
+import os.path
+import tempfile
+
+import grpc
+from google.protobuf import json_format
+
+from _utils import cri_client
+
+
+class CriServerMock:
+    """Fake CRI runtime and image services, recording the calls received."""
+
+    def __init__(self, pods=None, containers=None, images=None, failing=None):
+        self.pods = pods or []
+        self.containers = containers or []
+        self.images = images or []
+        self.failing = set(failing or [])
+        self.calls = []
+
+        self._tmpdir = tempfile.TemporaryDirectory()
+        self.endpoint = f"unix://{os.path.join(self._tmpdir.name, 'cri.sock')}"
+        self._messages = cri_client.get_message_classes()
+        self._server = grpc.server(ThreadPoolExecutor(max_workers=2))
+
+        handlers = {}
+        for method, (service, request, response) in cri_client.CRI_METHODS.items():
+            handler = grpc.unary_unary_rpc_method_handler(
+                self._handler(method, response),
+                request_deserializer=self._messages[request].FromString,
+                response_serializer=self._messages[response].SerializeToString,
+            )
+            handlers.setdefault(service, {})[method] = handler
+        self._server.add_generic_rpc_handlers(
+            [
+                grpc.method_handlers_generic_handler(
+                    f"{cri_client.CRI_PACKAGE}.{service}", service_handlers
+                )
+                for service, service_handlers in handlers.items()
+            ]
+        )
+        self._server.add_insecure_port(self.endpoint)
+
+    def __enter__(self):
+        self._server.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._server.stop(None)
+        self._tmpdir.cleanup()
+
+    def _handler(self, method, response):
+        def handle(request, context):
+            request = cri_client.message_to_dict(request)
+            self.calls.append((method, request))
+            if method in self.failing:
+                context.abort(grpc.StatusCode.UNAVAILABLE, f"{method} failed")
+            return json_format.ParseDict(
+                getattr(self, method)(request), self._messages[response]()
+            )
+
+        return handle
+
+    @staticmethod
+    def _match(obj, obj_filter):
+        if obj_filter.get("id") and obj["id"] != obj_filter["id"]:
+            return False
+        if "state" in obj_filter and obj["state"] != obj_filter["state"]["state"]:
+            return False
+        labels = obj_filter.get("labelSelector", {})
+        return all(obj["labels"].get(key) == value for key, value in labels.items())
+
+    def Version(self, _request):
+        return {
+            "version": "0.1.0",
+            "runtimeName": "containerd",
+            "runtimeVersion": "1.6.8",
+            "runtimeApiVersion": "v1",
+        }
+
+    def ListPodSandbox(self, request):
+        pod_filter = request.get("filter", {})
+        return {"items": [pod for pod in self.pods if self._match(pod, pod_filter)]}
+
+    def StopPodSandbox(self, request):
+        for pod in self.pods:
+            if pod["id"] == request["podSandboxId"]:
+                pod["state"] = "SANDBOX_NOTREADY"
+        return {}
+
+    def ListContainers(self, request):
+        container_filter = request.get("filter", {})
+        return {
+            "containers": [
+                container
+                for container in self.containers
+                if self._match(container, container_filter)
+            ]
+        }
+
+    def ListImages(self, _request):
+        return {"images": self.images}
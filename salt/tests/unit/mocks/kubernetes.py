@@ -167,7 +167,10 @@ class KubernetesAPIMock:
     def list_objects(
         self, kind, apiVersion, all_namespaces=False, field_selector=None, **kwargs
     ):
-        resource = self.get_resource(kind, apiVersion)
+        try:
+            resource = self.get_resource(kind, apiVersion)
+        except ValueError as exc:
+            raise CommandExecutionError("Invalid manifest") from exc
 
         # If namespace isn't in kwargs, then all members of the matching
         # resource (after other filters were applied) will get returned
@@ -186,6 +189,9 @@ class KubernetesAPIMock:
         print(
             "Called get_object %s/%s kwargs=%r - %r" % (apiVersion, kind, kwargs, res)
         )
+        for obj in res:
+            if "raiseError" in obj:
+                raise CommandExecutionError(obj["raiseError"])
         return res
 
 
@@ -5,14 +5,16 @@ from unittest import TestCase
 from unittest.mock import MagicMock, patch
 import yaml
 
-from parameterized import parameterized
+from parameterized import param, parameterized
 from salt.exceptions import CommandExecutionError
 
 from _modules import cri
+from _utils import cri_client
 
 from tests.unit.log_utils import capture_logs, check_captured_logs
 from tests.unit import mixins
 from tests.unit import utils
+from tests.unit.mocks import cri as mock_cri
 
 
 YAML_TESTS_FILE = os.path.join(
@@ -74,6 +76,24 @@ COMPONENT_LIST = [
     }
 ]
 
+CONTAINER_LIST = [
+    {
+        "id": "292c3b07b8b6de7a8d4bcd4f0dfb0b35f9e5e2f1c2c9d2f6a53ee8a7f0a8b1c2",
+        "podSandboxId": COMPONENT_LIST[0]["id"],
+        "metadata": {"name": "etcd", "attempt": 0},
+        "image": {"image": "sha256:2c4adeb21b4f", "annotations": {}},
+        "imageRef": "sha256:2c4adeb21b4f",
+        "state": "CONTAINER_RUNNING",
+        "createdAt": "1593676786281403260",
+        "labels": {
+            "io.kubernetes.container.name": "etcd",
+            "io.kubernetes.pod.name": "etcd-bootstrap",
+            "io.kubernetes.pod.namespace": "kube-system",
+        },
+        "annotations": {},
+    }
+]
+
 
 class CriTestCase(TestCase, mixins.LoaderModuleMockMixin):
     """
@@ -132,6 +152,26 @@ class CriTestCase(TestCase, mixins.LoaderModuleMockMixin):
         with patch.object(cri, "list_images", MagicMock(return_value=images_list)):
             self.assertEqual(cri.available(name), result)
 
+    @parameterized.expand(
+        [
+            (
+                IMAGES_LIST,
+                ["k8s.gcr.io/pause:3.1", "myEtcdTag", "Abc"],
+                {"k8s.gcr.io/pause:3.1": True, "myEtcdTag": True, "Abc": False},
+            ),
+            (None, ["k8s.gcr.io/pause:3.1"], {"k8s.gcr.io/pause:3.1": False}),
+            (IMAGES_LIST, [], {}),
+        ]
+    )
+    def test_available_many(self, images_list, names, result):
+        """
+        Tests the return of `available_many` function
+        """
+        list_images_mock = MagicMock(return_value=images_list)
+        with patch.object(cri, "list_images", list_images_mock):
+            self.assertEqual(cri.available_many(names), result)
+            list_images_mock.assert_called_once_with()
+
     @parameterized.expand(
         [
             (
@@ -157,6 +197,58 @@ class CriTestCase(TestCase, mixins.LoaderModuleMockMixin):
             self.assertEqual(cri.pull_image("my-images"), result)
             mock_cmd.assert_called_once_with('crictl pull "my-images"')
 
+    @parameterized.expand(
+        [
+            (
+                ["k8s.gcr.io/pause:3.1", "myEtcdTag"],
+                [],
+                {
+                    "k8s.gcr.io/pause:3.1": {
+                        "digests": {},
+                        "duration": 1.0,
+                        "size": 746400,
+                    },
+                    "myEtcdTag": {"digests": {}, "duration": 1.0, "size": 76160693},
+                },
+            ),
+            (
+                ["k8s.gcr.io/pause:3.1", "unknown"],
+                ["unknown"],
+                {
+                    "k8s.gcr.io/pause:3.1": {
+                        "digests": {},
+                        "duration": 1.0,
+                        "size": 746400,
+                    },
+                    "unknown": None,
+                },
+            ),
+            (["unknown"], ["unknown"], {"unknown": None}),
+            ([], [], {}),
+        ]
+    )
+    def test_pull_images(self, images, failing, result):
+        """
+        Tests the return of `pull_images` function
+        """
+        pull_image_mock = MagicMock(
+            side_effect=lambda image: None if image in failing else {"digests": {}}
+        )
+        list_images_mock = MagicMock(return_value=IMAGES_LIST)
+        # Each pull takes 1 second
+        monotonic_mock = MagicMock(side_effect=[0, 1] * len(images))
+
+        with patch.object(cri, "pull_image", pull_image_mock), patch.object(
+            cri, "list_images", list_images_mock
+        ), patch("time.monotonic", monotonic_mock):
+            self.assertEqual(cri.pull_images(images, concurrency=1), result)
+
+        self.assertEqual(pull_image_mock.call_count, len(images))
+        # Images are listed at most once, to retrieve their size
+        self.assertEqual(
+            list_images_mock.call_count, 1 if set(images) - set(failing) else 0
+        )
+
     @parameterized.expand(
         [
             (0, "292c3b07b", 0, "All ok", "All ok"),
@@ -265,6 +357,43 @@ class CriTestCase(TestCase, mixins.LoaderModuleMockMixin):
                 cmd_call += " --state {}".format(state)
             mock_cmd.assert_called_with(cmd_call)
 
+    @parameterized.expand(
+        [
+            # Found at the 4th check
+            (["", "", "", "292c3b07b"], 60, 5, [0.2, 0.4, 0.8]),
+            # Intervals are capped by the delay
+            (["", "", "", "", "292c3b07b"], 60, 0.5, [0.2, 0.4, 0.5, 0.5]),
+            # Last check when reaching the timeout
+            (["", "", "", "", ""], 2, 5, [0.2, 0.4, 0.8, 0.6]),
+        ]
+    )
+    def test_wait_container_backoff(self, stdouts, timeout, delay, sleeps):
+        """
+        Tests the intervals between checks of `wait_container` function
+        """
+        mock_cmd = MagicMock(
+            side_effect=[utils.cmd_output(retcode=0, stdout=out) for out in stdouts]
+        )
+        mock_sleep = MagicMock()
+
+        with patch.dict(cri.__salt__, {"cmd.run_all": mock_cmd}), patch(
+            "time.sleep", mock_sleep
+        ):
+            if stdouts[-1]:
+                self.assertTrue(
+                    cri.wait_container("my_cont", "running", timeout, delay)
+                )
+            else:
+                with self.assertRaisesRegex(
+                    CommandExecutionError, "No container found"
+                ):
+                    cri.wait_container("my_cont", "running", timeout, delay)
+
+        self.assertEqual(mock_cmd.call_count, len(stdouts))
+        self.assertEqual(
+            [round(call.args[0], 3) for call in mock_sleep.call_args_list], sleeps
+        )
+
     @parameterized.expand(
         [
             (0, json.dumps({"items": COMPONENT_LIST}, indent=4), True),
@@ -378,6 +507,7 @@ class CriTestCase(TestCase, mixins.LoaderModuleMockMixin):
         pod_ids=None,
         pod_ids_raise=None,
         raises=False,
+        sleeps=None,
         **kwargs,
     ):
         """Test the return value of `wait_pod`."""
@@ -414,3 +544,175 @@ class CriTestCase(TestCase, mixins.LoaderModuleMockMixin):
                     cri.wait_pod(**kwargs)
             else:
                 self.assertEqual(cri.wait_pod(**kwargs), result)
+
+        if sleeps is not None:
+            self.assertEqual(
+                [round(end - start, 3) for start, end in zip(timer, timer[1:])],
+                sleeps,
+            )
+
+
+class CriClientTestCase(TestCase, mixins.LoaderModuleMockMixin):
+    """
+    TestCase for `cri` module, using the CRI API client
+    """
+
+    loader_module = cri
+
+    def setUp(self):
+        pods = [
+            COMPONENT_LIST[0],
+            dict(
+                COMPONENT_LIST[0],
+                id="1b2c3d4e",
+                metadata=dict(COMPONENT_LIST[0]["metadata"], name="etcd-node-1"),
+                state="SANDBOX_NOTREADY",
+                createdAt="1593676785281403000",
+            ),
+        ]
+        self.server = mock_cri.CriServerMock(
+            pods=pods, containers=CONTAINER_LIST, images=IMAGES_LIST
+        )
+        self.server.__enter__()
+        self.addCleanup(self.server.__exit__)
+
+        self.client = cri_client.CriClient(self.server.endpoint, timeout=5)
+        self.addCleanup(self.client.close)
+
+        self.cmd_mock = MagicMock(return_value=utils.cmd_output(retcode=1))
+        super().setUp()
+
+    def loader_module_globals(self):
+        return {
+            "__salt__": {"cmd.run_all": self.cmd_mock},
+            "__utils__": {"cri.get_client": MagicMock(return_value=self.client)},
+        }
+
+    def test_list_images(self):
+        """
+        Tests the return of `list_images` function, using the CRI API
+        """
+        self.assertEqual(
+            cri.list_images(),
+            [
+                {key: value for key, value in image.items() if key != "uid"}
+                for image in IMAGES_LIST
+            ],
+        )
+        self.assertEqual(self.server.calls, [("ListImages", {})])
+        self.cmd_mock.assert_not_called()
+
+    def test_list_images_fallback(self):
+        """
+        Tests the return of `list_images` function, falling back to `crictl`
+        if the CRI API call fails
+        """
+        self.server.failing.add("ListImages")
+        self.assertIsNone(cri.list_images())
+        self.cmd_mock.assert_called_once_with("crictl images -o json")
+
+    def test_list_images_no_client(self):
+        """
+        Tests the return of `list_images` function, falling back to `crictl`
+        if the CRI API client is not available
+        """
+        with patch.dict(
+            cri.__utils__, {"cri.get_client": MagicMock(return_value=None)}
+        ):
+            self.assertIsNone(cri.list_images())
+        self.assertEqual(self.server.calls, [])
+        self.cmd_mock.assert_called_once_with("crictl images -o json")
+
+    @parameterized.expand(
+        [
+            param(result=[COMPONENT_LIST[0]["id"], "1b2c3d4e"], multiple=True),
+            param(result=COMPONENT_LIST[0]["id"], state="ready"),
+            param(result="1b2c3d4e", name="node-1$"),
+            param(
+                result=COMPONENT_LIST[0]["id"],
+                name="etcd",
+                labels={"tier": "control-plane"},
+                state="ready",
+            ),
+            param(
+                result=None, labels={"component": "apiserver"}, ignore_not_found=True
+            ),
+            param(
+                result="More than one pod found with name 'etcd'",
+                name="etcd",
+                raises=True,
+            ),
+        ]
+    )
+    def test_get_pod_id(self, result, raises=False, **kwargs):
+        """
+        Tests the return of `get_pod_id` function, using the CRI API
+        """
+        if raises:
+            with self.assertRaisesRegex(CommandExecutionError, result):
+                cri.get_pod_id(**kwargs)
+        else:
+            self.assertEqual(cri.get_pod_id(**kwargs), result)
+        self.cmd_mock.assert_not_called()
+
+    @parameterized.expand([("etcd", True), ("kube-apiserver", False)])
+    def test_component_is_running(self, name, result):
+        """
+        Tests the return of `component_is_running` function, using the CRI API
+        """
+        self.assertEqual(cri.component_is_running(name), result)
+        self.cmd_mock.assert_not_called()
+
+    def test_stop_pod(self):
+        """
+        Tests the return of `stop_pod` function, using the CRI API
+        """
+        self.assertEqual(
+            cri.stop_pod({"component": "etcd"}),
+            f"Stopped sandbox {COMPONENT_LIST[0]['id']}\nStopped sandbox 1b2c3d4e",
+        )
+        self.assertEqual(
+            [pod["state"] for pod in self.server.pods], ["SANDBOX_NOTREADY"] * 2
+        )
+        self.cmd_mock.assert_not_called()
+
+    @parameterized.expand(
+        [
+            ("etcd", None, True),
+            ("etcd", "running", True),
+            ("etcd", "exited", False),
+            ("kube-apiserver", None, False),
+        ]
+    )
+    def test_wait_container(self, name, state, found):
+        """
+        Tests the return of `wait_container` function, using the CRI API
+        """
+        with patch("time.sleep", MagicMock()):
+            if found:
+                self.assertTrue(cri.wait_container(name, state, timeout=10, delay=5))
+            else:
+                with self.assertRaisesRegex(
+                    CommandExecutionError, "No container found"
+                ):
+                    cri.wait_container(name, state, timeout=10, delay=5)
+        self.cmd_mock.assert_not_called()
+
+    def test_execute(self):
+        """
+        Tests the return of `execute` function, using the CRI API to find the
+        container
+        """
+        self.cmd_mock.return_value = utils.cmd_output(retcode=0, stdout="All ok")
+        self.assertEqual(cri.execute("etcd", "my", "command"), "All ok")
+        self.cmd_mock.assert_called_once_with(
+            f"crictl exec {CONTAINER_LIST[0]['id']} my command"
+        )
+
+    def test_ready(self):
+        """
+        Tests the return of `ready` function, using the CRI API
+        """
+        self.assertTrue(cri.ready())
+        self.assertEqual(self.server.calls, [("Version", {"version": ""})])
+        self.cmd_mock.assert_not_called()
@@ -1,5 +1,6 @@
 import logging
 import os.path
+import stat
 import tempfile
 from unittest import TestCase
 from unittest.mock import MagicMock, mock_open, patch
@@ -12,6 +13,7 @@ import salt.utils.files
 import yaml
 
 from _modules import metalk8s
+from _utils import pillar_utils
 
 from tests.unit.log_utils import capture_logs, check_captured_logs
 from tests.unit import mixins
@@ -152,6 +154,87 @@ class Metalk8sTestCase(TestCase, mixins.LoaderModuleMockMixin):
                     set(metalk8s.minions_by_role(role, nodes)), set(result)
                 )
 
+    @parameterized.expand(
+        [
+            param(
+                "control-plane and etcd nodes first",
+                node_list=None,
+                result=[["master-1"], ["master-2"], ["etcd-1"], ["worker-1"]],
+            ),
+            param(
+                "batches of workers",
+                node_list=None,
+                batch_size=2,
+                extra_nodes=["worker-2", "worker-3"],
+                result=[
+                    ["master-1"],
+                    ["master-2"],
+                    ["etcd-1"],
+                    ["worker-1", "worker-2"],
+                    ["worker-3"],
+                ],
+            ),
+            param(
+                "subset of nodes",
+                node_list=["worker-1", "master-2"],
+                batch_size=5,
+                result=[["master-2"], ["worker-1"]],
+            ),
+            param(
+                "nodes from pillar",
+                node_list=None,
+                batch_size="2",
+                from_pillar=True,
+                result=[["master-1"], ["master-2"], ["etcd-1"], ["worker-1"]],
+            ),
+            param(
+                "invalid batch size",
+                node_list=None,
+                batch_size="abc",
+                raises=True,
+                result="Invalid batch size 'abc'",
+            ),
+        ]
+    )
+    def test_upgrade_waves(
+        self,
+        _,
+        node_list,
+        result,
+        batch_size=1,
+        extra_nodes=None,
+        from_pillar=False,
+        raises=False,
+    ):
+        """
+        Tests the return of `upgrade_waves` function
+        """
+        nodes = {
+            "worker-1": {"roles": ["node"]},
+            "master-2": {"roles": ["master", "etcd"]},
+            "etcd-1": {"roles": ["etcd"]},
+            "master-1": {"roles": ["master", "etcd", "infra"]},
+        }
+        for node in extra_nodes or []:
+            nodes[node] = {"roles": ["node", "infra"]}
+
+        pillar_dict = {"metalk8s": {"nodes": nodes if from_pillar else {}}}
+        kwargs = {"batch_size": batch_size}
+        if not from_pillar:
+            kwargs["nodes"] = nodes
+
+        with patch.dict(metalk8s.__pillar__, pillar_dict):
+            if raises:
+                self.assertRaisesRegex(
+                    CommandExecutionError,
+                    result,
+                    metalk8s.upgrade_waves,
+                    node_list,
+                    **kwargs,
+                )
+            else:
+                self.assertEqual(metalk8s.upgrade_waves(node_list, **kwargs), result)
+
     @parameterized.expand(
         [
             (PRODUCT_TXT, {"version": "2.5.0", "name": "MetalK8s"}),
@@ -284,6 +367,7 @@ class Metalk8sTestCase(TestCase, mixins.LoaderModuleMockMixin):
         raises=False,
         pillar_content=None,
         refresh_called=False,
+        extra_minion_data=None,
         **kwargs,
     ):
         """
@@ -291,10 +375,13 @@ class Metalk8sTestCase(TestCase, mixins.LoaderModuleMockMixin):
         """
         pillar_get_mock = MagicMock()
         pillar_get_mock.return_value.compile_pillar.return_value = pillar_content
+        utils_dict = {
+            "pillar_utils.sources_minion_data": pillar_utils.sources_minion_data,
+        }
 
         with patch.object(metalk8s, "get_pillar", pillar_get_mock), patch.dict(
             metalk8s.__pillar__, pillar_content or {}
-        ):
+        ), patch.dict(metalk8s.__utils__, utils_dict):
             if raises:
                 self.assertRaisesRegex(
                     CommandExecutionError,
@@ -308,9 +395,87 @@ class Metalk8sTestCase(TestCase, mixins.LoaderModuleMockMixin):
 
             if refresh_called:
                 pillar_get_mock.assert_called_once()
+                self.assertEqual(
+                    pillar_get_mock.call_args.kwargs["extra_minion_data"],
+                    extra_minion_data,
+                )
             else:
                 pillar_get_mock.assert_not_called()
 
+    def test_check_pillar_keys_ttl(self):
+        """
+        Tests that keys found by `check_pillar_keys` are not checked again
+        for a few seconds
+        """
+        cachedir = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.addCleanup(cachedir.cleanup)
+
+        pillar_get_mock = MagicMock()
+        pillar_get_mock.return_value.compile_pillar.return_value = {
+            "metalk8s": {"endpoints": {"repositories": "my-endpoints"}}
+        }
+        utils_dict = {
+            "pillar_utils.sources_minion_data": pillar_utils.sources_minion_data,
+        }
+        time_mock = MagicMock(return_value=100.0)
+        key = "metalk8s.endpoints.repositories"
+
+        with patch.object(metalk8s, "get_pillar", pillar_get_mock), patch.dict(
+            metalk8s.__utils__, utils_dict
+        ), patch.dict(metalk8s.__opts__, {"cachedir": cachedir.name}), patch(
+            "time.time", time_mock
+        ):
+            self.assertTrue(metalk8s.check_pillar_keys(key))
+            self.assertEqual(pillar_get_mock.call_count, 1)
+
+            # Reused within the TTL, unless disabled
+            time_mock.return_value = 105.0
+            self.assertTrue(metalk8s.check_pillar_keys([key]))
+            self.assertEqual(pillar_get_mock.call_count, 1)
+            self.assertTrue(metalk8s.check_pillar_keys(key, ttl=0))
+            self.assertEqual(pillar_get_mock.call_count, 2)
+
+            # Keys not checked yet
+            self.assertFalse(
+                metalk8s.check_pillar_keys(
+                    [key, "metalk8s.endpoints.salt-master"], raise_error=False
+                )
+            )
+            self.assertEqual(pillar_get_mock.call_count, 3)
+
+            # TTL expired
+            time_mock.return_value = 120.0
+            self.assertTrue(metalk8s.check_pillar_keys(key))
+            self.assertEqual(pillar_get_mock.call_count, 4)
+
+    def test_check_pillar_keys_ttl_write_error(self):
+        """
+        Tests that `check_pillar_keys` still works if the keys found cannot
+        be stored in cache
+        """
+        cachedir = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.addCleanup(cachedir.cleanup)
+        # The cache directory cannot be created
+        with open(os.path.join(cachedir.name, "metalk8s"), "w") as fd:
+            fd.write("not a directory")
+
+        pillar_get_mock = MagicMock()
+        pillar_get_mock.return_value.compile_pillar.return_value = {
+            "metalk8s": {"endpoints": {"repositories": "my-endpoints"}}
+        }
+        utils_dict = {
+            "pillar_utils.sources_minion_data": pillar_utils.sources_minion_data,
+        }
+        key = "metalk8s.endpoints.repositories"
+
+        with patch.object(metalk8s, "get_pillar", pillar_get_mock), patch.dict(
+            metalk8s.__utils__, utils_dict
+        ), patch.dict(metalk8s.__opts__, {"cachedir": cachedir.name}):
+            self.assertTrue(metalk8s.check_pillar_keys(key))
+            self.assertTrue(metalk8s.check_pillar_keys(key))
+
+        self.assertEqual(pillar_get_mock.call_count, 2)
+
     @utils.parameterized_from_cases(YAML_TESTS_CASES["format_slots"])
     def test_format_slots(self, data, result, slots_returns=None, raises=False):
         """
@@ -337,6 +502,42 @@ class Metalk8sTestCase(TestCase, mixins.LoaderModuleMockMixin):
             else:
                 self.assertEqual(metalk8s.format_slots(data), result)
 
+    def test_format_slots_copy_free(self):
+        """
+        Tests that `format_slots` only rebuilds the parts of the data holding
+        slots, and computes each slot once
+        """
+        slot_mock = MagicMock(return_value="ABC123")
+        data = {
+            "metadata": {"name": "my-object", "labels": {"app": "my-app"}},
+            "data": {"first": "__slot__:salt:my_mod.my_fun()", "other": "value"},
+            "items": [{"key": "value"}, "__slot__:salt:my_mod.my_fun()"],
+        }
+
+        with patch.dict(metalk8s.__salt__, {"my_mod.my_fun": slot_mock}):
+            result = metalk8s.format_slots(data)
+
+        self.assertEqual(
+            result,
+            {
+                "metadata": {"name": "my-object", "labels": {"app": "my-app"}},
+                "data": {"first": "ABC123", "other": "value"},
+                "items": [{"key": "value"}, "ABC123"],
+            },
+        )
+        slot_mock.assert_called_once_with()
+        # Input data is left untouched
+        self.assertEqual(data["data"]["first"], "__slot__:salt:my_mod.my_fun()")
+        self.assertIsNot(result, data)
+        self.assertIsNot(result["data"], data["data"])
+        self.assertIsNot(result["items"], data["items"])
+        # Branches without slots are not copied
+        self.assertIs(result["metadata"], data["metadata"])
+        self.assertIs(result["items"][0], data["items"][0])
+
+        # Nothing is copied if there are no slots
+        self.assertIs(metalk8s.format_slots(data["metadata"]), data["metadata"])
+
     @parameterized.expand(
         [
             param([3, 5, 2, -4], [-4, 2, 3, 5]),
@@ -534,9 +735,12 @@ class Metalk8sTestCase(TestCase, mixins.LoaderModuleMockMixin):
             }
 
         compile_template_mock = MagicMock()
-        with patch.dict(metalk8s.__pillar__, pillar_content), patch(
-            "salt.loader.render", MagicMock()
-        ), patch("salt.template.compile_template", compile_template_mock):
+        salt_dict = {"cp.hash_file": MagicMock(return_value={})}
+        with patch.dict(metalk8s.__pillar__, pillar_content), patch.dict(
+            metalk8s.__salt__, salt_dict
+        ), patch("salt.loader.render", MagicMock()), patch(
+            "salt.template.compile_template", compile_template_mock
+        ):
             metalk8s.get_from_map("my-key", saltenv=saltenv)
             compile_template_mock.assert_called_once()
             self.assertEqual(
@@ -547,6 +751,176 @@ class Metalk8sTestCase(TestCase, mixins.LoaderModuleMockMixin):
                 compile_template_mock.call_args[1],
             )
 
+    def test_get_from_map_cache(self):
+        """
+        Tests that values computed by `get_from_map` are cached until an input
+        of `map.jinja` changes
+        """
+        cachedir = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.addCleanup(cachedir.cleanup)
+
+        hashes = {"salt://metalk8s/map.jinja": "abc"}
+        compile_template_mock = MagicMock(
+            side_effect=lambda *_, **__: {"value": compile_template_mock.call_count}
+        )
+        salt_dict = {
+            "cp.hash_file": MagicMock(
+                side_effect=lambda path, _saltenv: {
+                    "hash_type": "sha256",
+                    "hsum": hashes.get(path, "def"),
+                }
+            )
+        }
+
+        def _get_from_map(**kwargs):
+            return metalk8s.get_from_map("my-key", saltenv="metalk8s-1.2.3", **kwargs)
+
+        with patch.dict(metalk8s.__salt__, salt_dict), patch.dict(
+            metalk8s.__opts__,
+            {"cachedir": cachedir.name, metalk8s.MAP_CACHE_OPTION: True},
+        ), patch("salt.loader.render", MagicMock()), patch(
+            "salt.template.compile_template", compile_template_mock
+        ):
+            self.assertEqual(_get_from_map(), {"value": 1})
+            # Cached in memory, returned values can be modified
+            _get_from_map()["value"] = "modified"
+            self.assertEqual(_get_from_map(), {"value": 1})
+            self.assertEqual(compile_template_mock.call_count, 1)
+
+            # Cached on disk for the next runs
+            metalk8s.__context__.clear()
+            self.assertEqual(_get_from_map(), {"value": 1})
+            self.assertEqual(compile_template_mock.call_count, 1)
+
+            # Cache not used
+            self.assertEqual(_get_from_map(use_cache=False), {"value": 2})
+
+            # Pillar changed
+            with patch.dict(metalk8s.__pillar__, {"some": "pillar"}):
+                self.assertEqual(_get_from_map(), {"value": 3})
+
+            # `map.jinja` changed
+            hashes["salt://metalk8s/map.jinja"] = "other"
+            self.assertEqual(_get_from_map(), {"value": 4})
+            self.assertEqual(_get_from_map(), {"value": 4})
+
+        cache_dir = os.path.join(cachedir.name, metalk8s.MAP_CACHE_DIR)
+        self.assertEqual(len(os.listdir(cache_dir)), 3)
+        # Only readable by the owner
+        self.assertEqual(stat.S_IMODE(os.stat(cache_dir).st_mode), 0o700)
+        for entry in os.listdir(cache_dir):
+            self.assertEqual(
+                stat.S_IMODE(os.stat(os.path.join(cache_dir, entry)).st_mode), 0o600
+            )
+
+    @parameterized.expand(
+        [
+            param("disabled", value="my-key", enabled=False),
+            param("whole pillar", value="defaults"),
+            param("pillar", value="my-key", pillar={"my-key": {"secret": "abc"}}),
+            param(
+                "renamed pillar",
+                value="nginx_ingress",
+                pillar={"nginx-ingress": {"secret": "abc"}},
+            ),
+        ]
+    )
+    def test_get_from_map_cache_not_stored(self, _, value, enabled=True, pillar=None):
+        """
+        Tests that values computed by `get_from_map` are only cached in memory
+        if the disk cache is disabled or if they are merged with the pillar
+        """
+        cachedir = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.addCleanup(cachedir.cleanup)
+
+        compile_template_mock = MagicMock(
+            side_effect=lambda *_, **__: {"value": compile_template_mock.call_count}
+        )
+        salt_dict = {
+            "cp.hash_file": MagicMock(return_value={"hash_type": "sha256", "hsum": "a"})
+        }
+
+        with patch.dict(metalk8s.__salt__, salt_dict), patch.dict(
+            metalk8s.__opts__,
+            {"cachedir": cachedir.name, metalk8s.MAP_CACHE_OPTION: enabled},
+        ), patch.dict(metalk8s.__pillar__, pillar or {}), patch(
+            "salt.loader.render", MagicMock()
+        ), patch(
+            "salt.template.compile_template", compile_template_mock
+        ):
+            for _ in range(2):
+                self.assertEqual(
+                    metalk8s.get_from_map(value, saltenv="metalk8s-1.2.3"),
+                    {"value": 1},
+                )
+
+            metalk8s.__context__.clear()
+            self.assertEqual(
+                metalk8s.get_from_map(value, saltenv="metalk8s-1.2.3"), {"value": 2}
+            )
+
+        self.assertEqual(os.listdir(cachedir.name), [])
+
+    def test_get_from_map_cache_errors(self):
+        """
+        Tests that `get_from_map` computes values again when its disk cache
+        cannot be used, and that only the most recent entries are kept
+        """
+        cachedir = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.addCleanup(cachedir.cleanup)
+        cache_dir = os.path.join(cachedir.name, metalk8s.MAP_CACHE_DIR)
+
+        compile_template_mock = MagicMock(
+            side_effect=lambda *_, **__: {"value": compile_template_mock.call_count}
+        )
+        salt_dict = {
+            "cp.hash_file": MagicMock(return_value={"hash_type": "sha256", "hsum": "a"})
+        }
+
+        def _get_from_map(value="my-key"):
+            metalk8s.__context__.clear()
+            return metalk8s.get_from_map(value, saltenv="metalk8s-1.2.3")
+
+        with patch.dict(metalk8s.__salt__, salt_dict), patch(
+            "salt.loader.render", MagicMock()
+        ), patch("salt.template.compile_template", compile_template_mock):
+            # No cachedir
+            with patch.dict(metalk8s.__opts__, {"cachedir": None}):
+                self.assertEqual(_get_from_map(), {"value": 1})
+                self.assertEqual(_get_from_map(), {"value": 2})
+
+            # Cache directory cannot be created
+            with open(os.path.join(cachedir.name, "metalk8s"), "w") as fd:
+                fd.write("not a directory")
+            with patch.dict(
+                metalk8s.__opts__,
+                {"cachedir": cachedir.name, metalk8s.MAP_CACHE_OPTION: True},
+            ):
+                self.assertEqual(_get_from_map(), {"value": 3})
+                self.assertEqual(_get_from_map(), {"value": 4})
+            os.remove(os.path.join(cachedir.name, "metalk8s"))
+
+            with patch.dict(
+                metalk8s.__opts__,
+                {"cachedir": cachedir.name, metalk8s.MAP_CACHE_OPTION: True},
+            ), patch.object(metalk8s, "MAP_CACHE_SIZE", 1):
+                self.assertEqual(_get_from_map(), {"value": 5})
+                self.assertEqual(_get_from_map(), {"value": 5})
+
+                # Corrupted cache entry
+                (entry,) = os.listdir(cache_dir)
+                with open(os.path.join(cache_dir, entry), "w") as fd:
+                    fd.write("{not json")
+                self.assertEqual(_get_from_map(), {"value": 6})
+                self.assertEqual(_get_from_map(), {"value": 6})
+
+                # Older entries are pruned
+                os.utime(os.path.join(cache_dir, entry), (0, 0))
+                self.assertEqual(_get_from_map("other-key"), {"value": 7})
+                self.assertNotIn(entry, os.listdir(cache_dir))
+                self.assertEqual(len(os.listdir(cache_dir)), 1)
+                self.assertEqual(_get_from_map(), {"value": 8})
+
     @utils.parameterized_from_cases(YAML_TESTS_CASES["archive_info_from_product_txt"])
     def test_archive_info_from_product_txt(
         self, archive, info, result, is_file=False, is_dir=False, raises=False
@@ -3,6 +3,7 @@ from importlib import reload
 import json
 import logging
 import os.path
+import time
 from unittest import TestCase
 from unittest.mock import MagicMock, patch
 
@@ -92,8 +93,10 @@ class Metalk8sDrainTestCase(TestCase, mixins.LoaderModuleMockMixin):
         create_raises=False,
         create_error_status=None,
         create_error_body=None,
+        create_error_headers=None,
         log_lines=None,
-        **kwargs
+        details=False,
+        **kwargs,
     ):
         """Tests for `metalk8s_drain.evict_pod`."""
 
@@ -106,6 +109,7 @@ class Metalk8sDrainTestCase(TestCase, mixins.LoaderModuleMockMixin):
                         status=create_error_status,
                         data=json.dumps(create_error_body).encode("utf-8"),
                     )
+                    http_resp.getheaders.return_value = create_error_headers or {}
                     raise ApiException(http_resp=http_resp)
 
             elif create_raises == "HTTPError":
@@ -129,6 +133,9 @@ class Metalk8sDrainTestCase(TestCase, mixins.LoaderModuleMockMixin):
                 self.assertRaisesRegex(
                     CommandExecutionError, result, metalk8s_drain.evict_pod, **kwargs
                 )
+            elif details:
+                self.assertEqual(metalk8s_drain._create_eviction(**kwargs), result)
+                create_mock.assert_called_once()
             else:
                 self.assertEqual(metalk8s_drain.evict_pod(**kwargs), result)
                 # TODO(gd): check that parameters match expected API call
@@ -171,13 +178,172 @@ class Metalk8sDrainTestCase(TestCase, mixins.LoaderModuleMockMixin):
                     CommandExecutionError,
                     result,
                     metalk8s_drain.node_drain,
-                    **call_kwargs
+                    **call_kwargs,
                 )
                 run_drain_mock.assert_not_called()
             else:
                 self.assertEqual(metalk8s_drain.node_drain(**call_kwargs), result)
                 run_drain_mock.assert_called_once()
 
+    @parameterized.expand(
+        [
+            ("null selector", None, {"app": "my-app"}, False),
+            ("empty selector", {}, {"app": "my-app"}, True),
+            (
+                "match labels",
+                {"matchLabels": {"app": "my-app"}},
+                {"app": "my-app"},
+                True,
+            ),
+            (
+                "labels mismatch",
+                {"matchLabels": {"app": "other"}},
+                {"app": "my-app"},
+                False,
+            ),
+            ("no labels", {"matchLabels": {"app": "my-app"}}, None, False),
+            (
+                "in",
+                {
+                    "matchExpressions": [
+                        {"key": "app", "operator": "In", "values": ["a", "b"]}
+                    ]
+                },
+                {"app": "b"},
+                True,
+            ),
+            (
+                "not in",
+                {
+                    "matchExpressions": [
+                        {"key": "app", "operator": "NotIn", "values": ["a", "b"]}
+                    ]
+                },
+                {"app": "b"},
+                False,
+            ),
+            (
+                "exists",
+                {"matchExpressions": [{"key": "app", "operator": "Exists"}]},
+                {"tier": "b"},
+                False,
+            ),
+            (
+                "does not exist",
+                {"matchExpressions": [{"key": "app", "operator": "DoesNotExist"}]},
+                {"tier": "b"},
+                True,
+            ),
+            (
+                "not in values",
+                {
+                    "matchExpressions": [
+                        {"key": "app", "operator": "In", "values": ["a", "b"]}
+                    ]
+                },
+                {"app": "c"},
+                False,
+            ),
+            (
+                "not in other values",
+                {
+                    "matchExpressions": [
+                        {"key": "app", "operator": "NotIn", "values": ["a", "b"]}
+                    ]
+                },
+                {"app": "c"},
+                True,
+            ),
+            (
+                "exists with key",
+                {"matchExpressions": [{"key": "app", "operator": "Exists"}]},
+                {"app": "b"},
+                True,
+            ),
+            (
+                "does not exist with key",
+                {"matchExpressions": [{"key": "app", "operator": "DoesNotExist"}]},
+                {"app": "b"},
+                False,
+            ),
+        ]
+    )
+    def test_selector_matches(self, _, selector, labels, result):
+        """Tests for `metalk8s_drain._selector_matches`."""
+        self.assertEqual(metalk8s_drain._selector_matches(selector, labels), result)
+
+    def test_disruption_budgets(self):
+        """Tests for `metalk8s_drain.DisruptionBudgets`."""
+        budget = {
+            "metadata": {"name": "my-pdb", "namespace": "my-ns"},
+            "spec": {"selector": {"matchLabels": {"app": "my-app"}}},
+            "status": {"disruptionsAllowed": 1},
+        }
+        list_objects_mock = MagicMock(return_value=[budget])
+        pod = {
+            "metadata": {
+                "name": "my-pod",
+                "namespace": "my-ns",
+                "labels": {"app": "my-app"},
+            }
+        }
+        other_pod = {
+            "metadata": {
+                "name": "my-pod",
+                "namespace": "other-ns",
+                "labels": {"app": "my-app"},
+            }
+        }
+        time_mock = MagicMock(return_value=0)
+
+        budgets = metalk8s_drain.DisruptionBudgets()
+        with patch.dict(
+            metalk8s_drain.__salt__,
+            {"metalk8s_kubernetes.list_objects": list_objects_mock},
+        ), patch("time.time", time_mock):
+            self.assertIsNone(budgets.acquire(pod))
+            self.assertEqual(budgets.acquire(pod), "my-ns/my-pdb")
+            self.assertIsNone(budgets.acquire(other_pod))
+            budgets.release(pod)
+            self.assertIsNone(budgets.acquire(pod))
+
+            # Budgets are only retrieved once per refresh interval
+            list_objects_mock.assert_called_once()
+
+            # Retrieved budgets already account for the disruption reserved,
+            # it must not be released twice
+            time_mock.return_value = budgets.REFRESH_INTERVAL + 1
+            list_objects_mock.return_value = [
+                dict(budget, status={"disruptionsAllowed": 0})
+            ]
+            self.assertEqual(budgets.acquire(other_pod), None)
+            budgets.release(pod)
+            self.assertEqual(budgets.acquire(pod), "my-ns/my-pdb")
+            self.assertEqual(list_objects_mock.call_count, 2)
+
+    def test_disruption_budgets_list_error(self):
+        """Check that evictions are not blocked if budgets cannot be listed."""
+        list_objects_mock = MagicMock(
+            side_effect=CommandExecutionError("Failed to list resources")
+        )
+        pod = {
+            "metadata": {
+                "name": "my-pod",
+                "namespace": "my-ns",
+                "labels": {"app": "my-app"},
+            }
+        }
+
+        budgets = metalk8s_drain.DisruptionBudgets()
+        with patch.dict(
+            metalk8s_drain.__salt__,
+            {"metalk8s_kubernetes.list_objects": list_objects_mock},
+        ), patch("time.time", MagicMock(return_value=0)):
+            self.assertIsNone(budgets.acquire(pod))
+            self.assertIsNone(budgets.acquire(pod))
+
+        list_objects_mock.assert_called_once()
+
 
 class DrainTestCase(TestCase, mixins.LoaderModuleMockMixin):
     """Tests for the `Drain` interface used by the `metalk8s_drain` module.
@@ -201,15 +367,17 @@ class DrainTestCase(TestCase, mixins.LoaderModuleMockMixin):
                 ("apps/v1", "ReplicaSet"): "replicasets",
                 ("apps/v1", "DaemonSet"): "daemonsets",
                 ("__tests__", "EvictionMock"): "evictionmocks",
+                ("policy/v1", "PodDisruptionBudget"): "poddisruptionbudgets",
             },
         )
 
         def evict_pod_side_effect(name, namespace, **kwargs):
+            result = {"evicted": True, "retry_after": None, "disruption_budget": None}
             existing_pod = self.api_mock.get_object(
                 apiVersion="v1", kind="Pod", name=name, namespace=namespace
             )
             if existing_pod is None:
-                return True
+                return result
 
             eviction_mocks = self.api_mock.api.retrieve("evictionmocks")
             eviction_mock = next(
@@ -224,18 +392,26 @@ class DrainTestCase(TestCase, mixins.LoaderModuleMockMixin):
                 if eviction_mock.get("raises", False):
                     raise CommandExecutionError("Failed to evict pod")
 
-                return not eviction_mock.get("locked", False)
+                if eviction_mock.get("locked", False):
+                    result.update(
+                        evicted=False,
+                        retry_after=eviction_mock.get("retry_after"),
+                        disruption_budget=eviction_mock.get("disruption_budget"),
+                    )
 
-            return True
+            return result
 
         self.evict_pod_mock = MagicMock(side_effect=evict_pod_side_effect)
 
         return {
             "__salt__": {
+                "metalk8s_kubernetes.get_kubeconfig": MagicMock(
+                    return_value=("/my/kube/config", "my-context"),
+                ),
                 "metalk8s_kubernetes.get_object": self.api_mock.get_object,
                 "metalk8s_kubernetes.list_objects": self.api_mock.list_objects,
             },
-            "evict_pod": self.evict_pod_mock,
+            "_create_eviction": self.evict_pod_mock,
         }
 
     def seed_api_mock(self, dataset=None, events=None):
@@ -288,7 +464,7 @@ class DrainTestCase(TestCase, mixins.LoaderModuleMockMixin):
         log_lines=None,
         raises=False,
         raise_msg=None,
-        **kwargs
+        **kwargs,
     ):
         self.seed_api_mock(dataset)
         drainer = metalk8s_drain.Drain(node_name, **kwargs)
@@ -326,6 +502,122 @@ class DrainTestCase(TestCase, mixins.LoaderModuleMockMixin):
         self.assertEqual(result, "Eviction complete.")
         self.assertEqual(self.evict_pod_mock.call_count, eviction_attempts)
 
+    @parameterized.expand([("own budgets", False), ("shared budgets", True)])
+    def test_eviction_blocked_by_budget(self, _, shared_budgets):
+        """Check that a blocked pod does not delay the eviction of others."""
+        self.seed_api_mock(
+            "budget-blocked-eviction",
+            {
+                15: [
+                    {
+                        "resource": "evictionmocks",
+                        "verb": "delete",
+                        "pod": "my-namespace/my-pod-1",
+                    }
+                ],
+                25: [
+                    {"resource": "pods", "verb": "delete", "name": name}
+                    for name in ["my-pod-1", "my-pod-2", "my-pod-3"]
+                ],
+            },
+        )
+        self.api_mock.api.database["poddisruptionbudgets"] = []
+        budgets = metalk8s_drain.DisruptionBudgets() if shared_budgets else None
+        drainer = metalk8s_drain.Drain("my-node", budgets=budgets)
+
+        with capture_logs(
+            metalk8s_drain.log, logging.INFO
+        ) as captured, self.time_mock.patch():
+            result = drainer.run_drain()
+
+        self.assertEqual(result, "Eviction complete.")
+        # Other pods are evicted right away, the blocked one is retried once
+        # the `Retry-After` delay is elapsed
+        self.assertEqual(
+            sorted(call[1]["name"] for call in self.evict_pod_mock.call_args_list),
+            ["my-pod-1", "my-pod-1", "my-pod-2", "my-pod-3"],
+        )
+        self.assertEqual(drainer.blocked_time, {"my-namespace/my-pdb": 20})
+        self.assertIn(
+            "INFO | Time spent blocked by PodDisruptionBudgets: my-namespace/my-pdb: 20.0s",
+            captured.output,
+        )
+
+    def test_controllers_prefetch(self):
+        """Check that controllers are retrieved with a single LIST per kind."""
+        self.seed_api_mock("full")
+        list_objects_mock = MagicMock(side_effect=self.api_mock.list_objects)
+        get_object_mock = MagicMock(side_effect=self.api_mock.get_object)
+        drainer = metalk8s_drain.Drain(
+            "my-node", force=True, ignore_daemonset=True, delete_local_data=True
+        )
+
+        with patch.dict(
+            metalk8s_drain.__salt__,
+            {
+                "metalk8s_kubernetes.list_objects": list_objects_mock,
+                "metalk8s_kubernetes.get_object": get_object_mock,
+            },
+        ):
+            drainer.run_drain(dry_run=True)
+            drainer.run_drain(dry_run=True)
+
+        get_object_mock.assert_not_called()
+        self.assertEqual(
+            sorted(call[1]["kind"] for call in list_objects_mock.call_args_list),
+            ["DaemonSet", "Pod", "Pod", "ReplicaSet"],
+        )
+
+    def test_controllers_prefetch_all_namespaces(self):
+        """Check that controllers from several namespaces are listed at once."""
+        self.api_mock.api.database["replicasets"] = [
+            {
+                "apiVersion": "apps/v1",
+                "kind": "ReplicaSet",
+                "metadata": {"name": "my-rs", "namespace": namespace},
+            }
+            for namespace in ["ns-a", "ns-b"]
+        ]
+        controller_ref = {
+            "apiVersion": "apps/v1",
+            "kind": "ReplicaSet",
+            "name": "my-rs",
+            "controller": True,
+        }
+        pods = [
+            {
+                "metadata": {
+                    "name": "my-pod",
+                    "namespace": namespace,
+                    "ownerReferences": [controller_ref],
+                }
+            }
+            for namespace in ["ns-a", "ns-b", "ns-c"]
+        ]
+        list_objects_mock = MagicMock(side_effect=self.api_mock.list_objects)
+        get_object_mock = MagicMock(side_effect=self.api_mock.get_object)
+        drainer = metalk8s_drain.Drain("my-node")
+
+        with patch.dict(
+            metalk8s_drain.__salt__,
+            {
+                "metalk8s_kubernetes.list_objects": list_objects_mock,
+                "metalk8s_kubernetes.get_object": get_object_mock,
+            },
+        ):
+            drainer.prefetch_controllers(pods)
+            for namespace in ["ns-a", "ns-b"]:
+                self.assertEqual(
+                    drainer.get_controller(namespace, controller_ref)["metadata"],
+                    {"name": "my-rs", "namespace": namespace},
+                )
+            self.assertIsNone(drainer.get_controller("ns-c", controller_ref))
+
+        list_objects_mock.assert_called_once_with(
+            kind="ReplicaSet", apiVersion="apps/v1", all_namespaces=True
+        )
+        get_object_mock.assert_not_called()
+
     @utils.parameterized_from_cases(YAML_TESTS_CASES["drain"]["waiting-for-eviction"])
     def test_waiting_for_eviction(
         self, node_name, dataset, sleep_time, events=None, **kwargs
@@ -340,6 +632,80 @@ class DrainTestCase(TestCase, mixins.LoaderModuleMockMixin):
         self.assertEqual(result, "Eviction complete.")
         self.assertEqual(self.time_mock.time(), sleep_time)
 
+    @parameterized.expand(
+        [
+            ("watch nominal", False, None),
+            ("watch expired", True, 410),
+            ("watch unavailable", True, 500),
+        ]
+    )
+    def test_waiting_for_eviction_watch(self, _, watch_raises, watch_error_status):
+        """Check that the drain follows pod deletions using a single watch."""
+        # Pods only get removed after some time if not using the watch
+        events = {}
+        if watch_error_status == 500:
+            events[3] = [
+                {"resource": "pods", "verb": "delete", "name": name}
+                for name in ["my-pod-1", "my-pod-2", "my-pod-3"]
+            ]
+        self.seed_api_mock("multiple-pods", events)
+        for index, pod in enumerate(self.api_mock.api.database["pods"]):
+            pod["metadata"]["uid"] = "uid-{}".format(index)
+            pod["metadata"]["resourceVersion"] = str(100 + index)
+
+        watch_calls = []
+
+        def _watch_objects(resource_version, **kwargs):
+            watch_calls.append(resource_version)
+            if watch_raises and len(watch_calls) == 1:
+                raise CommandExecutionError("Failed to watch resources") from (
+                    ApiException(status=watch_error_status)
+                )
+
+            for pod in list(self.api_mock.api.database["pods"]):
+                self.api_mock.api.delete("pods", name=pod["metadata"]["name"])
+                yield {
+                    "type": "DELETED",
+                    "object": dict(
+                        pod,
+                        metadata=dict(pod["metadata"], resourceVersion="200"),
+                    ),
+                }
+
+        list_objects_mock = MagicMock(side_effect=self.api_mock.list_objects)
+        get_object_mock = MagicMock(side_effect=self.api_mock.get_object)
+        salt_dict = {
+            "metalk8s_kubernetes.list_objects": list_objects_mock,
+            "metalk8s_kubernetes.get_object": get_object_mock,
+        }
+        utils_dict = {"metalk8s_kubernetes.watch_objects": _watch_objects}
+        drainer = metalk8s_drain.Drain("my-node", timeout=30)
+
+        with patch.dict(metalk8s_drain.__salt__, salt_dict), patch.dict(
+            metalk8s_drain.__utils__, utils_dict
+        ), self.time_mock.patch():
+            result = drainer.run_drain()
+
+        self.assertEqual(result, "Eviction complete.")
+        self.assertEqual(self.evict_pod_mock.call_count, 3)
+        # Pods are only retrieved through LIST and watch, never one by one
+        get_object_mock.assert_not_called()
+        pod_list_calls = [
+            call
+            for call in list_objects_mock.call_args_list
+            if call[1]["kind"] == "Pod"
+        ]
+        self.assertEqual(self.api_mock.api.database["pods"], [])
+        if watch_error_status == 500:
+            # Watch disabled, falling back to listing pods once per tick
+            self.assertEqual(watch_calls, ["102"])
+            self.assertEqual(len(pod_list_calls), 5)
+            self.assertEqual(self.time_mock.time(), 3)
+        else:
+            self.assertEqual(watch_calls[0], "102")
+            self.assertEqual(len(watch_calls), 2 if watch_raises else 1)
+            self.assertEqual(len(pod_list_calls), 3 if watch_raises else 2)
+
     @utils.parameterized_from_cases(YAML_TESTS_CASES["drain"]["timeout"])
     def test_timeout(self, node_name, dataset, **kwargs):
         """Check different sources of timeout."""
@@ -365,3 +731,218 @@ class DrainTestCase(TestCase, mixins.LoaderModuleMockMixin):
                 "Failed to evict pod",
                 drainer.run_drain,
             )
+
+    def test_nodes_drain(self):
+        """Check that several nodes are drained sharing budgets and pod watch."""
+        self.seed_api_mock("multiple-pods")
+        pods = self.api_mock.api.database["pods"]
+        for index, pod in enumerate(pods):
+            pod["metadata"]["uid"] = f"uid-{index}"
+            pod["metadata"]["resourceVersion"] = str(100 + index)
+            pod["metadata"]["labels"] = {"app": f"my-app-{index % 2}"}
+        pods[2]["spec"] = dict(pods[2]["spec"], nodeName="other-node")
+        # Only one of `my-pod-1` and `my-pod-3` can be disrupted at a time
+        self.api_mock.api.database["poddisruptionbudgets"] = [
+            {
+                "apiVersion": "policy/v1",
+                "kind": "PodDisruptionBudget",
+                "metadata": {"name": "my-pdb", "namespace": "my-namespace"},
+                "spec": {"selector": {"matchLabels": {"app": "my-app-0"}}},
+                "status": {"disruptionsAllowed": 1},
+            }
+        ]
+
+        evicted = []
+
+        def _create_eviction(name, namespace, **kwargs):
+            evicted.append(name)
+            return self.evict_pod_mock(name=name, namespace=namespace, **kwargs)
+
+        watch_calls = []
+
+        def _watch_objects(field_selector, resource_version=None, **_):
+            watch_calls.append(field_selector)
+            node_name = field_selector.partition("=")[2]
+            for name in list(evicted):
+                pod = self.api_mock.get_object(
+                    apiVersion="v1", kind="Pod", name=name, namespace="my-namespace"
+                )
+                if pod and pod["spec"]["nodeName"] == node_name:
+                    self.api_mock.api.delete("pods", name=name)
+                    yield {
+                        "type": "DELETED",
+                        "object": {
+                            "metadata": {
+                                "name": name,
+                                "namespace": "my-namespace",
+                                "uid": f"uid-{int(name[-1]) - 1}",
+                                "resourceVersion": "200",
+                            }
+                        },
+                    }
+            time.sleep(0.01)
+
+        cordon_mock = MagicMock()
+        with patch.dict(
+            metalk8s_drain.__salt__, {"metalk8s_kubernetes.cordon_node": cordon_mock}
+        ), patch.dict(
+            metalk8s_drain.__utils__,
+            {"metalk8s_kubernetes.watch_objects": _watch_objects},
+        ), patch.object(
+            metalk8s_drain, "_create_eviction", _create_eviction
+        ), self.time_mock.patch():
+            result = metalk8s_drain.nodes_drain(
+                ["my-node", "other-node"], max_parallel=2
+            )
+
+        self.assertEqual(set(result), {"my-node", "other-node"})
+        for node_ret in result.values():
+            self.assertTrue(node_ret["result"])
+            self.assertEqual(node_ret["comment"], "Eviction complete.")
+            self.assertEqual(
+                set(node_ret["timings"]), {"selection", "eviction", "deletion"}
+            )
+        self.assertEqual(cordon_mock.call_count, 2)
+        self.assertEqual(self.api_mock.api.database["pods"], [])
+        # The pod blocked by the shared budget was never sent for eviction
+        # before the budget allowed it
+        self.assertEqual(sorted(evicted), ["my-pod-1", "my-pod-2", "my-pod-3"])
+        self.assertEqual(
+            sum(
+                "my-namespace/my-pdb" in node_ret["blocked_time"]
+                for node_ret in result.values()
+            ),
+            1,
+        )
+        # Each drain only watches the pods of its node
+        self.assertEqual(
+            set(watch_calls), {"spec.nodeName=my-node", "spec.nodeName=other-node"}
+        )
+
+    def test_nodes_drain_failure(self):
+        """Check that a failed drain does not prevent other drains."""
+        self.seed_api_mock("empty")
+
+        def _cordon_node(node_name, **_):
+            if node_name == "other-node":
+                raise CommandExecutionError(f"Unable to cordon {node_name}")
+
+        cordon_mock = MagicMock(side_effect=_cordon_node)
+
+        with patch.dict(
+            metalk8s_drain.__salt__, {"metalk8s_kubernetes.cordon_node": cordon_mock}
+        ), self.time_mock.patch():
+            result = metalk8s_drain.nodes_drain(["my-node", "other-node"])
+
+        self.assertTrue(result["my-node"]["result"])
+        self.assertEqual(result["my-node"]["comment"], "Eviction complete.")
+        self.assertFalse(result["other-node"]["result"])
+        self.assertEqual(result["other-node"]["comment"], "Unable to cordon other-node")
+
+
+class EvictionWatcherTestCase(TestCase, mixins.LoaderModuleMockMixin):
+    """Tests for the `EvictionWatcher` used by `Drain` to follow pod deletions.
+
+    See `DrainTestCase` for the watch errors handling.
+    """
+
+    loader_module = metalk8s_drain
+
+    def loader_module_globals(self):
+        self.pods = [
+            {
+                "metadata": {
+                    "name": f"my-pod-{index}",
+                    "namespace": "my-namespace",
+                    "uid": f"uid-{index}",
+                    "resourceVersion": str(100 + index),
+                }
+            }
+            for index in range(3)
+        ]
+        self.list_objects_mock = MagicMock(side_effect=lambda **_: list(self.pods))
+        self.watch_objects_mock = MagicMock(return_value=iter([]))
+
+        return {
+            "__salt__": {
+                "metalk8s_kubernetes.get_kubeconfig": MagicMock(
+                    return_value=("/my/kube/config", "my-context"),
+                ),
+                "metalk8s_kubernetes.list_objects": self.list_objects_mock,
+            },
+            "__utils__": {
+                "metalk8s_kubernetes.watch_objects": self.watch_objects_mock,
+            },
+        }
+
+    def _event(self, event_type, pod, resource_version):
+        metadata = dict(pod["metadata"], resourceVersion=resource_version)
+        return {"type": event_type, "object": dict(pod, metadata=metadata)}
+
+    def test_wait(self):
+        """Check that pods seen on the node are kept between waits."""
+        new_pod = {
+            "metadata": {
+                "name": "my-pod-3",
+                "namespace": "my-namespace",
+                "uid": "uid-3",
+            }
+        }
+        watches = [
+            [
+                self._event("ADDED", new_pod, "103"),
+                self._event("DELETED", self.pods[0], "104"),
+            ],
+            [self._event("DELETED", new_pod, "105")],
+        ]
+        self.watch_objects_mock.side_effect = lambda **_: iter(watches.pop(0))
+        check_timer = MagicMock()
+        tick = MagicMock()
+        watcher = metalk8s_drain.EvictionWatcher("my-node")
+
+        watcher.wait(self.pods[:1], check_timer, tick)
+        self.list_objects_mock.assert_called_once_with(
+            kind="Pod",
+            apiVersion="v1",
+            all_namespaces=True,
+            field_selector="spec.nodeName=my-node",
+        )
+        self.watch_objects_mock.assert_called_once_with(
+            kubeconfig="/my/kube/config",
+            context="my-context",
+            kind="Pod",
+            apiVersion="v1",
+            all_namespaces=True,
+            field_selector="spec.nodeName=my-node",
+            resource_version="102",
+            timeout=watcher.WATCH_TIMEOUT,
+        )
+
+        # Pod added since the LIST, followed with the same watch
+        watcher.wait([new_pod], check_timer, tick, deadline=time.time() + 5)
+        self.assertEqual(self.list_objects_mock.call_count, 1)
+        self.assertEqual(
+            self.watch_objects_mock.call_args[1]["resource_version"], "104"
+        )
+        self.assertEqual(self.watch_objects_mock.call_args[1]["timeout"], 4)
+
+        # Pod already deleted when waited for, pods are listed again
+        del self.pods[0]
+        watcher.wait([new_pod], check_timer, tick)
+        self.assertEqual(self.list_objects_mock.call_count, 2)
+        self.assertEqual(self.watch_objects_mock.call_count, 2)
+        self.assertEqual(tick.call_count, 2)
+
+    def test_wait_no_resource_version(self):
+        """Check that pods are polled if the watch cannot be started."""
+        for pod in self.pods:
+            del pod["metadata"]["resourceVersion"]
+        self.list_objects_mock.side_effect = [list(self.pods), self.pods[1:]]
+        tick = MagicMock()
+        watcher = metalk8s_drain.EvictionWatcher("my-node")
+
+        watcher.wait(self.pods[:1], MagicMock(), tick)
+
+        self.assertEqual(self.list_objects_mock.call_count, 2)
+        self.assertEqual(tick.call_count, 2)
+        self.watch_objects_mock.assert_not_called()
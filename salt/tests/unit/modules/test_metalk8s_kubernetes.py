@@ -1,9 +1,13 @@
+import copy
 from importlib import reload
 import os.path
 from unittest import TestCase
 from unittest.mock import MagicMock, patch
 
+import kubernetes.client as k8s_client
+from kubernetes.dynamic import DynamicClient
 from kubernetes.dynamic.exceptions import ResourceNotFoundError
+from kubernetes.dynamic.resource import Resource
 from kubernetes.client.rest import ApiException
 from parameterized import param, parameterized
 from salt.utils import dictupdate, hashutils
@@ -11,6 +15,7 @@ from salt.exceptions import CommandExecutionError
 import yaml
 
 from _modules import metalk8s_kubernetes
+from _utils import metalk8s_kubernetes as metalk8s_kubernetes_utils
 
 from tests.unit import mixins
 from tests.unit import utils
@@ -79,7 +84,9 @@ class Metalk8sKubernetesTestCase(TestCase, mixins.LoaderModuleMockMixin):
         # Consider we have no slots in these tests
         salt_obj.metalk8s.format_slots.side_effect = lambda manifest: manifest
 
-        return {"__salt__": salt_obj}
+        utils_dict = {"metalk8s_kubernetes.invalidate_client": MagicMock()}
+
+        return {"__salt__": salt_obj, "__utils__": utils_dict}
 
     def assertDictContainsSubset(self, subdict, maindict):
         return self.assertEqual(dict(maindict, **subdict), maindict)
@@ -122,7 +129,7 @@ class Metalk8sKubernetesTestCase(TestCase, mixins.LoaderModuleMockMixin):
         namespaced=False,
         manifest_file_content=None,
         called_with=None,
-        **kwargs
+        **kwargs,
     ):
         """
         Tests the return of `create_object` function
@@ -183,7 +190,7 @@ class Metalk8sKubernetesTestCase(TestCase, mixins.LoaderModuleMockMixin):
         namespaced=True,
         manifest_file_content=None,
         called_with=None,
-        **kwargs
+        **kwargs,
     ):
         """
         Tests the return of `delete_object` function
@@ -246,7 +253,7 @@ class Metalk8sKubernetesTestCase(TestCase, mixins.LoaderModuleMockMixin):
         namespaced=False,
         manifest_file_content=None,
         called_with=None,
-        **kwargs
+        **kwargs,
     ):
         """
         Tests the return of `repace_object` function
@@ -309,7 +316,7 @@ class Metalk8sKubernetesTestCase(TestCase, mixins.LoaderModuleMockMixin):
         namespaced=True,
         manifest_file_content=None,
         called_with=None,
-        **kwargs
+        **kwargs,
     ):
         """
         Tests the return of `get_object` function
@@ -372,7 +379,7 @@ class Metalk8sKubernetesTestCase(TestCase, mixins.LoaderModuleMockMixin):
         namespaced=False,
         manifest_file_content=None,
         called_with=None,
-        **kwargs
+        **kwargs,
     ):
         """
         Tests the return of `update_object` function
@@ -445,6 +452,103 @@ class Metalk8sKubernetesTestCase(TestCase, mixins.LoaderModuleMockMixin):
             )
             get_object_mock.assert_called_once()
 
+    @parameterized.expand(
+        [
+            param("nominal", workers=None),
+            param("sequential", workers=1),
+            param("missing object", workers=None, missing="node-2"),
+            param("api error", workers=None, api_status_code=500, raises=True),
+            param(
+                "unknown kind",
+                workers=None,
+                namespaced=None,
+                raises=True,
+                error="Kind 'Node' from apiVersion 'v1' is unknown",
+            ),
+            param("no refs", workers=None, refs=[]),
+        ]
+    )
+    def test_get_objects(
+        self,
+        _,
+        workers,
+        missing=None,
+        api_status_code=None,
+        raises=False,
+        error="Failed to get object",
+        refs=None,
+        namespaced=True,
+    ):
+        """
+        Tests the return of `get_objects` function
+        """
+        if refs is None:
+            refs = [
+                {"kind": "Node", "apiVersion": "v1", "name": "node-1"},
+                {"kind": "Node", "apiVersion": "v1", "name": "node-2"},
+                {
+                    "kind": "ConfigMap",
+                    "apiVersion": "v1",
+                    "metadata": {"name": "my-cm", "namespace": "my-ns"},
+                },
+                {
+                    "kind": "ConfigMap",
+                    "apiVersion": "v1",
+                    "name": "other-cm",
+                    "namespace": "other-ns",
+                },
+            ]
+
+        def _get_mock(name, **_):
+            if api_status_code is not None and name == "node-2":
+                raise ApiException(
+                    status=api_status_code, reason="An error has occurred"
+                )
+            if name == missing:
+                raise ApiException(status=404, reason="Not found")
+
+            res = MagicMock()
+            res.to_dict.return_value = "<{} object dict>".format(name)
+            return res
+
+        get_mock = MagicMock(side_effect=_get_mock)
+        get_client_mock = _mock_k8s_dynamic(
+            namespaced=namespaced, action="get", mock=get_mock
+        )
+        utils_dict = {
+            "metalk8s_kubernetes.get_client": get_client_mock,
+            "metalk8s_kubernetes.invalidate_client": MagicMock(),
+        }
+
+        with patch.dict(metalk8s_kubernetes.__utils__, utils_dict):
+            if raises:
+                self.assertRaisesRegex(
+                    CommandExecutionError,
+                    error,
+                    metalk8s_kubernetes.get_objects,
+                    refs,
+                    workers=workers,
+                )
+                return
+
+            result = metalk8s_kubernetes.get_objects(refs, workers=workers)
+
+        self.assertEqual(
+            result,
+            [
+                None if name == missing else f"<{name} object dict>"
+                for name in ["node-1", "node-2", "my-cm", "other-cm"][: len(refs)]
+            ],
+        )
+        self.assertEqual(get_mock.call_count, len(refs))
+        called_namespaces = {
+            call[1]["name"]: call[1]["namespace"] for call in get_mock.call_args_list
+        }
+        if refs:
+            self.assertEqual(called_namespaces["my-cm"], "my-ns")
+            self.assertEqual(called_namespaces["other-cm"], "other-ns")
+            self.assertEqual(called_namespaces["node-1"], "default")
+
     def test_rollout_restart(self):
         """
         Tests the return of `rollout_restart` function
@@ -455,6 +559,35 @@ class Metalk8sKubernetesTestCase(TestCase, mixins.LoaderModuleMockMixin):
             self.assertEqual(metalk8s_kubernetes.rollout_restart(), "patched !!")
             update_obj_mock.assert_called_once()
 
+    @parameterized.expand([(True,), (False,), (None,)])
+    def test_is_namespaced(self, namespaced):
+        """
+        Tests the return of `is_namespaced` function
+        """
+        utils_dict = {
+            "metalk8s_kubernetes.get_client": _mock_k8s_dynamic(
+                namespaced=namespaced, action="get", mock=MagicMock()
+            )
+        }
+
+        with patch.dict(metalk8s_kubernetes.__utils__, utils_dict):
+            if namespaced is None:
+                self.assertRaisesRegex(
+                    CommandExecutionError,
+                    "Kind 'MyKind' from apiVersion 'v1' is unknown",
+                    metalk8s_kubernetes.is_namespaced,
+                    kind="MyKind",
+                    apiVersion="v1",
+                )
+                metalk8s_kubernetes.__utils__[
+                    "metalk8s_kubernetes.invalidate_client"
+                ].assert_called_once_with("/my/kube/config", "my-context")
+            else:
+                self.assertEqual(
+                    metalk8s_kubernetes.is_namespaced(kind="MyKind", apiVersion="v1"),
+                    namespaced,
+                )
+
     @utils.parameterized_from_cases(YAML_TESTS_CASES["list_objects"])
     def test_list_objects(
         self,
@@ -463,7 +596,7 @@ class Metalk8sKubernetesTestCase(TestCase, mixins.LoaderModuleMockMixin):
         api_status_code=None,
         namespaced=True,
         called_with=None,
-        **kwargs
+        **kwargs,
     ):
         """
         Tests the return of `list_objects` function
@@ -494,17 +627,278 @@ class Metalk8sKubernetesTestCase(TestCase, mixins.LoaderModuleMockMixin):
             )
         }
 
+        invalidate_client_mock = MagicMock()
+        utils_dict["metalk8s_kubernetes.invalidate_client"] = invalidate_client_mock
+
         with patch.dict(metalk8s_kubernetes.__utils__, utils_dict):
             if raises:
                 self.assertRaisesRegex(
                     Exception, result, metalk8s_kubernetes.list_objects, **kwargs
                 )
+                if namespaced is None:
+                    invalidate_client_mock.assert_called_once_with(
+                        "/my/kube/config", "my-context"
+                    )
             else:
                 self.assertEqual(metalk8s_kubernetes.list_objects(**kwargs), result)
                 list_mock.assert_called_once()
+                invalidate_client_mock.assert_not_called()
                 if called_with:
                     self.assertDictContainsSubset(called_with, list_mock.call_args[1])
 
+    @parameterized.expand(
+        [
+            # Cluster-scoped object
+            (
+                False,
+                {"name": "my_node", "namespace": "my-namespace"},
+                "/api/v1/nodes/my_node",
+            ),
+            # Namespaced object
+            (
+                True,
+                {"name": "my_node", "namespace": "my-namespace"},
+                "/api/v1/namespaces/my-namespace/nodes/my_node",
+            ),
+            # Namespaced object, in the default namespace
+            (True, {"name": "my_node"}, "/api/v1/namespaces/default/nodes/my_node"),
+            # Error when applying object
+            (True, {"name": "my_node"}, None, 500),
+        ]
+    )
+    def test_server_side_apply_object(
+        self, namespaced, metadata, path, api_status_code=None
+    ):
+        """
+        Tests the return of `server_side_apply_object` function, with the
+        request built by the Kubernetes client
+        """
+        manifest = {"apiVersion": "v1", "kind": "Node", "metadata": metadata}
+
+        def _request_mock(method, url, body=None, headers=None, **_):
+            response = MagicMock()
+            response.status = api_status_code or 200
+            response.reason = "An error has occurred"
+            response.data = body.encode()
+            response.getheaders.return_value = headers
+            return response
+
+        api_client = k8s_client.ApiClient(
+            k8s_client.Configuration(host="https://my-apiserver:6443")
+        )
+        api_client.rest_client.pool_manager = MagicMock()
+        api_client.rest_client.pool_manager.request.side_effect = _request_mock
+        dynamic_client = DynamicClient(api_client, discoverer=MagicMock())
+        dynamic_client.resources.get.return_value = Resource(
+            prefix="api",
+            api_version="v1",
+            kind="Node",
+            name="nodes",
+            namespaced=namespaced,
+            client=dynamic_client,
+        )
+
+        utils_dict = {
+            "metalk8s_kubernetes.get_client": MagicMock(return_value=dynamic_client)
+        }
+
+        with patch.dict(metalk8s_kubernetes.__utils__, utils_dict):
+            if api_status_code is not None:
+                self.assertRaisesRegex(
+                    CommandExecutionError,
+                    "Failed to apply object",
+                    metalk8s_kubernetes.server_side_apply_object,
+                    manifest=manifest,
+                )
+                return
+
+            result = metalk8s_kubernetes.server_side_apply_object(manifest=manifest)
+
+        request = api_client.rest_client.pool_manager.request
+        request.assert_called_once()
+        method, url = request.call_args[0]
+        self.assertEqual(method, "PATCH")
+        self.assertEqual(
+            url, f"https://my-apiserver:6443{path}?fieldManager=salt&force=true"
+        )
+        self.assertEqual(
+            request.call_args[1]["headers"]["Content-Type"],
+            "application/apply-patch+yaml",
+        )
+        # The full manifest is sent, with Salt labels
+        body = yaml.safe_load(request.call_args[1]["body"])
+        self.assertEqual(body["kind"], "Node")
+        self.assertEqual(body["metadata"]["name"], "my_node")
+        self.assertEqual(
+            body["metadata"]["labels"]["app.kubernetes.io/managed-by"], "salt"
+        )
+        self.assertEqual(result, body)
+
+    @parameterized.expand(
+        [
+            # Object does not exist
+            (None, "created"),
+            # Object exists but changed
+            ({"data": {"key": "changed"}}, "replaced"),
+        ]
+    )
+    def test_apply_object_server_side(self, old_object, result):
+        """
+        Tests the return of `apply_object` function, using server-side apply
+        """
+        manifest = {
+            "apiVersion": "v1",
+            "kind": "ConfigMap",
+            "metadata": {"name": "my-cm", "namespace": "my-namespace"},
+            "data": {"key": "value"},
+        }
+        if old_object is not None:
+            old_object = dict(manifest, **old_object)
+
+        ssa_mock = MagicMock(side_effect=lambda manifest, **_: manifest)
+        create_mock = MagicMock()
+        replace_mock = MagicMock()
+
+        with patch.object(
+            metalk8s_kubernetes, "server_side_apply_object", ssa_mock
+        ), patch.object(
+            metalk8s_kubernetes, "create_object", create_mock
+        ), patch.object(
+            metalk8s_kubernetes, "replace_object", replace_mock
+        ):
+            ret = metalk8s_kubernetes.apply_object(
+                manifest=manifest, old_object=old_object, server_side=True
+            )
+
+        self.assertEqual(ret["action"], result)
+        ssa_mock.assert_called_once()
+        create_mock.assert_not_called()
+        replace_mock.assert_not_called()
+        self.assertIn(
+            metalk8s_kubernetes.APPLIED_DIGEST_ANNOTATION,
+            ret["new"]["metadata"]["annotations"],
+        )
+
+    @parameterized.expand(
+        [
+            # Same manifest, object only has some server-side fields added
+            ({}, "unchanged"),
+            # A key was added in the manifest
+            ({"data": {"key": "value", "other": "value"}}, "replaced"),
+            # A key was removed from the manifest
+            ({"data": {}}, "replaced"),
+            # A value was changed in the manifest
+            ({"data": {"key": "other-value"}}, "replaced"),
+            # Same manifest, but the object was changed out of Salt
+            ({}, "replaced", {"data": {"key": "changed"}}),
+            # Same manifest applied with another Salt environment
+            ({}, "replaced", None, "metalk8s-2.5.0"),
+        ]
+    )
+    def test_apply_object(
+        self, manifest_update, result, object_update=None, saltenv="base"
+    ):
+        """
+        Tests the return of `apply_object` function
+        """
+        manifest = {
+            "apiVersion": "v1",
+            "kind": "ConfigMap",
+            "metadata": {"name": "my-cm", "namespace": "my-namespace"},
+            "data": {"key": "value"},
+        }
+
+        create_mock = MagicMock(side_effect=lambda manifest, **_: manifest)
+        replace_mock = MagicMock(side_effect=lambda manifest, **_: manifest)
+
+        with patch.object(
+            metalk8s_kubernetes, "create_object", create_mock
+        ), patch.object(metalk8s_kubernetes, "replace_object", replace_mock):
+            created = metalk8s_kubernetes.apply_object(
+                manifest=dict(manifest, metadata=dict(manifest["metadata"]))
+            )
+            self.assertEqual(created["action"], "created")
+            create_mock.assert_called_once()
+            self.assertIn(
+                metalk8s_kubernetes.APPLIED_DIGEST_ANNOTATION,
+                created["new"]["metadata"]["annotations"],
+            )
+
+            # Simulate the fields added by the API server
+            old_object = dict(created["new"], status={"phase": "Ok"})
+            old_object["metadata"] = dict(
+                old_object["metadata"], resourceVersion="1234", uid="abcd"
+            )
+            old_object.update(object_update or {})
+
+            new_manifest = dict(manifest, metadata=dict(manifest["metadata"]))
+            new_manifest.update(manifest_update)
+
+            # Test mode never writes anything
+            ret = metalk8s_kubernetes.apply_object(
+                manifest=dict(new_manifest, metadata=dict(new_manifest["metadata"])),
+                old_object=old_object,
+                saltenv=saltenv,
+                test=True,
+            )
+            self.assertEqual(ret["action"], result)
+            replace_mock.assert_not_called()
+
+            expected_manifest = copy.deepcopy(new_manifest)
+            ret = metalk8s_kubernetes.apply_object(
+                manifest=new_manifest, old_object=old_object, saltenv=saltenv
+            )
+
+        # The manifest provided is left untouched
+        self.assertEqual(new_manifest, expected_manifest)
+        self.assertEqual(ret["action"], result)
+        self.assertEqual(ret["old"], old_object)
+        create_mock.assert_called_once()
+        if result == "unchanged":
+            replace_mock.assert_not_called()
+            self.assertEqual(ret["new"], old_object)
+        else:
+            replace_mock.assert_called_once()
+            self.assertEqual(replace_mock.call_args[1]["old_object"], old_object)
+
+    @parameterized.expand(
+        [
+            # Server-side fields added in list items
+            ([{"port": 80, "protocol": "TCP"}], "unchanged"),
+            # Item removed from the list
+            ([], "replaced"),
+            # Item value changed
+            ([{"port": 8080}], "replaced"),
+            # List removed from the object
+            (None, "replaced"),
+        ]
+    )
+    def test_apply_object_lists(self, ports, result):
+        """
+        Tests the return of `apply_object` function, with lists in manifests
+        """
+        manifest = {
+            "apiVersion": "v1",
+            "kind": "Service",
+            "metadata": {"name": "my-svc", "namespace": "my-namespace"},
+            "spec": {"ports": [{"port": 80}]},
+        }
+
+        create_mock = MagicMock(side_effect=lambda manifest, **_: manifest)
+        replace_mock = MagicMock(side_effect=lambda manifest, **_: manifest)
+
+        with patch.object(
+            metalk8s_kubernetes, "create_object", create_mock
+        ), patch.object(metalk8s_kubernetes, "replace_object", replace_mock):
+            created = metalk8s_kubernetes.apply_object(manifest=copy.deepcopy(manifest))
+            old_object = dict(created["new"], spec={"ports": ports})
+
+            ret = metalk8s_kubernetes.apply_object(
+                manifest=copy.deepcopy(manifest), old_object=old_object
+            )
+
+        self.assertEqual(ret["action"], result)
+
     @parameterized.expand(
         param.explicit(kwargs=test_case)
         for test_case in YAML_TESTS_CASES["get_object_digest"]
@@ -544,3 +938,90 @@ class Metalk8sKubernetesTestCase(TestCase, mixins.LoaderModuleMockMixin):
                 self.assertEqual(
                     metalk8s_kubernetes.check_object_ready(**kwargs), result
                 )
+
+
+class Metalk8sKubernetesWatchTestCase(TestCase, mixins.LoaderModuleMockMixin):
+    """
+    TestCase for `watch_objects` function of `metalk8s_kubernetes` utils
+    """
+
+    loader_module = metalk8s_kubernetes_utils
+
+    @parameterized.expand(
+        [
+            ("nominal", None, True),
+            ("all namespaces", None, False),
+            ("label selector", None, True, "app=my-app"),
+            ("api error", 410, True),
+            ("unknown kind", None, None),
+        ]
+    )
+    def test_watch_objects(self, _, api_status_code, namespaced, label_selector=None):
+        """
+        Tests the return of `watch_objects` function
+        """
+
+        def _watch_mock(**_):
+            yield {"type": "ADDED", "raw_object": {"metadata": {"name": "pod-1"}}}
+            if api_status_code is not None:
+                raise ApiException(status=api_status_code, reason="Expired")
+            yield {"type": "DELETED", "raw_object": {"metadata": {"name": "pod-1"}}}
+
+        watch_mock = MagicMock(side_effect=_watch_mock)
+        get_client_mock = _mock_k8s_dynamic(
+            namespaced=namespaced, action="watch", mock=watch_mock
+        )
+        invalidate_client_mock = MagicMock()
+
+        with patch.object(
+            metalk8s_kubernetes_utils, "get_client", get_client_mock
+        ), patch.object(
+            metalk8s_kubernetes_utils, "invalidate_client", invalidate_client_mock
+        ):
+            events = metalk8s_kubernetes_utils.watch_objects(
+                "/my/kube/config",
+                "my-context",
+                kind="Pod",
+                apiVersion="v1",
+                all_namespaces=namespaced is False,
+                field_selector="spec.nodeName=my-node",
+                label_selector=label_selector,
+                resource_version="42",
+                timeout=10,
+            )
+            if namespaced is None:
+                with self.assertRaisesRegex(
+                    CommandExecutionError, "Kind 'Pod' from apiVersion 'v1' is unknown"
+                ):
+                    next(events)
+                invalidate_client_mock.assert_called_once_with(
+                    "/my/kube/config", "my-context"
+                )
+                watch_mock.assert_not_called()
+                return
+
+            if api_status_code is not None:
+                self.assertEqual(
+                    next(events),
+                    {"type": "ADDED", "object": {"metadata": {"name": "pod-1"}}},
+                )
+                with self.assertRaisesRegex(
+                    CommandExecutionError, 'Failed to watch resources "v1/Pod"'
+                ) as exc:
+                    next(events)
+                self.assertEqual(exc.exception.__cause__.status, api_status_code)
+            else:
+                self.assertEqual(
+                    [event["type"] for event in events], ["ADDED", "DELETED"]
+                )
+
+        expected_kwargs = {
+            "field_selector": "spec.nodeName=my-node",
+            "resource_version": "42",
+            "timeout": 10,
+        }
+        if namespaced:
+            expected_kwargs["namespace"] = "default"
+        if label_selector:
+            expected_kwargs["label_selector"] = label_selector
+        watch_mock.assert_called_once_with(**expected_kwargs)
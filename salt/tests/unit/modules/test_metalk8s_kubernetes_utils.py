@@ -1,5 +1,7 @@
 from importlib import reload
+import json
 import os.path
+import tempfile
 from unittest import TestCase
 from unittest.mock import MagicMock, mock_open, patch
 
@@ -155,6 +157,47 @@ class Metalk8sKubernetesUtilsTestCase(TestCase, mixins.LoaderModuleMockMixin):
                 metalk8s_kubernetes_utils.ping(),
             )
 
+    def test_client_cache_stats(self):
+        """
+        Tests the return of `client_cache_stats` function
+        """
+        stats = {
+            "hits": 12,
+            "misses": 1,
+            "refreshes": 0,
+            "invalidations": 0,
+            "size": 1,
+        }
+        utils_dict = {
+            "metalk8s_kubernetes.get_client_cache_stats": MagicMock(return_value=stats)
+        }
+
+        with patch.dict(metalk8s_kubernetes_utils.__utils__, utils_dict):
+            self.assertEqual(metalk8s_kubernetes_utils.client_cache_stats(), stats)
+
+    @parameterized.expand([(True,), (False,)])
+    def test_render_cache_stats(self, has_cache):
+        """
+        Tests the return of `render_cache_stats` function
+        """
+        with tempfile.TemporaryDirectory() as cachedir:
+            if has_cache:
+                cache_dir = os.path.join(cachedir, "metalk8s", "render-cache")
+                os.makedirs(cache_dir)
+                with open(os.path.join(cache_dir, "stats.json"), "w") as fd:
+                    json.dump({"hits": 3, "misses": 2}, fd)
+                for digest in ["abc", "def"]:
+                    with open(os.path.join(cache_dir, f"{digest}.p"), "wb") as fd:
+                        fd.write(b"")
+                expected = {"hits": 3, "misses": 2, "size": 2}
+            else:
+                expected = {"hits": 0, "misses": 0, "size": 0}
+
+            with patch.dict(metalk8s_kubernetes_utils.__opts__, {"cachedir": cachedir}):
+                self.assertEqual(
+                    metalk8s_kubernetes_utils.render_cache_stats(), expected
+                )
+
     @utils.parameterized_from_cases(YAML_TESTS_CASES["read_and_render_yaml_file"])
     def test_read_and_render_yaml_file(
         self, source, result, template=None, opts=True, raises=False, **kwargs
@@ -186,7 +229,7 @@ class Metalk8sKubernetesUtilsTestCase(TestCase, mixins.LoaderModuleMockMixin):
                     metalk8s_kubernetes_utils.read_and_render_yaml_file,
                     source="my-source-file",
                     template=template,
-                    **kwargs
+                    **kwargs,
                 )
             else:
                 self.assertEqual(
@@ -85,24 +85,27 @@ class Metalk8sPackageManagerYumTestCase(TestCase, mixins.LoaderModuleMockMixin):
         Tests the return of `list_pkg_dependents` function
         """
 
-        def _rpm_qa_cmd(command):
-            out_kwargs = {}
-            if command[0] == "rpm" and command[1] == "-qa":
-                # rpm_qa_outputs == None means nothings installed so
-                # `rpm -qa <package>` return "" and retcode 0
-                if rpm_qa_outputs is not None:
-                    if isinstance(rpm_qa_outputs, dict):
-                        if rpm_qa_outputs.get(command[2]) is None:
-                            out_kwargs["retcode"] = 1
-                            out_kwargs["stderr"] = "An error has occured"
-                        else:
-                            out_kwargs["stdout"] = rpm_qa_outputs[command[2]]
-                    else:
-                        out_kwargs["stdout"] = rpm_qa_outputs
-                return utils.cmd_output(**out_kwargs)
-            return None
-
-        salt_dict = {"cmd.run_all": MagicMock(side_effect=_rpm_qa_cmd)}
+        def _rpm_q_cmd(command, ignore_retcode=False):
+            self.assertTrue(ignore_retcode)
+            if command[:4] != ["rpm", "-q", "--queryformat", "%{NAME}\\n"]:
+                return None
+
+            # rpm_qa_outputs == None means nothings installed so
+            # `rpm -q <package>...` exits with the number of packages
+            out_kwargs = {"retcode": 0, "stdout": ""}
+            for pkg_name in command[4:]:
+                output = (rpm_qa_outputs or {}).get(pkg_name, "")
+                if output is None:
+                    return utils.cmd_output(retcode=1, stderr="An error has occured")
+                if output:
+                    out_kwargs["stdout"] += f"{pkg_name}\n"
+                else:
+                    out_kwargs["stdout"] += f"package {pkg_name} is not installed\n"
+                    out_kwargs["retcode"] += 1
+            return utils.cmd_output(**out_kwargs)
+
+        cmd_run_mock = MagicMock(side_effect=_rpm_q_cmd)
+        salt_dict = {"cmd.run_all": cmd_run_mock}
         list_dependents_mock = MagicMock(
             return_value={} if list_dependents is None else list_dependents
         )
@@ -116,28 +119,38 @@ class Metalk8sPackageManagerYumTestCase(TestCase, mixins.LoaderModuleMockMixin):
                 ),
                 result,
             )
+            # All packages are checked at once
+            self.assertLessEqual(cmd_run_mock.call_count, 1)
 
     @utils.parameterized_from_cases(YAML_TESTS_CASES["check_pkg_availability"])
     def test_check_pkg_availability(
-        self, pkgs_info, exclude=None, raise_msg=None, yum_install_retcode=0
+        self,
+        pkgs_info,
+        exclude=None,
+        raise_msg=None,
+        yum_install_retcode=0,
+        yum_install_stderr=None,
+        yum_install_calls=None,
     ):
         """
         Tests the return of `check_pkg_availability` function
         """
 
         def _yum_install_cmd(command):
+            pkg_specs = command[2 : command.index("--setopt")]
             out_kwargs = {"stdout": "Everything looks good"}
             if isinstance(yum_install_retcode, int):
                 out_kwargs["retcode"] = yum_install_retcode
             elif isinstance(yum_install_retcode, list):
                 out_kwargs["retcode"] = yum_install_retcode.pop()
             elif isinstance(yum_install_retcode, dict):
-                # `command[2]` == package name
-                out_kwargs["retcode"] = yum_install_retcode.get(command[2], 0)
+                out_kwargs["retcode"] = max(
+                    yum_install_retcode.get(pkg_spec, 0) for pkg_spec in pkg_specs
+                )
 
             if out_kwargs.get("retcode"):
                 out_kwargs["stdout"] = "Some output"
-                out_kwargs["stderr"] = "Oh ! No ! An ErRoR"
+                out_kwargs["stderr"] = yum_install_stderr or "Oh ! No ! An ErRoR"
 
             return utils.cmd_output(**out_kwargs)
 
@@ -163,3 +176,5 @@ class Metalk8sPackageManagerYumTestCase(TestCase, mixins.LoaderModuleMockMixin):
                 self.assertIn(
                     "exclude={}".format(exclude), cmd_run_mock.call_args[0][0]
                 )
+            if yum_install_calls is not None:
+                self.assertEqual(cmd_run_mock.call_count, yum_install_calls)
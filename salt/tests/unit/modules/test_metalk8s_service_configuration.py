@@ -1,9 +1,10 @@
 import os.path
 from unittest import TestCase
-from unittest.mock import MagicMock, patch
+from unittest.mock import MagicMock, call, patch
 
 from parameterized import param, parameterized
 from salt.exceptions import CommandExecutionError
+import salt.utils.dictupdate
 import yaml
 
 from _modules import metalk8s_service_configuration
@@ -19,6 +20,37 @@ YAML_TESTS_FILE = os.path.join(
 with open(YAML_TESTS_FILE) as fd:
     YAML_TESTS_CASES = yaml.safe_load(fd)
 
+CONFIGMAPS = [
+    {
+        "apiVersion": "v1",
+        "kind": "ConfigMap",
+        "metadata": {
+            "name": "metalk8s-prometheus-config",
+            "namespace": "metalk8s-monitoring",
+            "resourceVersion": "1",
+        },
+        "data": {"config.yaml": "apiVersion: v1alpha1\nspec:\n  replicas: 3\n"},
+    },
+    {
+        "apiVersion": "v1",
+        "kind": "ConfigMap",
+        "metadata": {
+            "name": "metalk8s-grafana-config",
+            "namespace": "metalk8s-monitoring",
+            "resourceVersion": "1",
+        },
+        "data": {"config.yaml": "apiVersion: v1alpha1\n"},
+    },
+]
+
+
+def _get_objects(refs, **_):
+    configmaps = {
+        (configmap["metadata"]["namespace"], configmap["metadata"]["name"]): configmap
+        for configmap in CONFIGMAPS
+    }
+    return [configmaps.get((ref["namespace"], ref["name"])) for ref in refs]
+
 
 class Metalk8sServiceConfigurationTestCase(TestCase, mixins.LoaderModuleMockMixin):
     """
@@ -91,6 +123,158 @@ class Metalk8sServiceConfigurationTestCase(TestCase, mixins.LoaderModuleMockMixi
                 )
                 get_configmap_mock.assert_called_once()
 
+    @parameterized.expand(
+        [
+            param(
+                namespaces=None,
+                get_namespaces=list(
+                    metalk8s_service_configuration.SERVICE_CONFS.keys()
+                ),
+            ),
+            param(
+                namespaces=["metalk8s-monitoring", "my-namespace"],
+                get_namespaces=["metalk8s-monitoring"],
+            ),
+        ]
+    )
+    def test_prefetch_service_confs(self, namespaces, get_namespaces):
+        """
+        Tests the return of `prefetch_service_confs` function
+        """
+        get_objects_mock = MagicMock(side_effect=_get_objects)
+
+        salt_dict = {"metalk8s_kubernetes.get_objects": get_objects_mock}
+        with patch.dict(metalk8s_service_configuration.__salt__, salt_dict):
+            self.assertEqual(
+                metalk8s_service_configuration.prefetch_service_confs(
+                    namespaces=namespaces
+                ),
+                [
+                    "metalk8s-monitoring/metalk8s-grafana-config",
+                    "metalk8s-monitoring/metalk8s-prometheus-config",
+                ],
+            )
+            # Only the known service ConfigMaps are retrieved, all at once
+            get_objects_mock.assert_called_once_with(
+                [
+                    {
+                        "kind": "ConfigMap",
+                        "apiVersion": "v1",
+                        "namespace": namespace,
+                        "name": name,
+                    }
+                    for namespace in get_namespaces
+                    for name in metalk8s_service_configuration.SERVICE_CONFS[namespace]
+                ]
+            )
+
+    def test_get_service_conf_cached(self):
+        """
+        Tests that `get_service_conf` retrieves service ConfigMaps once, and
+        merges each configuration once
+        """
+        get_objects_mock = MagicMock(side_effect=_get_objects)
+        get_object_mock = MagicMock()
+        merge_mock = MagicMock(wraps=salt.utils.dictupdate.merge)
+        defaults = {"apiVersion": "v1alpha1", "spec": {"replicas": 1, "image": "x"}}
+
+        salt_dict = {
+            "metalk8s_kubernetes.get_objects": get_objects_mock,
+            "metalk8s_kubernetes.get_object": get_object_mock,
+        }
+        with patch.dict(metalk8s_service_configuration.__salt__, salt_dict), patch(
+            "salt.utils.dictupdate.merge", merge_mock
+        ):
+            for _ in range(3):
+                result = metalk8s_service_configuration.get_service_conf(
+                    "metalk8s-monitoring", "metalk8s-prometheus-config", defaults
+                )
+                self.assertEqual(
+                    result,
+                    {"apiVersion": "v1alpha1", "spec": {"replicas": 3, "image": "x"}},
+                )
+                # Returned configurations can be modified safely
+                result["spec"]["replicas"] = 0
+
+            # Not found when retrieving service ConfigMaps, no need to GET it
+            self.assertIs(
+                metalk8s_service_configuration.get_service_conf(
+                    "metalk8s-monitoring", "metalk8s-alertmanager-config", defaults
+                ),
+                defaults,
+            )
+
+        get_objects_mock.assert_called_once()
+        get_object_mock.assert_not_called()
+        merge_mock.assert_called_once()
+
+    def test_get_service_conf_other_configmap(self):
+        """
+        Tests that `get_service_conf` does not retrieve service ConfigMaps
+        for other ConfigMaps
+        """
+        get_objects_mock = MagicMock()
+        get_object_mock = MagicMock(return_value=None)
+
+        salt_dict = {
+            "metalk8s_kubernetes.get_objects": get_objects_mock,
+            "metalk8s_kubernetes.get_object": get_object_mock,
+        }
+        with patch.dict(metalk8s_service_configuration.__salt__, salt_dict):
+            for namespace in ["my-namespace", "metalk8s-monitoring"]:
+                for _ in range(2):
+                    self.assertEqual(
+                        metalk8s_service_configuration.get_service_conf(
+                            namespace, "metalk8s-my-service-config", {}
+                        ),
+                        {},
+                    )
+
+        get_objects_mock.assert_not_called()
+        self.assertEqual(
+            get_object_mock.call_args_list,
+            [
+                call(
+                    kind="ConfigMap",
+                    apiVersion="v1",
+                    namespace=namespace,
+                    name="metalk8s-my-service-config",
+                )
+                for namespace in ["my-namespace", "metalk8s-monitoring"]
+            ],
+        )
+
+    def test_get_service_conf_prefetch_error(self):
+        """
+        Tests that `get_service_conf` reads ConfigMaps one by one if service
+        ConfigMaps cannot be retrieved together
+        """
+        get_objects_mock = MagicMock(
+            side_effect=CommandExecutionError("Failed to retrieve ConfigMaps")
+        )
+        get_object_mock = MagicMock(return_value=None)
+
+        salt_dict = {
+            "metalk8s_kubernetes.get_objects": get_objects_mock,
+            "metalk8s_kubernetes.get_object": get_object_mock,
+        }
+        with patch.dict(metalk8s_service_configuration.__salt__, salt_dict):
+            for _ in range(2):
+                self.assertEqual(
+                    metalk8s_service_configuration.get_service_conf(
+                        "metalk8s-monitoring", "metalk8s-prometheus-config", {}
+                    ),
+                    {},
+                )
+
+        get_objects_mock.assert_called_once()
+        get_object_mock.assert_called_once_with(
+            kind="ConfigMap",
+            apiVersion="v1",
+            namespace="metalk8s-monitoring",
+            name="metalk8s-prometheus-config",
+        )
+
     @utils.parameterized_from_cases(YAML_TESTS_CASES["get_pod_affinity"])
     def test_get_pod_affinity(self, result, **kwargs):
         """
@@ -57,12 +57,15 @@ class Metalk8sSolutionsK8sTestCase(TestCase, mixins.LoaderModuleMockMixin):
                     return configmap
             return None
 
+        get_objects_mock = MagicMock(
+            side_effect=lambda refs, **_: [_get_configmap_mock(**ref) for ref in refs]
+        )
         patch_dict = {
             "metalk8s_kubernetes.list_objects": MagicMock(return_value=namespaces),
-            "metalk8s_kubernetes.get_object": MagicMock(
-                side_effect=_get_configmap_mock
-            ),
+            "metalk8s_kubernetes.get_objects": get_objects_mock,
         }
 
         with patch.dict(metalk8s_solutions_k8s.__salt__, patch_dict):
             self.assertEqual(metalk8s_solutions_k8s.list_environments(), result)
+            # All ConfigMaps are retrieved at once
+            get_objects_mock.assert_called_once()
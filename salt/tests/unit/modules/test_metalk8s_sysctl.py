@@ -1,6 +1,7 @@
 """Unit tests for metalk8s_sysctl execution module"""
 
 import os.path
+from unittest.mock import patch
 
 import yaml
 
@@ -34,6 +35,8 @@ class Metalk8sSysctlTestCase(TestCase, mixins.LoaderModuleMockMixin):
         for path, content in FILESYSTEM_TREE.items():
             self.fs.create_file(path, contents=content)
 
+        super().setUp()
+
     def test_virtual(self):
         """
         Tests the return of `__virtual__` function
@@ -60,3 +63,79 @@ class Metalk8sSysctlTestCase(TestCase, mixins.LoaderModuleMockMixin):
                 metalk8s_sysctl.has_precedence(name, value, config, strict),
                 None,
             )
+
+    @utils.parameterized_from_cases(YAML_TESTS_CASES["has_precedence_many"])
+    def test_has_precedence_many(self, params, config, result=None, strict=False):
+        """
+        Tests the return of `has_precedence_many` function
+        """
+        if result:
+            self.assertRaisesRegex(
+                CommandExecutionError,
+                result,
+                metalk8s_sysctl.has_precedence_many,
+                params,
+                config,
+                strict,
+            )
+        else:
+            self.assertEqual(
+                metalk8s_sysctl.has_precedence_many(params, config, strict),
+                None,
+            )
+
+    def test_has_precedence_index(self):
+        """
+        Tests that sysctl configuration files are only parsed again when
+        added or modified
+        """
+        config = "/etc/sysctl.d/70-metalk8s.conf"
+        read_file_mock = patch(
+            "configparser.ConfigParser.read_file",
+            autospec=True,
+            side_effect=metalk8s_sysctl.configparser.ConfigParser.read_file,
+        )
+
+        with read_file_mock as read_file:
+            for _ in range(3):
+                metalk8s_sysctl.has_precedence("net.ipv4.ip_forward", 1, config)
+                metalk8s_sysctl.has_precedence("vm.max_map_count", 262144, config)
+            # `/etc/sysctl.d/99-sysctl.conf` and `/etc/sysctl.conf`
+            self.assertEqual(read_file.call_count, 2)
+
+            self.fs.create_file(
+                "/etc/sysctl.d/80-other.conf", contents="vm.max_map_count=65530"
+            )
+            self.assertRaisesRegex(
+                CommandExecutionError,
+                "'/etc/sysctl.d/80-other.conf' redefines 'vm.max_map_count' "
+                "with value '65530'",
+                metalk8s_sysctl.has_precedence,
+                "vm.max_map_count",
+                262144,
+                config,
+            )
+            self.assertEqual(read_file.call_count, 3)
+
+            with open("/etc/sysctl.d/80-other.conf", "w") as fd:
+                fd.write("vm.max_map_count = 262144\n")
+            metalk8s_sysctl.has_precedence("vm.max_map_count", 262144, config)
+            self.assertEqual(read_file.call_count, 4)
+
+            # `/etc/sysctl.conf` is always read, but may be missing
+            with open("/etc/sysctl.conf", "w") as fd:
+                fd.write("vm.swappiness = 10\n")
+            self.assertRaisesRegex(
+                CommandExecutionError,
+                "'/etc/sysctl.conf' redefines 'vm.swappiness' with value '10'",
+                metalk8s_sysctl.has_precedence,
+                "vm.swappiness",
+                10,
+                config,
+                strict=True,
+            )
+            self.assertEqual(read_file.call_count, 5)
+
+            os.remove("/etc/sysctl.conf")
+            metalk8s_sysctl.has_precedence("vm.swappiness", 10, config, strict=True)
+            self.assertEqual(read_file.call_count, 5)
@@ -34,17 +34,26 @@ class Metalk8sChecksTestCase(TestCase, mixins.LoaderModuleMockMixin):
         self.assertEqual(metalk8s_checks.__virtual__(), "metalk8s_checks")
 
     @utils.parameterized_from_cases(YAML_TESTS_CASES["nodes"])
-    def test_nodes(self, result, pillar=None, expect_raise=False, nodes=None, **kwargs):
+    def test_nodes(
+        self,
+        result,
+        pillar=None,
+        expect_raise=False,
+        nodes=None,
+        called_with=None,
+        **kwargs
+    ):
         """
         Tests the return of `nodes` function
         """
 
-        def cmd_mock(fun, name, **_kwargs):
-            if fun == "metalk8s_kubernetes.get_object":
-                return nodes.get(name)
+        def cmd_mock(fun, **_kwargs):
+            if fun == "metalk8s_kubernetes.list_objects":
+                return list((nodes or {}).values())
             return None
 
-        salt_dict = {"salt.cmd": MagicMock(side_effect=cmd_mock)}
+        cmd_mock = MagicMock(side_effect=cmd_mock)
+        salt_dict = {"salt.cmd": cmd_mock}
 
         with patch.dict(metalk8s_checks.__pillar__, pillar or {}), patch.dict(
             metalk8s_checks.__salt__, salt_dict
@@ -54,7 +63,19 @@ class Metalk8sChecksTestCase(TestCase, mixins.LoaderModuleMockMixin):
                     CheckError, result, metalk8s_checks.nodes, **kwargs
                 )
             else:
-                self.assertEqual(metalk8s_checks.nodes(**kwargs), result)
+                ret = metalk8s_checks.nodes(**kwargs)
+                if kwargs.get("details"):
+                    self.assertIsInstance(ret.pop("duration"), float)
+                self.assertEqual(ret, result)
+            # All nodes are retrieved at once
+            cmd_mock.assert_called_once()
+            if called_with:
+                cmd_mock.assert_called_once_with(
+                    fun="metalk8s_kubernetes.list_objects",
+                    kind="Node",
+                    apiVersion="v1",
+                    **called_with
+                )
 
     @utils.parameterized_from_cases(YAML_TESTS_CASES["minions"])
     def test_minions(
@@ -115,6 +136,17 @@ class Metalk8sChecksTestCase(TestCase, mixins.LoaderModuleMockMixin):
             nodes_mock.assert_called_once()
             minions_mock.assert_called_once()
 
+            # Each distinct node version is compared only once
+            version_cmp_calls = [
+                call
+                for call in salt_dict["salt.cmd"].call_args_list
+                if call[0][0] == "pkg.version_cmp"
+            ]
+            self.assertEqual(
+                len(version_cmp_calls),
+                len({node["version"] for node in pillar["metalk8s"]["nodes"].values()}),
+            )
+
     @utils.parameterized_from_cases(YAML_TESTS_CASES["downgrade"])
     def test_downgrade(
         self,
@@ -0,0 +1,70 @@
+from unittest import TestCase
+from unittest.mock import MagicMock, patch
+
+from parameterized import parameterized
+from salt.exceptions import CommandExecutionError
+
+from _runners import metalk8s_drain
+
+from tests.unit import mixins
+
+
+class Metalk8sDrainTestCase(TestCase, mixins.LoaderModuleMockMixin):
+    """
+    TestCase for `metalk8s_drain` runner
+    """
+
+    loader_module = metalk8s_drain
+
+    def test_virtual(self):
+        """
+        Tests the return of `__virtual__` function
+        """
+        self.assertEqual(metalk8s_drain.__virtual__(), "metalk8s_drain")
+
+    @parameterized.expand(
+        [
+            ("list of nodes", ["node-1", "node-2"], True, False),
+            ("comma-separated nodes", "node-1, node-2", True, False),
+            ("failure", ["node-1", "node-2"], False, True),
+            ("failure without raising", ["node-1", "node-2"], False, False),
+        ]
+    )
+    def test_drain_nodes(self, _, nodes, success, raises):
+        """
+        Tests the return of `drain_nodes` function
+        """
+        drain_ret = {
+            "node-1": {"result": True, "comment": "Eviction complete."},
+            "node-2": {
+                "result": success,
+                "comment": "Eviction complete." if success else "Drain failed",
+            },
+        }
+        cmd_mock = MagicMock(return_value=drain_ret)
+
+        with patch.dict(metalk8s_drain.__salt__, {"salt.cmd": cmd_mock}):
+            if not success and raises:
+                self.assertRaisesRegex(
+                    CommandExecutionError,
+                    "Node 'node-2': Drain failed",
+                    metalk8s_drain.drain_nodes,
+                    nodes,
+                    max_parallel=2,
+                    __pub_user="root",
+                )
+            else:
+                ret = metalk8s_drain.drain_nodes(
+                    nodes, max_parallel=2, raises=raises, __pub_user="root"
+                )
+                self.assertEqual(ret["node-1"], drain_ret["node-1"])
+                if success:
+                    self.assertNotIn("retcode", ret)
+                else:
+                    self.assertEqual(ret["retcode"], 1)
+
+        cmd_mock.assert_called_once_with(
+            fun="metalk8s_kubernetes.nodes_drain",
+            node_names=["node-1", "node-2"],
+            max_parallel=2,
+        )
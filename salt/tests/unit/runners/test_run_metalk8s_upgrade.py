@@ -0,0 +1,77 @@
+import os.path
+import tempfile
+from unittest import TestCase
+from unittest.mock import MagicMock, patch
+
+from _runners import metalk8s_upgrade
+
+from tests.unit import mixins
+
+
+class Metalk8sUpgradeTestCase(TestCase, mixins.LoaderModuleMockMixin):
+    """
+    TestCase for `metalk8s_upgrade` runner
+    """
+
+    loader_module = metalk8s_upgrade
+
+    def setUp(self):
+        cachedir = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.addCleanup(cachedir.cleanup)
+        self.cachedir = cachedir.name
+        super().setUp()
+
+    def loader_module_globals(self):
+        return {"__opts__": {"cachedir": self.cachedir}}
+
+    def test_virtual(self):
+        """
+        Tests the return of `__virtual__` function
+        """
+        self.assertEqual(metalk8s_upgrade.__virtual__(), "metalk8s_upgrade")
+
+    def test_waves(self):
+        """
+        Tests the timings reported by `wave_started` and `wave_done` functions
+        """
+        time_mock = MagicMock(side_effect=[100.0, 150.5, 200.0, 260.0])
+
+        with patch("time.time", time_mock):
+            self.assertEqual(
+                metalk8s_upgrade.wave_started(1, ["master-1"], reset=True),
+                {"wave": "1", "nodes": ["master-1"]},
+            )
+            self.assertEqual(
+                metalk8s_upgrade.wave_done(1),
+                {"wave": "1", "nodes": ["master-1"], "duration": 50.5},
+            )
+            metalk8s_upgrade.wave_started(2, ["worker-1", "worker-2"])
+            metalk8s_upgrade.wave_done(2)
+
+        self.assertTrue(
+            os.path.isfile(os.path.join(self.cachedir, metalk8s_upgrade.WAVES_FILE))
+        )
+        self.assertEqual(
+            metalk8s_upgrade.waves_report(),
+            {
+                "1": {"nodes": ["master-1"], "duration": 50.5},
+                "2": {"nodes": ["worker-1", "worker-2"], "duration": 60.0},
+            },
+        )
+
+        # Previous waves are dropped when starting a new upgrade
+        with patch("time.time", MagicMock(return_value=300.0)):
+            metalk8s_upgrade.wave_started(1, ["master-1"], reset=True)
+        self.assertEqual(
+            metalk8s_upgrade.waves_report(),
+            {"1": {"nodes": ["master-1"], "duration": None}},
+        )
+
+    def test_wave_done_unknown(self):
+        """
+        Tests the return of `wave_done` function for a wave never started
+        """
+        self.assertEqual(
+            metalk8s_upgrade.wave_done("unknown"),
+            {"wave": "unknown", "nodes": [], "duration": None},
+        )